@@ -0,0 +1,12 @@
+"""Benchmarks for the krules query helpers and MCPServer throughput.
+
+Run from the repository root::
+
+    python -m benchmarks --sizes 1k,100k --out results.json
+    python -m benchmarks --load --connections 100 --out results.json
+    python -m benchmarks --compare baseline.json --out results.json
+
+Results are written as JSON (see `benchmarks.report`). With ``--compare``,
+each result is checked against the matching one in a previous run, and the
+command exits non-zero when throughput dropped by more than ``--tolerance``.
+"""
@@ -0,0 +1,59 @@
+"""Command line entrypoint: ``python -m benchmarks --help``."""
+from __future__ import annotations
+
+import asyncio
+import sys
+from argparse import ArgumentParser
+
+from . import graphs, krules_bench, load, report
+
+
+def main(argv=None) -> int:
+    parser = ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--shapes", default=",".join(graphs.SHAPES),
+                        help=f"comma-separated graph shapes ({', '.join(graphs.SHAPES)})")
+    parser.add_argument("--sizes", default="1k", help="comma-separated node counts, e.g. 1k,100k,1m")
+    parser.add_argument("--queries", type=int, default=2000, help="queries per helper benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-krules", action="store_true", help="only run the server load benchmark")
+    parser.add_argument("--load", action="store_true", help="also drive an MCPServer with concurrent clients")
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200, help="requests per connection")
+    parser.add_argument("--pipeline", type=int, default=1, help="requests in flight per connection")
+    parser.add_argument("--cache", action="store_true", help="enable the response cache for the load run")
+    parser.add_argument("--target", metavar="HOST:PORT", help="drive this server instead of an in-process one")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag slowdowns against a previous results file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed throughput drop before --compare fails (fraction)")
+    args = parser.parse_args(argv)
+
+    shapes = [s for s in args.shapes.split(",") if s]
+    sizes = [graphs.parse_size(s) for s in args.sizes.split(",") if s]
+    results = []
+    for shape in shapes:
+        for n in sizes:
+            if not args.skip_krules:
+                results.extend(krules_bench.run(shape, n, queries=args.queries, seed=args.seed))
+            if args.load or args.target:
+                results.append(asyncio.run(load.run(
+                    shape, n, connections=args.connections, requests=args.requests, pipeline=args.pipeline,
+                    cache=args.cache, seed=args.seed, target=args.target)))
+            print(report.format_table([r for r in results if r["shape"] == shape and r["nodes"] == n]),
+                  file=sys.stderr)
+
+    doc = report.document(results, vars(args))
+    if args.out:
+        report.write(args.out, doc)
+    if args.compare:
+        regressions = report.compare(report.load(args.compare), doc, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['suite']}/{r['name']} {r['shape']} n={r['nodes']}: "
+                  f"{r['current']:,.0f} ops/s vs {r['baseline']:,.0f} ({r['ratio']:.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
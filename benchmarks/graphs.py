@@ -0,0 +1,73 @@
+"""Synthetic graphs for the benchmarks, as ``(parent, child)`` edge lists.
+
+Node ``i`` is named ``"n{i}"``. Every shape is acyclic and generated
+deterministically from `seed`:
+
+- ``tree`` — a balanced tree (`fanout` children per node);
+- ``chain`` — deep chains of `depth` nodes each;
+- ``dag`` — random DAGs in blocks of `block` nodes, `degree` parents per node;
+- ``fanout`` — one root over hubs that each have `width` leaves.
+"""
+from __future__ import annotations
+
+import random
+from typing import Callable, Dict, List, Tuple
+
+Edge = Tuple[str, str]
+
+SIZES: Dict[str, int] = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+def parse_size(text: str) -> int:
+    """Node count for a size label (``1k``, ``100k``, ``1m``) or a plain integer."""
+    label = text.strip().lower()
+    if label in SIZES:
+        return SIZES[label]
+    return int(label.replace("_", ""))
+
+
+def _name(i: int) -> str:
+    return f"n{i}"
+
+
+def balanced_tree(n: int, seed: int = 0, *, fanout: int = 2) -> List[Edge]:
+    return [(_name((child - 1) // fanout), _name(child)) for child in range(1, n)]
+
+
+def deep_chains(n: int, seed: int = 0, *, depth: int = 1000) -> List[Edge]:
+    return [(_name(i - 1), _name(i)) for i in range(1, n) if i % depth]
+
+
+def random_dag(n: int, seed: int = 0, *, degree: int = 3, block: int = 1000) -> List[Edge]:
+    rng = random.Random(seed)
+    edges: List[Edge] = []
+    for i in range(n):
+        start = i - i % block
+        if i == start:
+            continue
+        for p in rng.sample(range(start, i), min(degree, i - start)):
+            edges.append((_name(p), _name(i)))
+    return edges
+
+
+def fan_out(n: int, seed: int = 0, *, width: int = 1000) -> List[Edge]:
+    hubs = max(1, (n - 1) // (width + 1))
+    edges = [(_name(0), _name(h)) for h in range(1, min(n, hubs + 1))]
+    edges.extend((_name(1 + leaf % hubs), _name(leaf)) for leaf in range(hubs + 1, n))
+    return edges
+
+
+SHAPES: Dict[str, Callable[..., List[Edge]]] = {
+    "tree": balanced_tree,
+    "chain": deep_chains,
+    "dag": random_dag,
+    "fanout": fan_out,
+}
+
+
+def generate(shape: str, n: int, seed: int = 0) -> List[Edge]:
+    try:
+        make = SHAPES[shape]
+    except KeyError:
+        raise ValueError(f"unknown shape {shape!r}; expected one of {sorted(SHAPES)}") from None
+    return make(n, seed)
@@ -0,0 +1,65 @@
+"""Benchmarks for the krules query helpers.
+
+Each run loads a synthetic graph (`benchmarks.graphs`) into the default
+`parent` relation, times the helpers on random nodes and restores the
+original facts afterwards. Queries pick nodes with replacement, so for larger
+query counts some answers come from the closure index's decoded-row cache,
+just as they do for a hot server.
+
+Closure rows are packed ints indexed by node id, so their memory grows with
+the square of the node count for deep shapes (``tree``, ``chain``). At
+``1m`` nodes, only ``fanout`` and ``dag`` fit in a few GB.
+"""
+from __future__ import annotations
+
+import random
+from typing import Dict, List
+
+from krules import helpers
+from krules.relations import parent, siblings_of
+
+from . import graphs
+from .timing import time_calls, time_once
+
+_ROLE = "bench-role"
+_INHERITED = "bench-inherited"
+
+
+def run(shape: str, n: int, *, queries: int = 1000, seed: int = 0) -> List[Dict]:
+    """Time closure building and the query helpers on a `shape` graph of `n` nodes."""
+    edges = graphs.generate(shape, n, seed)
+    rng = random.Random(seed)
+    names = [f"n{rng.randrange(n)}" for _ in range(queries)]
+    base = {"suite": "krules", "shape": shape, "nodes": n, "edges": len(edges)}
+    results = []
+
+    def record(name: str, stats: Dict) -> None:
+        results.append({**base, "name": name, **stats})
+
+    record("closure_from_edges", time_once(helpers.closure_from_edges, edges))
+
+    saved = list(parent.facts)
+    direct = [f"n{i}" for i in range(0, n, 100)]
+    inheriting = [f"n{i}" for i in range(0, n, max(1, n // 10))]
+    try:
+        helpers.ancestry()  # make sure the index exists so replace() rebuilds it
+        record("ancestry_build", time_once(parent.replace, edges))
+        record("descendants_of", time_calls(helpers.descendants_of, ((x,) for x in names)))
+        record("ancestors_of", time_calls(helpers.ancestors_of, ((x,) for x in names)))
+        record("siblings_of", time_calls(siblings_of, ((x,) for x in names)))
+
+        # direct roles on ~1% of the nodes, inherited roles from a few roots
+        for subject in direct:
+            helpers.assign_role(_ROLE, subject)
+        for subject in inheriting:
+            helpers.assign_role_inherit(_INHERITED, subject)
+        checks = [(rng.choice((_ROLE, _INHERITED)), x) for x in names]
+        record("has_role", time_calls(helpers.has_role, checks))
+        record("has_roles", time_once(helpers.has_roles, checks, ops=len(checks)))
+    finally:
+        for subject in direct:
+            helpers.revoke_role(_ROLE, subject)
+        for subject in inheriting:
+            helpers.revoke_role(_INHERITED, subject)
+        parent.replace(saved)
+    return results
@@ -0,0 +1,145 @@
+"""Load generator for MCPServer.
+
+`drive` opens many concurrent connections to a server and sends `rule`
+requests over them, one at a time or with up to `pipeline` in flight per
+connection. It reports requests/sec and latency percentiles. `run` starts an
+in-process `MCPServer` over a synthetic graph and drives it. To measure a
+separately started server, pass its address to ``python -m benchmarks --target``.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from krules import helpers
+from krules.relations import parent
+from mcp.cache import ResponseCache
+from mcp.server import MCPServer
+
+from . import graphs
+from .timing import summarize
+
+RequestFactory = Callable[[random.Random], dict]
+
+
+def rule_requests(n: int) -> RequestFactory:
+    """Half `descendants`, half `has_role` requests on random nodes of an `n`-node graph."""
+    def make(rng: random.Random) -> dict:
+        who = f"n{rng.randrange(n)}"
+        if rng.random() < 0.5:
+            return {"type": "rule", "action": "descendants", "who": who}
+        return {"type": "rule", "action": "has_role", "role": "bench-role", "who": who}
+
+    return make
+
+
+def handle_rule(message: dict) -> dict:
+    """The read-only part of the demo `rule` handler, kept on the event loop."""
+    action = message.get("action")
+    who = message.get("who")
+    if action == "descendants":
+        return {"type": "rule_response", "descendants": helpers.descendants_of(who)}
+    if action == "has_role":
+        return {"type": "rule_response", "has_role": helpers.has_role(message.get("role"), who)}
+    return {"type": "error", "reason": "unknown_action"}
+
+
+async def drive(
+    host: str,
+    port: int,
+    make_request: RequestFactory,
+    *,
+    connections: int = 50,
+    requests: int = 200,
+    pipeline: int = 1,
+    seed: int = 0,
+) -> Dict:
+    """Send `requests` requests on each of `connections` connections and summarize latencies."""
+    latencies: List[float] = []
+    errors = 0
+
+    async def client(c: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed * 7919 + c)
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            await reader.readline()  # ready
+            sent_at: Dict[int, float] = {}
+            window = asyncio.Semaphore(max(1, pipeline))
+
+            async def receive() -> None:
+                nonlocal errors
+                for _ in range(requests):
+                    response = json.loads(await reader.readline())
+                    latencies.append(time.perf_counter() - sent_at.pop(response["id"]))
+                    if response.get("type") == "error":
+                        errors += 1
+                    window.release()
+
+            receiver = asyncio.ensure_future(receive())
+            for i in range(requests):
+                await window.acquire()
+                sent_at[i] = time.perf_counter()
+                writer.write((json.dumps({**make_request(rng), "id": i}) + "\n").encode("utf8"))
+                await writer.drain()
+            await receiver
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(connections)))
+    elapsed = time.perf_counter() - started
+    stats = summarize(latencies, elapsed)
+    return {"connections": connections, "pipeline": pipeline, "errors": errors, **stats,
+            "requests_per_sec": stats["ops_per_sec"]}
+
+
+async def run(
+    shape: str,
+    n: int,
+    *,
+    connections: int = 50,
+    requests: int = 200,
+    pipeline: int = 1,
+    cache: bool = False,
+    seed: int = 0,
+    target: Optional[str] = None,
+) -> Dict:
+    """Drive an in-process server over a `shape` graph (or the server at `target`, ``host:port``)."""
+    base = {"suite": "server", "name": "rule_load" + ("_cached" if cache else ""), "shape": shape,
+            "nodes": n}
+    make_request = rule_requests(n)
+    if target is not None:
+        host, _, port = target.rpartition(":")
+        stats = await drive(host or "127.0.0.1", int(port), make_request, connections=connections,
+                            requests=requests, pipeline=pipeline, seed=seed)
+        return {**base, "target": target, **stats}
+
+    saved = list(parent.facts)
+    subjects = [f"n{i}" for i in range(0, n, 100)]
+    parent.replace(graphs.generate(shape, n, seed))
+    for subject in subjects:
+        helpers.assign_role("bench-role", subject)
+    server = MCPServer(port=0, pipeline=pipeline,
+                       cache=ResponseCache(maxsize=max(1024, 2 * n), version=helpers.facts_version)
+                       if cache else None)
+    server.register_handler("rule", handle_rule, blocking=False)
+    if cache:
+        server.cache_responses("rule")
+    await server.start()
+    try:
+        stats = await drive(server.host, server.port, make_request, connections=connections,
+                            requests=requests, pipeline=pipeline, seed=seed)
+    finally:
+        await server.stop()
+        for subject in subjects:
+            helpers.revoke_role("bench-role", subject)
+        parent.replace(saved)
+    return {**base, **stats}
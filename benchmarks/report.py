@@ -0,0 +1,75 @@
+"""JSON result files and regression checks.
+
+A results file looks like::
+
+    {"meta": {"python": "3.11.4", "platform": "...", "started": "...", "args": {...}},
+     "results": [{"suite": "krules", "name": "descendants_of", "shape": "tree",
+                  "nodes": 1000, "ops_per_sec": 250000.0, "p50_us": 3.1, ...}, ...]}
+
+`compare` matches results on suite/name/shape/nodes (plus connections and
+pipeline for load runs) and flags every one whose ``ops_per_sec`` fell by
+more than `tolerance` compared with the baseline.
+"""
+from __future__ import annotations
+
+import json
+import platform
+import sys
+import time
+from typing import Dict, List, Tuple
+
+KEY_FIELDS = ("suite", "name", "shape", "nodes", "connections", "pipeline")
+
+
+def result_key(result: Dict) -> Tuple:
+    return tuple(result.get(field) for field in KEY_FIELDS)
+
+
+def document(results: List[Dict], args: Dict) -> Dict:
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "argv": sys.argv[1:],
+            "args": args,
+        },
+        "results": results,
+    }
+
+
+def write(path: str, doc: Dict) -> None:
+    with open(path, "w", encoding="utf8") as fh:
+        json.dump(doc, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+def load(path: str) -> Dict:
+    with open(path, encoding="utf8") as fh:
+        return json.load(fh)
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float = 0.25) -> List[Dict]:
+    """Results whose throughput dropped by more than `tolerance` (a fraction) against `baseline`."""
+    before = {result_key(r): r for r in baseline.get("results", ())}
+    regressions = []
+    for result in current.get("results", ()):
+        old = before.get(result_key(result))
+        if old is None or not old.get("ops_per_sec"):
+            continue
+        ratio = result.get("ops_per_sec", 0.0) / old["ops_per_sec"]
+        if ratio < 1.0 - tolerance:
+            regressions.append({**{f: result.get(f) for f in KEY_FIELDS}, "baseline": old["ops_per_sec"],
+                                "current": result.get("ops_per_sec", 0.0), "ratio": ratio})
+    return regressions
+
+
+def format_table(results: List[Dict]) -> str:
+    lines = [f"{'suite':<7} {'name':<20} {'shape':<7} {'nodes':>9} {'ops':>7} {'seconds':>9} "
+             f"{'ops/s':>12} {'p50 us':>10} {'p99 us':>10}"]
+    for r in results:
+        lines.append(f"{r['suite']:<7} {r['name']:<20} {r.get('shape', ''):<7} {r.get('nodes', 0):>9,} "
+                     f"{r['ops']:>7,} {r['seconds']:>9.3f} {r['ops_per_sec']:>12,.1f} "
+                     f"{r['p50_us']:>10.1f} {r['p99_us']:>10.1f}")
+    return "\n".join(lines)
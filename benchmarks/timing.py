@@ -0,0 +1,47 @@
+"""Timing helpers shared by the benchmark suites."""
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """The `q` quantile (0..1) of already sorted samples, nearest-rank."""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float], elapsed: float = None) -> Dict[str, float]:
+    """Throughput and latency percentiles (microseconds) for per-operation `samples` in seconds."""
+    ordered = sorted(samples)
+    total = sum(ordered) if elapsed is None else elapsed
+    return {
+        "ops": len(ordered),
+        "seconds": total,
+        "ops_per_sec": len(ordered) / total if total > 0 else 0.0,
+        "p50_us": percentile(ordered, 0.50) * 1e6,
+        "p90_us": percentile(ordered, 0.90) * 1e6,
+        "p99_us": percentile(ordered, 0.99) * 1e6,
+        "max_us": (ordered[-1] if ordered else 0.0) * 1e6,
+    }
+
+
+def time_calls(func: Callable[..., Any], calls: Iterable[tuple]) -> Dict[str, float]:
+    """Call ``func(*args)`` for each args tuple and summarize the per-call times."""
+    clock = time.perf_counter
+    samples = []
+    for args in calls:
+        started = clock()
+        func(*args)
+        samples.append(clock() - started)
+    return summarize(samples)
+
+
+def time_once(func: Callable[..., Any], *args: Any, ops: int = 1) -> Dict[str, float]:
+    """Time a single (long) call, e.g. building a closure; `ops` is the work it covers."""
+    started = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - started
+    return summarize([elapsed / ops] * ops, elapsed)
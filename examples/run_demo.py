@@ -4,7 +4,8 @@ Demo: run_demo
 ===============
 
 This script starts a tiny MCP-style server (a `DemoServer` subclass) and then
-issues a few example JSON requests to it. The demo shows an end-to-end flow:
+issues a few example JSON requests to it through `mcp.client.Client`, which
+keeps its connections open between requests. The demo shows an end-to-end flow:
 
 - Start the server (runs in-process)
 - Send an `echo` request
@@ -27,6 +28,9 @@ What the demo does (example requests)
 - Ancestors: {"type": "rule", "action": "ancestors", "who": "sue"}
 - Assign role: {"type": "rule", "action": "assign_role", "role": "admin", "who": "alice"}
 - Has role: {"type": "rule", "action": "has_role", "role": "admin", "who": "alice"}
+- Batch: {"type": "batch", "requests": [<rule request>, ...]}
+- Streamed: {"type": "rule", "action": "descendants", "who": "bob", "stream": true, "limit": 2}
+- Metrics: {"type": "metrics", "format": "prometheus"}
 
 Sample output (what you should see printed)
 -------------------------------------------
@@ -35,6 +39,10 @@ descendants of bob: {'type': 'rule_response', 'descendants': ['alice', 'jack', '
 ancestors of sue: {'type': 'rule_response', 'ancestors': ['bob', 'alice']}
 assign role response: {'type': 'rule_response', 'assigned': True}
 has_role alice admin: {'type': 'rule_response', 'has_role': True}
+response cache: {'entries': 1, 'bytes': 41, 'hits': 1, 'misses': 3, 'invalidations': 1}
+batch: {'type': 'batch_response', 'results': [{'type': 'rule_response', 'has_role': True}, {'type': 'rule_response', 'has_role': False}, {'type': 'rule_response', 'descendants': ['sue']}]}
+streamed descendants of bob: ['alice', 'jack']
+rule requests served: 6
 
 Notes
 -----
@@ -48,76 +56,100 @@ docstring with the demo documentation above.
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
+from mcp.cache import ResponseCache
+from mcp.client import Client
 from mcp.server import MCPServer
 from mcp.resources import ResourceManager
 from mcp.tools import ToolManager
 from mcp.prompts import PromptManager
+from mcp.executors import blocking
+from mcp.metrics import MetricsRegistry
 
-from krules.helpers import descendants_of, ancestors_of, assign_role, has_role
+from krules import stats
+
+from krules.helpers import (
+    descendants_of, ancestors_of, iter_descendants_of, iter_ancestors_of, assign_role, has_role, has_roles,
+    facts_version,
+)
 
 logger = logging.getLogger("run_demo")
 
 
+@blocking
+def handle_rule(message: dict) -> dict:
+    """Answer a `rule` message using the krules helpers.
+
+    Declared blocking so large closure queries run on the server's executor
+    instead of stalling the event loop. Role assignment mutates in-process
+    state, so use a thread pool (the default) rather than a process pool here.
+    With ``"stream": true`` the closure queries return an iterator, which the
+    server sends as ``partial``/``done`` frames.
+    """
+    action = message.get("action")
+    if action == "descendants":
+        who = message.get("who")
+        if not isinstance(who, str):
+            return {"type": "error", "reason": "missing_or_invalid_who"}
+        if message.get("stream"):
+            return iter_descendants_of(who)
+        return {"type": "rule_response", "descendants": descendants_of(who)}
+
+    if action == "ancestors":
+        who = message.get("who")
+        if not isinstance(who, str):
+            return {"type": "error", "reason": "missing_or_invalid_who"}
+        if message.get("stream"):
+            return iter_ancestors_of(who)
+        return {"type": "rule_response", "ancestors": ancestors_of(who)}
+
+    if action == "assign_role":
+        role = message.get("role")
+        who = message.get("who")
+        if not isinstance(role, str) or not isinstance(who, str):
+            return {"type": "error", "reason": "missing_or_invalid_role_or_who"}
+        assign_role(role, who)
+        return {"type": "rule_response", "assigned": True}
+
+    if action == "has_role":
+        role = message.get("role")
+        who = message.get("who")
+        if not isinstance(role, str) or not isinstance(who, str):
+            return {"type": "error", "reason": "missing_or_invalid_role_or_who"}
+        return {"type": "rule_response", "has_role": has_role(role, who)}
+
+    return {"type": "error", "reason": "unknown_action"}
+
+
+@blocking
+def handle_rule_batch(messages: list) -> list:
+    """Answer the `rule` sub-requests of a batch; has_role checks go in one pass."""
+    results: list = [None] * len(messages)
+    checks = []
+    for i, message in enumerate(messages):
+        role, who = message.get("role"), message.get("who")
+        if message.get("action") == "has_role" and isinstance(role, str) and isinstance(who, str):
+            checks.append((i, role, who))
+        else:
+            results[i] = handle_rule(message)
+    answers = has_roles((role, who) for _, role, who in checks)
+    for (i, _, _), answer in zip(checks, answers):
+        results[i] = {"type": "rule_response", "has_role": answer}
+    return results
+
+
 class DemoServer(MCPServer):
-    async def on_request(self, message: dict):
-        # handle rule messages using krules helpers
-        if message.get("type") == "rule":
-            action = message.get("action")
-            if action == "descendants":
-                who = message.get("who")
-                if not isinstance(who, str):
-                    return {"type": "error", "reason": "missing_or_invalid_who"}
-                return {"type": "rule_response", "descendants": descendants_of(who)}
-
-            if action == "ancestors":
-                who = message.get("who")
-                if not isinstance(who, str):
-                    return {"type": "error", "reason": "missing_or_invalid_who"}
-                return {"type": "rule_response", "ancestors": ancestors_of(who)}
-
-            if action == "assign_role":
-                role = message.get("role")
-                who = message.get("who")
-                if not isinstance(role, str) or not isinstance(who, str):
-                    return {"type": "error", "reason": "missing_or_invalid_role_or_who"}
-                assign_role(role, who)
-                return {"type": "rule_response", "assigned": True}
-
-            if action == "has_role":
-                role = message.get("role")
-                who = message.get("who")
-                if not isinstance(role, str) or not isinstance(who, str):
-                    return {"type": "error", "reason": "missing_or_invalid_role_or_who"}
-                return {"type": "rule_response", "has_role": has_role(role, who)}
-
-        # fallback to base server behaviour
-        return await super().on_request(message)
-
-
-async def send_message(host: str, port: int, payload: dict) -> dict:
-    reader, writer = await asyncio.open_connection(host, port)
-    # Read server welcome/ready message which MCPServer sends on connect
-    _ready = await reader.readline()
-
-    data = (json.dumps(payload) + "\n").encode("utf8")
-    writer.write(data)
-    await writer.drain()
-
-    # Now read the response for our request
-    line = await reader.readline()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # handle rule messages using krules helpers, off the event loop
+        self.register_handler("rule", handle_rule)
+        self.register_batch_handler("rule", handle_rule_batch)
+        # repeated lookups are answered from the response cache until facts or roles change
+        self.cache_responses("rule", when=is_read_only_rule)
 
-    try:
-        writer.close()
-        await writer.wait_closed()
-    except Exception:
-        # ignore connection reset during demo shutdown
-        pass
 
-    if not line:
-        return {}
-    return json.loads(line.decode("utf8"))
+def is_read_only_rule(message: dict) -> bool:
+    return message.get("action") in ("descendants", "ancestors", "has_role") and not message.get("stream")
 
 
 async def main() -> None:
@@ -129,32 +161,63 @@ async def main() -> None:
     tools = ToolManager()
     prompts = PromptManager()
 
-    server = DemoServer(host=host, port=port, resources=resources, tools=tools, prompts=prompts)
+    # collect server and krules metrics; see the `metrics` request below
+    stats.enable()
+    metrics = MetricsRegistry()
+    metrics.add_collector(stats.collect)
+
+    cache = ResponseCache(maxsize=1024, ttl=60.0, version=facts_version)
+    server = DemoServer(host=host, port=port, resources=resources, tools=tools, prompts=prompts,
+                        metrics=metrics, cache=cache)
 
     await server.start()
     logger.info("demo server started on %s:%d", host, port)
 
+    # one pooled client for all requests: connections are opened once and reused
+    client = Client(host, port, pool_size=2)
     try:
         # echo
-        r = await send_message(host, port, {"type": "echo", "payload": "hello demo"})
+        r = await client.request({"type": "echo", "payload": "hello demo"})
         print("echo response:", r)
 
         # query descendants
-        r = await send_message(host, port, {"type": "rule", "action": "descendants", "who": "bob"})
+        r = await client.request({"type": "rule", "action": "descendants", "who": "bob"})
         print("descendants of bob:", r)
 
         # query ancestors
-        r = await send_message(host, port, {"type": "rule", "action": "ancestors", "who": "sue"})
+        r = await client.request({"type": "rule", "action": "ancestors", "who": "sue"})
         print("ancestors of sue:", r)
 
         # assign a role and query
-        r = await send_message(host, port, {"type": "rule", "action": "assign_role", "role": "admin", "who": "alice"})
+        r = await client.request({"type": "rule", "action": "assign_role", "role": "admin", "who": "alice"})
         print("assign role response:", r)
 
-        r = await send_message(host, port, {"type": "rule", "action": "has_role", "role": "admin", "who": "alice"})
+        r = await client.request({"type": "rule", "action": "has_role", "role": "admin", "who": "alice"})
         print("has_role alice admin:", r)
 
+        # asked again: answered from the cached bytes without calling the handler
+        await client.request({"type": "rule", "action": "has_role", "role": "admin", "who": "alice"})
+        print("response cache:", cache.info())
+
+        # several checks in one round trip
+        r = await client.request({"type": "batch", "requests": [
+            {"type": "rule", "action": "has_role", "role": "admin", "who": "alice"},
+            {"type": "rule", "action": "has_role", "role": "admin", "who": "bob"},
+            {"type": "rule", "action": "descendants", "who": "alice"},
+        ]})
+        print("batch:", r)
+
+        # stream the answer in `partial` frames, here limited to the first two names
+        names = [name async for name in client.stream({"type": "rule", "action": "descendants", "who": "bob",
+                                                       "limit": 2})]
+        print("streamed descendants of bob:", names)
+
+        r = await client.request({"type": "metrics"})
+        served = r["metrics"]["mcp_requests_total"]["samples"]
+        print("rule requests served:", sum(x["value"] for x in served if x["labels"]["type"] == "rule"))
+
     finally:
+        await client.close()
         await server.stop()
         logger.info("demo server stopped")
 
@@ -1,41 +1,74 @@
 """krules: business-rule helpers using the kanren logic programming library.
 
 This package is a minimal starter so you can drop your domain rules into `krules/`.
+
+Names are imported lazily (PEP 562): ``import krules`` loads nothing, and
+``krules.descendants_of`` imports `krules.helpers` on first access. kanren
+itself is only imported once a logic query (e.g. ``run(0, x, parent(x, "sue"))``
+or `ancestor`) runs, so tools that only use the indexed helpers start fast.
 """
-from .relations import (
-    parent,
-    male,
-    female,
-    children_of,
-    parents_of,
-    is_male,
-    is_female,
-    siblings_of,
-)
-from .helpers import (
-    descendants_of,
-    ancestors_of,
-    closure_from_edges,
-    assign_role,
-    assign_role_inherit,
-    has_role,
-    role_members,
-)
-
-__all__ = [
-    "parent",
-    "male",
-    "female",
-    "children_of",
-    "parents_of",
-    "is_male",
-    "is_female",
-    "siblings_of",
-    "descendants_of",
-    "ancestors_of",
-    "closure_from_edges",
-    "assign_role",
-    "assign_role_inherit",
-    "has_role",
-    "role_members",
-]
+import importlib
+from typing import TYPE_CHECKING
+
+# exported name -> submodule that defines it
+_EXPORTS = {
+    "FactStore": "store",
+    "IndexedRelation": "store",
+    "Bitmap": "bitmap",
+    "RoleIndex": "roles",
+    "TabledRelation": "tabling",
+    "tabled": "tabling",
+    "Program": "datalog",
+    "neg": "datalog",
+    "neq": "datalog",
+    "parent": "relations",
+    "male": "relations",
+    "female": "relations",
+    "children_of": "relations",
+    "parents_of": "relations",
+    "is_male": "relations",
+    "is_female": "relations",
+    "siblings_of": "relations",
+    "ancestor": "relations",
+    "descendants_of": "helpers",
+    "ancestors_of": "helpers",
+    "iter_descendants_of": "helpers",
+    "iter_ancestors_of": "helpers",
+    "facts_version": "helpers",
+    "closure_from_edges": "helpers",
+    "assign_role": "helpers",
+    "assign_role_inherit": "helpers",
+    "has_role": "helpers",
+    "has_roles": "helpers",
+    "role_members": "helpers",
+    "revoke_role": "helpers",
+    "role_inherits": "helpers",
+    "members_matching": "helpers",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:  # pragma: no cover - for type checkers and IDEs only
+    from .store import FactStore, IndexedRelation
+    from .bitmap import Bitmap
+    from .roles import RoleIndex
+    from .tabling import TabledRelation, tabled
+    from .datalog import Program, neg, neq
+    from .relations import (parent, male, female, children_of, parents_of, is_male, is_female, siblings_of,
+                            ancestor)
+    from .helpers import (descendants_of, ancestors_of, iter_descendants_of, iter_ancestors_of, facts_version,
+                          closure_from_edges, assign_role, assign_role_inherit, has_role, has_roles,
+                          role_members, revoke_role, role_inherits, members_matching)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
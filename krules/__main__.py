@@ -0,0 +1,85 @@
+"""Command line entrypoint for krules.
+
+Usage: python -m krules load parent facts.csv  (or the installed `krules` script)
+
+Facts are loaded into a fresh `FactStore`, so a ``--save`` snapshot holds only
+the loaded relation, not the demo facts of `krules.relations`.
+"""
+from __future__ import annotations
+
+import sys
+from argparse import ArgumentParser
+
+from krules.loader import FORMATS, LoadStats, load_facts
+from krules.store import FactStore
+
+
+def _report(stats: LoadStats) -> None:
+    print(
+        f"\r{stats.rows:,} rows  {stats.added:,} added  {stats.duplicates:,} duplicates  "
+        f"{stats.rate:,.0f} rows/s",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def cmd_load(args) -> int:
+    store = FactStore()
+    relation = store.relation(args.relation)
+    columns = None
+    if args.columns:
+        columns = [int(c) if c.isdigit() else c for c in args.columns.split(",")]
+    options = {"columns": columns, "header": args.header}
+    if args.delimiter:
+        options["delimiter"] = args.delimiter
+    stats = load_facts(
+        relation,
+        args.path,
+        format=args.format,
+        chunk_size=args.chunk_size,
+        progress=None if args.quiet else _report,
+        **options,
+    )
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(
+        f"{args.relation}: {stats.added} facts added, {stats.duplicates} duplicates skipped "
+        f"({stats.rows} rows in {stats.elapsed:.2f}s)"
+    )
+    if args.save:
+        from krules.snapshot import save_snapshot
+
+        save_snapshot(args.save, store, closure=args.closure, workers=args.workers)
+        print(f"snapshot written to {args.save}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = ArgumentParser(prog="krules")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    load = sub.add_parser("load", help="stream facts from a file into a relation")
+    load.add_argument("relation", help="relation name, e.g. parent")
+    load.add_argument("path", help="CSV/TSV/JSONL/Parquet file (text formats may be .gz)")
+    load.add_argument("--format", choices=FORMATS, help="override format detection")
+    load.add_argument("--delimiter", help="field delimiter for csv/tsv")
+    load.add_argument("--header", action="store_true", help="first csv/tsv row is a header")
+    load.add_argument("--columns", help="comma-separated column names or indexes to use as arguments")
+    load.add_argument("--chunk-size", type=int, default=10000)
+    load.add_argument("--quiet", action="store_true", help="no progress output")
+    load.add_argument("--save", metavar="PATH", help="write a binary snapshot of the loaded relation afterwards")
+    load.add_argument(
+        "--closure", action="append", default=[], metavar="RELATION",
+        help="precompute the closure of RELATION into the snapshot (repeatable)",
+    )
+    load.add_argument("--workers", type=int, default=None,
+                      help="processes used to compute closures (default: single process)")
+    load.set_defaults(func=cmd_load)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Compressed integer-set bitmaps in the style of Roaring bitmaps.
+
+Non-negative integer ids are split into a 16-bit *key* (``id >> 16``) and a
+16-bit *low* part. Each key owns one container holding the low parts:
+
+- a sorted ``array('H')`` while it has at most `ARRAY_MAX` entries (2 bytes
+  per member, so sparse sets stay small), or
+- a 65536-bit Python ``int`` once it grows past that (a fixed 8 KiB, and
+  union/intersection/difference run at C speed).
+
+Containers switch representation as they grow and shrink, so a bitmap over
+interned subject ids costs roughly ``min(2 * members, 8 KiB)`` per 65536 ids.
+Membership is a dict lookup plus a binary search or a single bit test.
+Containers are never modified in place, so bitmaps produced by set algebra
+can share them safely.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, Union
+
+from .closure import iter_bits
+
+# largest array container; beyond this a 65536-bit int is smaller
+ARRAY_MAX = 4096
+
+Container = Union[array, int]
+
+
+def _to_int(container: Container) -> int:
+    if isinstance(container, int):
+        return container
+    buf = bytearray(8192)
+    for v in container:
+        buf[v >> 3] |= 1 << (v & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _normalize(container: Container) -> Container:
+    """Pick the smaller representation; returns 0 or an empty array for "empty"."""
+    if isinstance(container, int):
+        if container.bit_count() <= ARRAY_MAX:
+            return array("H", iter_bits(container))
+        return container
+    if len(container) > ARRAY_MAX:
+        return _to_int(container)
+    return container
+
+
+def _filter(values: array, bits: int, keep: bool) -> array:
+    """Values of `values` whose bit in `bits` is set (`keep`) or clear (not `keep`)."""
+    data = bits.to_bytes(8192, "little")
+    return array("H", [v for v in values if bool(data[v >> 3] >> (v & 7) & 1) is keep])
+
+
+def _and(a: Container, b: Container) -> Container:
+    if isinstance(a, int):
+        if isinstance(b, int):
+            return _normalize(a & b)
+        return _filter(b, a, True)
+    if isinstance(b, int):
+        return _filter(a, b, True)
+    return array("H", sorted(set(a).intersection(b)))
+
+
+def _or(a: Container, b: Container) -> Container:
+    if isinstance(a, int) or isinstance(b, int):
+        return _to_int(a) | _to_int(b)
+    return _normalize(array("H", sorted(set(a).union(b))))
+
+
+def _sub(a: Container, b: Container) -> Container:
+    if isinstance(a, int):
+        return _normalize(a & ~_to_int(b))
+    if isinstance(b, int):
+        return _filter(a, b, False)
+    return array("H", sorted(set(a).difference(b)))
+
+
+class Bitmap:
+    """A set of non-negative ints stored as per-65536 array/bitmap containers."""
+
+    __slots__ = ("_chunks",)
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        self._chunks: Dict[int, Container] = {}
+        groups: Dict[int, set] = {}
+        for v in values:
+            groups.setdefault(v >> 16, set()).add(v & 0xFFFF)
+        for key, lows in groups.items():
+            self._chunks[key] = _normalize(array("H", sorted(lows)))
+
+    @classmethod
+    def _from_chunks(cls, chunks: Dict[int, Container]) -> "Bitmap":
+        out = cls()
+        out._chunks = {k: c for k, c in chunks.items() if c}
+        return out
+
+    # -- mutation ---------------------------------------------------------
+
+    def add(self, value: int) -> None:
+        key, low = value >> 16, value & 0xFFFF
+        container = self._chunks.get(key)
+        if container is None:
+            self._chunks[key] = array("H", (low,))
+        elif isinstance(container, int):
+            self._chunks[key] = container | 1 << low
+        else:
+            pos = bisect_left(container, low)
+            if pos == len(container) or container[pos] != low:
+                grown = container[:pos]
+                grown.append(low)
+                grown.extend(container[pos:])
+                self._chunks[key] = grown if len(grown) <= ARRAY_MAX else _to_int(grown)
+
+    def discard(self, value: int) -> None:
+        key, low = value >> 16, value & 0xFFFF
+        container = self._chunks.get(key)
+        if container is None:
+            return
+        if isinstance(container, int):
+            container = _normalize(container & ~(1 << low))
+        else:
+            pos = bisect_left(container, low)
+            if pos < len(container) and container[pos] == low:
+                container = container[:pos] + container[pos + 1:]
+        if container:
+            self._chunks[key] = container
+        else:
+            del self._chunks[key]
+
+    # -- queries ----------------------------------------------------------
+
+    def __contains__(self, value: object) -> bool:
+        if not isinstance(value, int) or value < 0:
+            return False
+        container = self._chunks.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        pos = bisect_left(container, low)
+        return pos < len(container) and container[pos] == low
+
+    def __iter__(self) -> Iterator[int]:
+        for key in sorted(self._chunks):
+            base = key << 16
+            container = self._chunks[key]
+            lows = iter_bits(container) if isinstance(container, int) else container
+            for low in lows:
+                yield base | low
+
+    def __len__(self) -> int:
+        return sum(c.bit_count() if isinstance(c, int) else len(c) for c in self._chunks.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._chunks)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Bitmap):
+            return NotImplemented
+        if self._chunks.keys() != other._chunks.keys():
+            return False
+        return all(_to_int(c) == _to_int(other._chunks[k]) for k, c in self._chunks.items())
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Bitmap({list(self)!r})"
+
+    # -- set algebra ------------------------------------------------------
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        ours, theirs = self._chunks, other._chunks
+        if len(theirs) < len(ours):
+            ours, theirs = theirs, ours
+        return Bitmap._from_chunks({k: _and(c, theirs[k]) for k, c in ours.items() if k in theirs})
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        chunks = dict(self._chunks)
+        for k, c in other._chunks.items():
+            mine = chunks.get(k)
+            chunks[k] = c if mine is None else _or(mine, c)
+        return Bitmap._from_chunks(chunks)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        theirs = other._chunks
+        return Bitmap._from_chunks({
+            k: (_sub(c, theirs[k]) if k in theirs else c) for k, c in self._chunks.items()
+        })
+
+    def copy(self) -> "Bitmap":
+        return Bitmap._from_chunks(self._chunks)
+
+    @classmethod
+    def union(cls, bitmaps: Iterable["Bitmap"]) -> "Bitmap":
+        """OR many bitmaps, merging each key's containers once."""
+        groups: Dict[int, list] = {}
+        for bitmap in bitmaps:
+            for k, c in bitmap._chunks.items():
+                groups.setdefault(k, []).append(c)
+        chunks: Dict[int, Container] = {}
+        for k, containers in groups.items():
+            if len(containers) == 1:
+                chunks[k] = containers[0]
+            elif any(isinstance(c, int) for c in containers) or sum(map(len, containers)) > ARRAY_MAX:
+                bits = 0
+                for c in containers:
+                    bits |= _to_int(c)
+                chunks[k] = _normalize(bits)
+            else:
+                merged = set()
+                for c in containers:
+                    merged.update(c)
+                chunks[k] = array("H", sorted(merged))
+        return cls._from_chunks(chunks)
@@ -0,0 +1,490 @@
+"""Bitset-backed transitive closure engine.
+
+Node names are interned to dense integer ids and reachability is stored as one
+packed bitset per strongly connected component (a plain Python ``int`` — bit
+``i`` set means node ``i`` is reachable). Closure is computed by condensing the
+graph with Tarjan's algorithm and sweeping the components in reverse
+topological order, so each component's reachability is the OR of its
+successors' rows. The result is exposed through `ClosureView`, a read-only
+mapping that decodes a node's row into a ``set`` of names only when asked.
+"""
+from __future__ import annotations
+
+from typing import Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from . import stats
+
+# For every byte value, the positions of its set bits (used to decode rows).
+_BYTE_BITS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(i for i in range(8) if value >> i & 1) for value in range(256)
+)
+
+
+# Maps every non-zero byte to 1 so set bytes can be located with bytes.find.
+_NONZERO = bytes([0] + [1] * 255)
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Yield the positions of the set bits in `bits`, lowest first."""
+    if not bits:
+        return
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    # find() skips runs of zero bytes at C speed; sparse rows are the common case
+    marks = data.translate(_NONZERO)
+    offset = marks.find(1)
+    while offset != -1:
+        base = offset << 3
+        for i in _BYTE_BITS[data[offset]]:
+            yield base + i
+        offset = marks.find(1, offset + 1)
+
+
+class Interner:
+    """Bidirectional mapping between node names and dense integer ids."""
+
+    def __init__(self, names: Iterable[Hashable] = ()) -> None:
+        self._ids: Dict[Hashable, int] = {}
+        self._names: List[Hashable] = []
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name: Hashable) -> int:
+        """Return the id for `name`, allocating a new one if needed."""
+        i = self._ids.get(name)
+        if i is None:
+            i = len(self._names)
+            self._ids[name] = i
+            self._names.append(name)
+        return i
+
+    def id_of(self, name: Hashable) -> Optional[int]:
+        return self._ids.get(name)
+
+    def name_of(self, i: int) -> Hashable:
+        return self._names[i]
+
+    def names(self, bits: int) -> Iterator[Hashable]:
+        """Decode a bitset of ids into names."""
+        names = self._names
+        for i in iter_bits(bits):
+            yield names[i]
+
+    def bits(self, names: Iterable[Hashable]) -> int:
+        """Encode known `names` as a bitset; unknown names are ignored."""
+        out = 0
+        ids = self._ids
+        for name in names:
+            i = ids.get(name)
+            if i is not None:
+                out |= 1 << i
+        return out
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._ids
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._names)
+
+
+def strongly_connected_components(adj: List[List[int]]) -> List[List[int]]:
+    """Tarjan's SCC algorithm (iterative) over an integer adjacency list.
+
+    Components are returned in reverse topological order: every edge leaving a
+    component points at a component that appears earlier in the result.
+    """
+    n = len(adj)
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(adj[root]))]
+        while work:
+            node, successors = work[-1]
+            advanced = False
+            for succ in successors:
+                if index[succ] == -1:
+                    index[succ] = low[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack[succ] = True
+                    work.append((succ, iter(adj[succ])))
+                    advanced = True
+                    break
+                if on_stack[succ] and index[succ] < low[node]:
+                    low[node] = index[succ]
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if low[node] < low[parent]:
+                    low[parent] = low[node]
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+class ClosureView(Mapping):
+    """Read-only ``Mapping[str, Set[str]]`` over packed reachability rows.
+
+    Rows are decoded to sets on first access and cached, so building the view
+    is cheap even when the full closure would not fit in memory as Python sets.
+    Use `bits`, `reaches` and `count` to query without decoding.
+    """
+
+    def __init__(self, interner: Interner, component_of: List[int], rows: List[int]) -> None:
+        self._interner = interner
+        self._component_of = component_of
+        self._rows = rows
+        self._decoded: Dict[Hashable, Set[Hashable]] = {}
+
+    @property
+    def interner(self) -> Interner:
+        return self._interner
+
+    def bits(self, node: Hashable) -> int:
+        """Return the reachability bitset of `node` (ids from `interner`)."""
+        i = self._interner.id_of(node)
+        if i is None:
+            raise KeyError(node)
+        return self._rows[self._component_of[i]]
+
+    def reaches(self, source: Hashable, target: Hashable) -> bool:
+        """True if `target` is reachable from `source` by one or more edges."""
+        i = self._interner.id_of(source)
+        j = self._interner.id_of(target)
+        if i is None or j is None:
+            return False
+        return bool(self._rows[self._component_of[i]] >> j & 1)
+
+    def count(self, node: Hashable) -> int:
+        """Number of nodes reachable from `node`."""
+        return self.bits(node).bit_count()
+
+    def __getitem__(self, node: Hashable) -> Set[Hashable]:
+        reach = self._decoded.get(node)
+        if reach is None:
+            reach = set(self._interner.names(self.bits(node)))
+            self._decoded[node] = reach
+        return reach
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._interner
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._interner)
+
+    def __len__(self) -> int:
+        return len(self._interner)
+
+    def __repr__(self) -> str:
+        return f"<ClosureView nodes={len(self)}>"
+
+
+def transitive_closure(edges: Iterable[Tuple[Hashable, Hashable]]) -> ClosureView:
+    """Compute the transitive closure of a directed graph given as edges.
+
+    A node reaches itself only if it lies on a cycle (including a self loop),
+    matching the semantics of the original ``closure_from_edges``.
+    """
+    interner = Interner()
+    adj: List[List[int]] = []
+    intern = interner.intern
+    for a, b in edges:
+        i = intern(a)
+        j = intern(b)
+        while len(adj) < len(interner):
+            adj.append([])
+        adj[i].append(j)
+
+    components = strongly_connected_components(adj)
+    component_of = [0] * len(adj)
+    for c, members in enumerate(components):
+        for member in members:
+            component_of[member] = c
+
+    # Components come out sinks-first, so successors are final before use.
+    masks: List[int] = []
+    rows: List[int] = []
+    for c, members in enumerate(components):
+        mask = 0
+        for member in members:
+            mask |= 1 << member
+        successors = {component_of[succ] for member in members for succ in adj[member]}
+        cyclic = len(members) > 1 or c in successors
+        successors.discard(c)
+        row = 0
+        for d in successors:
+            row |= masks[d] | rows[d]
+        if cyclic:
+            row |= mask
+        masks.append(mask)
+        rows.append(row)
+    return ClosureView(interner, component_of, rows)
+
+
+class ClosureIndex:
+    """Materialized descendant/ancestor bitsets for a binary relation.
+
+    The index is built once from the relation's facts and then kept in sync
+    through the owning `FactStore`'s change notifications: adding an edge ORs
+    the new reachability into the affected rows, and retracting one re-sweeps
+    only the rows that could have depended on it (the old ancestors of the
+    edge's source for descendants, the old descendants of its target for
+    ancestors). Decoded answers are cached per node until a change touches them.
+
+    If the relation sits on a snapshot that carries a precomputed closure (see
+    `krules.snapshot`), queries are answered from the mapped arrays until the
+    first change, at which point the bitsets are built.
+
+    With ``workers`` > 1, full (re)builds compute the rows on that many
+    processes (see `krules.parallel`); incremental updates stay in-process.
+    """
+
+    def __init__(self, relation, *, workers: Optional[int] = None) -> None:
+        self._relation = relation
+        self.workers = workers
+        # bumped whenever reachability may have changed; lets dependents
+        # (e.g. `krules.roles.RoleIndex`) know when to drop derived caches
+        self.version = 0
+        self._build()
+        if relation.store is not None:
+            relation.store.subscribe(self._on_change)
+
+    def _build(self, use_mapped: bool = True) -> None:
+        self.version += 1
+        self.interner = Interner()
+        self._succ: List[Set[int]] = []
+        self._pred: List[Set[int]] = []
+        self._desc: List[int] = []
+        self._anc: List[int] = []
+        self._desc_cache: Dict[int, Tuple[Hashable, ...]] = {}
+        self._anc_cache: Dict[int, Tuple[Hashable, ...]] = {}
+        # A snapshot base layer may carry a precomputed closure; serve from it
+        # until the relation is modified, then materialize.
+        base = getattr(self._relation, "base", None)
+        mapped = getattr(base, "closure", None) if use_mapped else None
+        self._mapped = mapped if mapped is not None and not self._relation.modified else None
+        if self._mapped is not None:
+            return
+        if self.workers is not None and self.workers > 1:
+            self._build_parallel()
+            return
+        for a, b in self._relation.facts:
+            i = self._node(a)
+            j = self._node(b)
+            self._succ[i].add(j)
+            self._pred[j].add(i)
+        everything = (1 << len(self.interner)) - 1
+        self._resweep(everything, self._succ, self._desc)
+        self._resweep(everything, self._pred, self._anc)
+
+    def _build_parallel(self) -> None:
+        from .parallel import component_order, reachability_rows
+
+        facts = list(self._relation.facts)
+        scratch = Interner()
+        adj: List[List[int]] = []
+        for a, b in facts:
+            i, j = scratch.intern(a), scratch.intern(b)
+            while len(adj) < len(scratch):
+                adj.append([])
+            adj[i].append(j)
+        # number nodes so each group of weakly connected components is a
+        # contiguous id range; the ranges are closed under both directions
+        order, ranges = component_order(adj, self.workers * 4)
+        for old in order:
+            self._node(scratch.name_of(old))
+        for a, b in facts:
+            i, j = self.interner.id_of(a), self.interner.id_of(b)
+            self._succ[i].add(j)
+            self._pred[j].add(i)
+        self._desc[:] = reachability_rows(self._succ, ranges, compact=True, workers=self.workers)
+        self._anc[:] = reachability_rows(self._pred, ranges, compact=True, workers=self.workers)
+
+    def _materialize(self) -> None:
+        if self._mapped is not None:
+            self._build(use_mapped=False)
+
+    def close(self) -> None:
+        """Stop tracking changes to the underlying relation."""
+        if self._relation.store is not None:
+            self._relation.store.unsubscribe(self._on_change)
+
+    # -- queries ----------------------------------------------------------
+
+    def descendants(self, node: Hashable) -> Tuple[Hashable, ...]:
+        """All nodes reachable from `node` (cached; do not mutate)."""
+        if self._mapped is not None:
+            return self._mapped.descendants(node)
+        return self._decoded(node, self._desc, self._desc_cache)
+
+    def ancestors(self, node: Hashable) -> Tuple[Hashable, ...]:
+        """All nodes that reach `node` (cached; do not mutate)."""
+        if self._mapped is not None:
+            return self._mapped.ancestors(node)
+        return self._decoded(node, self._anc, self._anc_cache)
+
+    def iter_descendants(self, node: Hashable) -> Iterator[Hashable]:
+        """Lazily yield the nodes reachable from `node`, decoding the row as it goes."""
+        return self._iter(node, self._desc, self._desc_cache, "descendants")
+
+    def iter_ancestors(self, node: Hashable) -> Iterator[Hashable]:
+        """Lazily yield the nodes that reach `node`."""
+        return self._iter(node, self._anc, self._anc_cache, "ancestors")
+
+    def _iter(self, node: Hashable, rows: List[int], cache: Dict[int, Tuple[Hashable, ...]],
+              mapped: str) -> Iterator[Hashable]:
+        if self._mapped is not None:
+            return iter(getattr(self._mapped, mapped)(node))
+        i = self.interner.id_of(node)
+        if i is None:
+            return iter(())
+        answer = cache.get(i)
+        if answer is not None:
+            return iter(answer)
+        # the row int is immutable, so later edge updates do not disturb the iterator
+        return self.interner.names(rows[i])
+
+    def descendant_bits(self, node: Hashable) -> int:
+        self._materialize()
+        i = self.interner.id_of(node)
+        return 0 if i is None else self._desc[i]
+
+    def ancestor_bits(self, node: Hashable) -> int:
+        self._materialize()
+        i = self.interner.id_of(node)
+        return 0 if i is None else self._anc[i]
+
+    def reaches(self, source: Hashable, target: Hashable) -> bool:
+        if self._mapped is not None:
+            return self._mapped.reaches(source, target)
+        i = self.interner.id_of(source)
+        j = self.interner.id_of(target)
+        if i is None or j is None:
+            return False
+        return bool(self._desc[i] >> j & 1)
+
+    def _decoded(self, node: Hashable, rows: List[int], cache: Dict[int, Tuple[Hashable, ...]]) -> Tuple[Hashable, ...]:
+        i = self.interner.id_of(node)
+        if i is None:
+            return ()
+        answer = cache.get(i)
+        if answer is None:
+            if stats.ENABLED:
+                stats.cache_miss("closure")
+            answer = tuple(self.interner.names(rows[i]))
+            cache[i] = answer
+        elif stats.ENABLED:
+            stats.cache_hit("closure")
+        return answer
+
+    # -- maintenance ------------------------------------------------------
+
+    def _node(self, name: Hashable) -> int:
+        i = self.interner.intern(name)
+        if i == len(self._succ):
+            self._succ.append(set())
+            self._pred.append(set())
+            self._desc.append(0)
+            self._anc.append(0)
+        return i
+
+    def _on_change(self, relation, fact, added: bool) -> None:
+        if relation is not self._relation:
+            return
+        if fact is None:
+            self._build()
+            return
+        if self._mapped is not None:
+            # the relation already reflects the change; stop using the snapshot
+            self._build(use_mapped=False)
+            return
+        a, b = fact
+        if added:
+            self.add_edge(a, b)
+        else:
+            self.remove_edge(a, b)
+
+    def add_edge(self, a: Hashable, b: Hashable) -> None:
+        self.version += 1
+        u = self._node(a)
+        v = self._node(b)
+        self._succ[u].add(v)
+        self._pred[v].add(u)
+        if self._desc[u] >> v & 1:
+            return  # already reachable: closure unchanged
+        sources = self._anc[u] | 1 << u
+        targets = self._desc[v] | 1 << v
+        for s in iter_bits(sources):
+            self._desc[s] |= targets
+            self._desc_cache.pop(s, None)
+        for t in iter_bits(targets):
+            self._anc[t] |= sources
+            self._anc_cache.pop(t, None)
+
+    def remove_edge(self, a: Hashable, b: Hashable) -> None:
+        u = self.interner.id_of(a)
+        v = self.interner.id_of(b)
+        if u is None or v is None or v not in self._succ[u]:
+            return
+        self.version += 1
+        self._succ[u].discard(v)
+        self._pred[v].discard(u)
+        sources = self._anc[u] | 1 << u
+        targets = self._desc[v] | 1 << v
+        self._resweep(sources, self._succ, self._desc)
+        self._resweep(targets, self._pred, self._anc)
+        for s in iter_bits(sources):
+            self._desc_cache.pop(s, None)
+        for t in iter_bits(targets):
+            self._anc_cache.pop(t, None)
+
+    @staticmethod
+    def _resweep(affected: int, adj: List[Set[int]], rows: List[int]) -> None:
+        """Recompute `rows` for the `affected` nodes from their successors.
+
+        Rows outside `affected` must already be correct. The affected subgraph
+        is condensed and swept sinks-first, as in `transitive_closure`.
+        """
+        nodes = list(iter_bits(affected))
+        local = {node: k for k, node in enumerate(nodes)}
+        local_adj = [[local[s] for s in adj[node] if s in local] for node in nodes]
+        component_of: Dict[int, int] = {}
+        for c, component in enumerate(strongly_connected_components(local_adj)):
+            members = [nodes[k] for k in component]
+            for m in members:
+                component_of[m] = c
+            row = 0
+            cyclic = len(members) > 1
+            for m in members:
+                for s in adj[m]:
+                    if component_of.get(s) == c:
+                        cyclic = True
+                    else:
+                        row |= 1 << s | rows[s]
+            if cyclic:
+                for m in members:
+                    row |= 1 << m
+            for m in members:
+                rows[m] = row
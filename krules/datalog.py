@@ -0,0 +1,383 @@
+"""Bottom-up, semi-naive Datalog evaluation over a `FactStore`.
+
+Rules are written with kanren variables. An atom is a tuple whose first
+element is a relation name (or an `IndexedRelation`) followed by its
+arguments; arguments that are not variables are constants::
+
+    X, Y, Z, P = var("X"), var("Y"), var("Z"), var("P")
+    program = Program(store)
+    program.rule(("ancestor", X, Y), ("parent", X, Y))
+    program.rule(("ancestor", X, Z), ("ancestor", X, Y), ("parent", Y, Z))
+    program.rule(("sibling", X, Y), ("parent", P, X), ("parent", P, Y), neq(X, Y))
+    program.rule(("son", X, P), ("parent", P, X), neg(("female", X)))
+    program.evaluate()
+    store["ancestor"].project(0, "bob", 1)
+
+`evaluate` splits the derived (head) relations into strata by their
+dependencies, evaluates each recursive group with semi-naive iteration (every
+round only joins against the facts derived in the previous round) using hash
+joins on per-position indexes, and writes each derived relation back into the
+store with `IndexedRelation.replace`, so queries afterwards are plain index
+lookups. Derived relations are overwritten on every `evaluate`; keep base
+facts in relations that no rule derives. Negated atoms (`neg`) must refer to
+base relations or relations computed in an earlier stratum; `neq` compares
+two bound terms.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from unification import isvar
+
+from .closure import strongly_connected_components
+from .store import Fact, FactStore, IndexedRelation
+
+
+class StratificationError(ValueError):
+    """A relation depends negatively on itself (through recursion)."""
+
+
+class Atom:
+    __slots__ = ("name", "args")
+
+    def __init__(self, name: str, args: Tuple[Any, ...]) -> None:
+        self.name = name
+        self.args = args
+
+    @classmethod
+    def of(cls, atom: Any) -> "Atom":
+        if isinstance(atom, Atom):
+            return atom
+        if not isinstance(atom, tuple) or not atom:
+            raise TypeError(f"expected an atom tuple (relation, *args), got {atom!r}")
+        head, *args = atom
+        name = head.name if isinstance(head, IndexedRelation) else head
+        if not isinstance(name, str):
+            raise TypeError(f"atom must start with a relation or relation name, got {head!r}")
+        return cls(name, tuple(args))
+
+    def variables(self) -> Set[Any]:
+        return {a for a in self.args if isvar(a)}
+
+    def __repr__(self) -> str:
+        return f"{self.name}{self.args!r}"
+
+
+class Negation:
+    """``neg(atom)``: succeeds when the (fully bound) atom is not a fact."""
+
+    __slots__ = ("atom",)
+
+    def __init__(self, atom: Atom) -> None:
+        self.atom = atom
+
+    def variables(self) -> Set[Any]:
+        return self.atom.variables()
+
+    def __repr__(self) -> str:
+        return f"neg({self.atom!r})"
+
+
+class Inequality:
+    """``neq(a, b)``: succeeds when the two bound terms differ."""
+
+    __slots__ = ("left", "right")
+
+    def __init__(self, left: Any, right: Any) -> None:
+        self.left = left
+        self.right = right
+
+    def variables(self) -> Set[Any]:
+        return {t for t in (self.left, self.right) if isvar(t)}
+
+    def __repr__(self) -> str:
+        return f"neq({self.left!r}, {self.right!r})"
+
+
+def neg(atom: Any) -> Negation:
+    return Negation(Atom.of(atom))
+
+
+def neq(left: Any, right: Any) -> Inequality:
+    return Inequality(left, right)
+
+
+class Rule:
+    """``head :- body``; checked for range restriction on construction."""
+
+    def __init__(self, head: Any, body: Iterable[Any]) -> None:
+        self.head = Atom.of(head)
+        self.atoms: List[Atom] = []
+        self.filters: List[Any] = []
+        for literal in body:
+            if isinstance(literal, (Negation, Inequality)):
+                self.filters.append(literal)
+            else:
+                self.atoms.append(Atom.of(literal))
+        if not self.atoms:
+            raise ValueError(f"rule for {self.head!r} needs at least one positive atom")
+        bound: Set[Any] = set()
+        for atom in self.atoms:
+            bound |= atom.variables()
+        for part in [self.head, *self.filters]:
+            unbound = part.variables() - bound
+            if unbound:
+                raise ValueError(f"unsafe rule: {sorted(map(str, unbound))} in {part!r} "
+                                 f"do not occur in a positive body atom")
+        self._plans: Dict[Optional[int], "_Plan"] = {}
+
+    def plan(self, delta_at: Optional[int]) -> "_Plan":
+        """The compiled join for this rule with atom `delta_at` evaluated first."""
+        plan = self._plans.get(delta_at)
+        if plan is None:
+            plan = self._plans[delta_at] = _Plan(self, delta_at)
+        return plan
+
+    def __repr__(self) -> str:
+        body = ", ".join(map(repr, [*self.atoms, *self.filters]))
+        return f"{self.head!r} :- {body}"
+
+
+class _Table:
+    """An in-memory relation with the lookup interface of `IndexedRelation`."""
+
+    def __init__(self, arity: int) -> None:
+        self.facts: Dict[Fact, None] = {}
+        self._index: List[Dict[Hashable, List[Fact]]] = [{} for _ in range(arity)]
+
+    def add(self, fact: Fact) -> bool:
+        if fact in self.facts:
+            return False
+        self.facts[fact] = None
+        for position, value in enumerate(fact):
+            self._index[position].setdefault(value, []).append(fact)
+        return True
+
+    def lookup(self, position: int, value: Hashable) -> Iterable[Fact]:
+        if position >= len(self._index):
+            return ()
+        return self._index[position].get(value, ())
+
+    def count(self, position: int, value: Hashable) -> int:
+        if position >= len(self._index):
+            return 0
+        return len(self._index[position].get(value, ()))
+
+    def __contains__(self, fact: object) -> bool:
+        return fact in self.facts
+
+    def __iter__(self) -> Iterator[Fact]:
+        return iter(self.facts)
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+
+_NOTHING = _Table(0)
+
+
+class Program:
+    """A set of Datalog rules evaluated into the relations of `store`."""
+
+    def __init__(self, store: FactStore) -> None:
+        self.store = store
+        self.rules: List[Rule] = []
+
+    def rule(self, head: Any, *body: Any) -> Rule:
+        """Add ``head :- body`` and return it."""
+        rule = Rule(head, body)
+        arities = {r.head.name: len(r.head.args) for r in self.rules}
+        if arities.get(rule.head.name, len(rule.head.args)) != len(rule.head.args):
+            raise ValueError(f"{rule.head.name} is already derived with arity {arities[rule.head.name]}")
+        self.rules.append(rule)
+        return rule
+
+    def derived(self) -> List[str]:
+        return list(dict.fromkeys(r.head.name for r in self.rules))
+
+    def strata(self) -> List[List[str]]:
+        """Groups of derived relations in evaluation order.
+
+        Each group is a strongly connected component of the dependency graph;
+        raises StratificationError if a negated dependency lies on a cycle.
+        """
+        names = self.derived()
+        ids = {name: i for i, name in enumerate(names)}
+        adj: List[List[int]] = [[] for _ in names]
+        negative: List[Tuple[int, int]] = []
+        for rule in self.rules:
+            h = ids[rule.head.name]
+            for atom in rule.atoms:
+                if atom.name in ids:
+                    adj[h].append(ids[atom.name])
+            for f in rule.filters:
+                if isinstance(f, Negation) and f.atom.name in ids:
+                    adj[h].append(ids[f.atom.name])
+                    negative.append((h, ids[f.atom.name]))
+        # dependencies come first: edges point at components earlier in the list
+        components = strongly_connected_components(adj)
+        component_of = {node: c for c, comp in enumerate(components) for node in comp}
+        for h, b in negative:
+            if component_of[h] == component_of[b]:
+                raise StratificationError(f"{names[h]} depends negatively on {names[b]} through recursion")
+        return [[names[i] for i in sorted(comp)] for comp in components]
+
+    def evaluate(self) -> Dict[str, int]:
+        """Compute every derived relation and store it; returns fact counts."""
+        counts: Dict[str, int] = {}
+        for stratum in self.strata():
+            tables = self._fixpoint(stratum)
+            for name in stratum:
+                relation = self.store.relation(name, len(self._head_args(name)))
+                relation.replace(tables[name].facts)
+                counts[name] = len(relation)
+        return counts
+
+    # -- evaluation -------------------------------------------------------
+
+    def _head_args(self, name: str) -> Tuple[Any, ...]:
+        return next(r.head.args for r in self.rules if r.head.name == name)
+
+    def _fixpoint(self, stratum: List[str]) -> Dict[str, _Table]:
+        local = set(stratum)
+        rules = [r for r in self.rules if r.head.name in local]
+        full = {name: _Table(len(self._head_args(name))) for name in stratum}
+
+        # round 0: every rule against the facts known so far (none for `local`)
+        delta = {name: _Table(len(self._head_args(name))) for name in stratum}
+        for rule in rules:
+            # collected before adding: the rule may scan the table it adds to
+            for fact in self._fire(rule, full, None, None):
+                if full[rule.head.name].add(fact):
+                    delta[rule.head.name].add(fact)
+
+        recursive = [(r, [i for i, a in enumerate(r.atoms) if a.name in local]) for r in rules]
+        recursive = [(r, positions) for r, positions in recursive if positions]
+        while any(delta.values()) and recursive:
+            fresh = {name: _Table(len(self._head_args(name))) for name in stratum}
+            for rule, positions in recursive:
+                for i in positions:
+                    if not delta[rule.atoms[i].name]:
+                        continue
+                    for fact in self._fire(rule, full, delta, i):
+                        if fact not in full[rule.head.name]:
+                            fresh[rule.head.name].add(fact)
+            for name, table in fresh.items():
+                for fact in table:
+                    full[name].add(fact)
+            delta = fresh
+        return full
+
+    def _source(self, name: str, full: Dict[str, _Table]):
+        table = full.get(name)
+        if table is not None:
+            return table
+        if name in self.store:
+            return self.store[name]
+        return _NOTHING
+
+    def _fire(self, rule: Rule, full: Dict[str, _Table], delta: Optional[Dict[str, _Table]],
+              delta_at: Optional[int]) -> List[Fact]:
+        """Return the head facts of `rule`; atom `delta_at` reads from `delta`."""
+        plan = rule.plan(delta_at)
+        sources = [delta[step.name] if i == 0 and delta_at is not None else self._source(step.name, full)
+                   for i, step in enumerate(plan.steps)]
+        negated = [[self._source(name, full) if name is not None else None for name, _ in step.filters]
+                   for step in plan.steps]
+        env: List[Hashable] = [None] * plan.slots
+        out: List[Fact] = []
+        head = plan.head
+        last = len(plan.steps)
+
+        def join(k: int) -> None:
+            if k == last:
+                out.append(tuple(env[slot] if slot is not None else const for slot, const in head))
+                return
+            step = plan.steps[k]
+            source = sources[k]
+            keys = [(pos, env[slot] if slot is not None else const) for pos, slot, const in step.keys]
+            if keys:
+                # probe the index of the most selective bound position
+                best = min(keys, key=lambda kv: source.count(*kv)) if len(keys) > 1 else keys[0]
+                candidates = source.lookup(*best)
+            else:
+                candidates = source
+            for fact in candidates:
+                if any(fact[pos] != value for pos, value in keys):
+                    continue
+                for pos, slot in step.binds:
+                    env[slot] = fact[pos]
+                if any(fact[pos] != env[slot] for pos, slot in step.repeats):
+                    continue
+                if step.filters and not _filters_hold(step.filters, negated[k], env):
+                    continue
+                join(k + 1)
+
+        join(0)
+        return out
+
+
+class _Step:
+    """One atom of a compiled join: how to probe it and which slots it binds."""
+
+    __slots__ = ("name", "keys", "binds", "repeats", "filters")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        # (position, slot or None, constant) that must match before binding
+        self.keys: List[Tuple[int, Optional[int], Hashable]] = []
+        # (position, slot) written from the fact
+        self.binds: List[Tuple[int, int]] = []
+        # (position, slot) for a variable repeated within this atom
+        self.repeats: List[Tuple[int, int]] = []
+        # (negated relation name or None for neq, operands) checked once bound
+        self.filters: List[Tuple[Any, ...]] = []
+
+
+class _Plan:
+    __slots__ = ("steps", "slots", "head")
+
+    def __init__(self, rule: Rule, delta_at: Optional[int]) -> None:
+        order = list(range(len(rule.atoms)))
+        if delta_at is not None:
+            # start from the (small) delta so every later join is an index probe
+            order.remove(delta_at)
+            order.insert(0, delta_at)
+        slot_of: Dict[Any, int] = {}
+        pending = list(rule.filters)
+        self.steps: List[_Step] = []
+        for i in order:
+            atom = rule.atoms[i]
+            step = _Step(atom.name)
+            fresh: Dict[Any, int] = {}
+            for pos, arg in enumerate(atom.args):
+                if not isvar(arg):
+                    step.keys.append((pos, None, arg))
+                elif arg in slot_of:
+                    step.keys.append((pos, slot_of[arg], None))
+                elif arg in fresh:
+                    step.repeats.append((pos, fresh[arg]))
+                else:
+                    fresh[arg] = len(slot_of) + len(fresh)
+                    step.binds.append((pos, fresh[arg]))
+            slot_of.update(fresh)
+            # run each filter right after the atom that binds its last variable
+            for f in [f for f in pending if f.variables() <= slot_of.keys()]:
+                pending.remove(f)
+                terms = (f.left, f.right) if isinstance(f, Inequality) else f.atom.args
+                operands = tuple((slot_of[t], None) if isvar(t) else (None, t) for t in terms)
+                step.filters.append((f.atom.name if isinstance(f, Negation) else None, operands))
+            self.steps.append(step)
+        self.slots = len(slot_of)
+        self.head = [(slot_of[a], None) if isvar(a) else (None, a) for a in rule.head.args]
+
+
+def _filters_hold(filters, negated, env: List[Hashable]) -> bool:
+    for (name, operands), source in zip(filters, negated):
+        values = tuple(env[slot] if slot is not None else const for slot, const in operands)
+        if name is not None:
+            if values in source:
+                return False
+        elif values[0] == values[1]:
+            return False
+    return True
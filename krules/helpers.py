@@ -6,89 +6,139 @@ store or a more advanced rule engine.
 """
 from __future__ import annotations
 
-from typing import Iterable, Set, Tuple, Dict, List
+from itertools import islice
+from typing import Iterable, Iterator, Set, Tuple, List, Mapping, Optional
 
-from kanren import run, var
-from .relations import parent
+from .relations import parent, store
+from .closure import ClosureIndex, transitive_closure
+from .roles import RoleIndex
+from .stats import instrumented
 
 
-def closure_from_edges(edges: Iterable[Tuple[str, str]]) -> Dict[str, Set[str]]:
+@instrumented
+def closure_from_edges(edges: Iterable[Tuple[str, str]], workers: Optional[int] = None) -> Mapping[str, Set[str]]:
     """Compute the transitive closure for a directed graph represented as edges.
 
-    Returns a mapping node -> set(reachable nodes).
+    Returns a read-only mapping node -> set(reachable nodes). Reachability is
+    held as packed bitsets (see `krules.closure`) and each node's set is only
+    built when it is looked up. With `workers` > 1 the closure is computed on
+    that many processes (see `krules.parallel`).
     """
-    # Build adjacency list
-    adj: Dict[str, Set[str]] = {}
-    for a, b in edges:
-        adj.setdefault(a, set()).add(b)
-        adj.setdefault(b, set())
-
-    # Floyd-Warshall style expansion (simple, small graphs only)
-    nodes = list(adj.keys())
-    reach = {n: set(adj.get(n, set())) for n in nodes}
-    for k in nodes:
-        for i in nodes:
-            if k in reach[i]:
-                reach[i].update(reach[k])
-    return reach
+    if workers is not None and workers > 1:
+        from .parallel import parallel_closure
 
+        return parallel_closure(edges, workers)
+    return transitive_closure(edges)
 
-def descendants_of(person: str) -> List[str]:
-    """Return all descendants (transitive children) of a person using kanren queries.
 
-    For small trees this is fine; for large data prefer a graph DB or a cached closure.
+_ancestry: Optional[ClosureIndex] = None
+
+
+def ancestry(workers: Optional[int] = None) -> ClosureIndex:
+    """Return the materialized closure index over the `parent` facts.
+
+    Built on first use (on `workers` processes if more than one) and kept up
+    to date incrementally as `parent` facts are added or retracted.
     """
-    # naive breadth-first using children_of from relations
-    from .relations import children_of
+    global _ancestry
+    if _ancestry is None:
+        _ancestry = ClosureIndex(parent, workers=workers)
+    return _ancestry
 
-    seen = set()
-    queue = list(children_of(person))
-    while queue:
-        c = queue.pop(0)
-        if c in seen:
-            continue
-        seen.add(c)
-        queue.extend(children_of(c))
-    return list(seen)
+
+@instrumented
+def descendants_of(person: str) -> List[str]:
+    """Return all descendants (transitive children) of a person.
+
+    Answered from the cached closure index; `ancestry().descendants(person)`
+    returns the shared tuple without copying.
+    """
+    return list(ancestry().descendants(person))
 
 
+@instrumented
 def ancestors_of(person: str) -> List[str]:
-    from .relations import parents_of
+    return list(ancestry().ancestors(person))
+
+
+def iter_descendants_of(person: str, offset: int = 0, limit: Optional[int] = None) -> Iterator[str]:
+    """Yield descendants of a person one at a time, skipping `offset` and stopping after `limit`.
+
+    Names are decoded from the closure row lazily, so the first ones are
+    available before the rest of the row has been read.
+    """
+    return _window(ancestry().iter_descendants(person), offset, limit)
+
+
+def iter_ancestors_of(person: str, offset: int = 0, limit: Optional[int] = None) -> Iterator[str]:
+    return _window(ancestry().iter_ancestors(person), offset, limit)
+
+
+def _window(items: Iterator[str], offset: int, limit: Optional[int]) -> Iterator[str]:
+    return islice(items, offset, None if limit is None else offset + limit)
 
-    seen = set()
-    queue = list(parents_of(person))
-    while queue:
-        p = queue.pop(0)
-        if p in seen:
-            continue
-        seen.add(p)
-        queue.extend(parents_of(p))
-    return list(seen)
 
+# Role assignments, resolved against the `parent` ancestry for inherited roles.
+# Replace with a datastore-backed index if assignments must persist.
+roles = RoleIndex(ancestry)
 
-# Simple in-memory role assignments. You can replace this with a datastore.
-_roles: Dict[str, Set[str]] = {}
+
+def facts_version() -> int:
+    """Change counter for the `parent` fact store and the role assignments.
+
+    It grows whenever a fact or role changes, so caches of rule answers (e.g.
+    `mcp.cache.ResponseCache`) can tell when they are stale.
+    """
+    return store.version + roles.version
 
 
 def assign_role(role: str, subject: str) -> None:
-    _roles.setdefault(role, set()).add(subject)
+    roles.assign(role, subject)
 
 
 def assign_role_inherit(role: str, subject: str) -> None:
-    """Assign role and inherit it to role-membership of descendants.
+    """Assign role to `subject` and, through the ancestry, to its descendants.
 
-    For example, assigning 'manager' to 'alice' will also give 'manager' to
-    descendants of 'alice' depending on business logic. This is just an example
-    policy; modify as needed.
+    For example, assigning 'manager' to 'alice' also gives 'manager' to every
+    descendant of 'alice'. Inheritance is resolved at query time, so people
+    added to the family tree later inherit the role as well.
     """
-    assign_role(role, subject)
-    for d in descendants_of(subject):
-        assign_role(role, d)
+    roles.assign_inherit(role, subject)
+
 
+def revoke_role(role: str, subject: str) -> None:
+    roles.revoke(role, subject)
 
+
+def role_inherits(senior: str, junior: str) -> None:
+    """Make every holder of `senior` also hold `junior`."""
+    roles.add_implication(senior, junior)
+
+
+@instrumented
 def has_role(role: str, subject: str) -> bool:
-    return subject in _roles.get(role, set())
+    return roles.has(role, subject)
+
 
+@instrumented
+def has_roles(checks: Iterable[Tuple[str, str]]) -> List[bool]:
+    """Answer many `has_role(role, subject)` checks in one pass.
 
+    Each role's membership bitmap is resolved once for the whole batch.
+    """
+    return roles.has_many(checks)
+
+
+@instrumented
 def role_members(role: str) -> List[str]:
-    return list(_roles.get(role, set()))
+    return roles.members(role)
+
+
+@instrumented
+def members_matching(all_of: Iterable[str] = (), any_of: Iterable[str] = (),
+                     none_of: Iterable[str] = ()) -> List[str]:
+    """Subjects with all roles in `all_of`, any in `any_of` and none in `none_of`.
+
+    E.g. ``members_matching(all_of=["staff", "oncall"], none_of=["suspended"])``.
+    """
+    return roles.names(roles.select(all_of, any_of, none_of))
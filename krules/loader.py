@@ -0,0 +1,209 @@
+"""Streaming bulk loader for `krules` fact relations.
+
+Rows are read lazily from CSV/TSV, JSON Lines or Parquet files (optionally
+gzip-compressed for the text formats), pushed through a small generator
+pipeline and asserted into an `IndexedRelation` in fixed-size chunks, so memory
+stays bounded by the chunk size rather than the file size. Duplicate facts are
+skipped by the relation itself and counted.
+
+Example:
+    from krules.loader import load_facts
+    from krules.relations import parent
+    stats = load_facts(parent, "facts.csv", header=True)
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Callable, IO, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+Row = Tuple[str, ...]
+Columns = Optional[Sequence[Union[int, str]]]
+
+FORMATS = ("csv", "tsv", "jsonl", "parquet")
+
+
+@dataclass
+class LoadStats:
+    """Counters reported while and after loading."""
+
+    rows: int = 0
+    added: int = 0
+    duplicates: int = 0
+    chunks: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        """Rows per second so far."""
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+
+def detect_format(path: Union[str, Path]) -> str:
+    """Guess the file format from its suffix (``.gz`` is looked through)."""
+    suffixes = [s.lower() for s in Path(path).suffixes]
+    if suffixes and suffixes[-1] == ".gz":
+        suffixes.pop()
+    ext = suffixes[-1].lstrip(".") if suffixes else ""
+    if ext in ("ndjson", "json"):
+        ext = "jsonl"
+    if ext == "pq":
+        ext = "parquet"
+    if ext not in FORMATS:
+        raise ValueError(f"cannot infer format of {path!s}; pass format= one of {FORMATS}")
+    return ext
+
+
+def _open_text(path: Union[str, Path]) -> IO[str]:
+    if str(path).endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf8", newline="")
+    return open(path, "r", encoding="utf8", newline="")
+
+
+def _select(columns: Columns, header: Optional[List[str]]) -> Optional[List[int]]:
+    if columns is None:
+        return None
+    out = []
+    for col in columns:
+        if isinstance(col, int):
+            out.append(col)
+        elif header is None:
+            raise ValueError(f"column {col!r} given by name but the file has no header")
+        else:
+            out.append(header.index(col))
+    return out
+
+
+def read_delimited(
+    path: Union[str, Path],
+    *,
+    delimiter: str = ",",
+    header: bool = False,
+    columns: Columns = None,
+) -> Iterator[Row]:
+    """Yield rows from a CSV/TSV file, optionally picking `columns`."""
+    with _open_text(path) as fh:
+        reader = csv.reader(fh, delimiter=delimiter)
+        names = next(reader, None) if header else None
+        picks = _select(columns, names)
+        for record in reader:
+            if not record:
+                continue
+            if picks is None:
+                yield tuple(record)
+            else:
+                yield tuple(record[i] for i in picks)
+
+
+def read_jsonl(path: Union[str, Path], *, columns: Columns = None) -> Iterator[Row]:
+    """Yield rows from a JSON Lines file of arrays or objects.
+
+    Objects need `columns` (key names); arrays may use integer `columns`.
+    """
+    with _open_text(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                if columns is None:
+                    raise ValueError("JSON object rows need columns=[key, ...]")
+                yield tuple(record[c] for c in columns)
+            elif columns is None:
+                yield tuple(record)
+            else:
+                yield tuple(record[c] for c in columns)
+
+
+def read_parquet(path: Union[str, Path], *, columns: Columns = None, batch_size: int = 65536) -> Iterator[Row]:
+    """Yield rows from a Parquet file batch by batch (requires ``pyarrow``)."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # optional dependency
+        raise ImportError("reading Parquet files requires the 'pyarrow' package") from exc
+
+    pf = pq.ParquetFile(path)
+    names = pf.schema_arrow.names
+    picks = _select(columns, names)
+    selected = [names[i] for i in picks] if picks is not None else None
+    for batch in pf.iter_batches(batch_size=batch_size, columns=selected):
+        yield from zip(*(col.to_pylist() for col in batch.columns))
+
+
+def read_rows(path: Union[str, Path], *, format: Optional[str] = None, **options) -> Iterator[Row]:
+    """Yield rows from `path`, dispatching on `format` (or the file suffix)."""
+    fmt = format or detect_format(path)
+    if fmt == "csv":
+        return read_delimited(path, delimiter=options.pop("delimiter", ","), **options)
+    if fmt == "tsv":
+        return read_delimited(path, delimiter=options.pop("delimiter", "\t"), **options)
+    options.pop("delimiter", None)
+    if fmt == "jsonl":
+        options.pop("header", None)
+        return read_jsonl(path, **options)
+    if fmt == "parquet":
+        options.pop("header", None)
+        return read_parquet(path, **options)
+    raise ValueError(f"unknown format {fmt!r}; expected one of {FORMATS}")
+
+
+def chunked(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    """Group `rows` into lists of at most `size` items."""
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ingest(
+    relation,
+    rows: Iterable[Row],
+    *,
+    chunk_size: int = 10000,
+    progress: Optional[Callable[[LoadStats], None]] = None,
+) -> LoadStats:
+    """Assert `rows` into `relation` chunk by chunk, skipping duplicates."""
+    stats = LoadStats()
+    add = relation.add_fact
+    for chunk in chunked(rows, chunk_size):
+        added = 0
+        for row in chunk:
+            if add(*row):
+                added += 1
+        stats.rows += len(chunk)
+        stats.added += added
+        stats.duplicates += len(chunk) - added
+        stats.chunks += 1
+        if progress is not None:
+            progress(stats)
+    return stats
+
+
+def load_facts(
+    relation,
+    path: Union[str, Path],
+    *,
+    format: Optional[str] = None,
+    chunk_size: int = 10000,
+    progress: Optional[Callable[[LoadStats], None]] = None,
+    **options,
+) -> LoadStats:
+    """Stream the facts in `path` into `relation`.
+
+    `options` are passed to the reader (``header``, ``columns``, ``delimiter``).
+    """
+    return ingest(relation, read_rows(path, format=format, **options), chunk_size=chunk_size, progress=progress)
@@ -0,0 +1,287 @@
+"""Multi-process transitive closure.
+
+`parallel_closure` computes the same `ClosureView` as
+`krules.closure.transitive_closure`, but splits the work over a
+`ProcessPoolExecutor`:
+
+- ``partition="components"`` (default) groups the weakly connected components
+  of the graph into balanced buckets and renumbers the nodes so every bucket
+  is a contiguous id range. A bucket is closed under edges, so each worker
+  condenses and sweeps only its own subgraph and its rows only span its range.
+- ``partition="sources"`` splits the node ids into equal ranges and has each
+  worker compute the rows of its sources over whatever part of the graph they
+  reach. Use it when one component dominates the graph.
+
+The graph goes to the workers as a CSR adjacency (int64 offsets and targets)
+in a `multiprocessing.shared_memory` block, and each worker writes its rows
+back as packed little-endian bitsets into a block of its own. Only block
+names and sizes are pickled. The parent rebuilds each row with one
+``int.from_bytes`` call and shares it between members of a cycle.
+"""
+from __future__ import annotations
+
+import heapq
+import os
+from array import array
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from .closure import ClosureView, Interner, strongly_connected_components, transitive_closure
+
+PARTITIONS = ("components", "sources")
+
+# tasks per worker; more, smaller tasks even out skewed partitions
+_TASKS_PER_WORKER = 4
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def parallel_closure(
+    edges: Iterable[Tuple[Hashable, Hashable]],
+    workers: Optional[int] = None,
+    *,
+    partition: str = "components",
+    executor: Optional[Executor] = None,
+) -> ClosureView:
+    """Transitive closure of `edges` computed on `workers` processes."""
+    if partition not in PARTITIONS:
+        raise ValueError(f"unknown partition {partition!r}; expected one of {PARTITIONS}")
+    edges = list(edges)
+    workers = workers or default_workers()
+    if workers <= 1 and executor is None:
+        return transitive_closure(edges)
+
+    interner = Interner()
+    intern = interner.intern
+    pairs = [(intern(a), intern(b)) for a, b in edges]
+    adj: List[List[int]] = [[] for _ in range(len(interner))]
+    for i, j in pairs:
+        adj[i].append(j)
+
+    if partition == "components":
+        order, ranges = component_order(adj, workers * _TASKS_PER_WORKER)
+        interner = Interner(interner.name_of(i) for i in order)
+        new_id = [0] * len(order)
+        for new, old in enumerate(order):
+            new_id[old] = new
+        adj = [[new_id[j] for j in adj[old]] for old in order]
+    else:
+        ranges = source_ranges(len(adj), workers * _TASKS_PER_WORKER)
+
+    rows = reachability_rows(adj, ranges, compact=partition == "components",
+                             workers=workers, executor=executor)
+    return ClosureView(interner, list(range(len(rows))), rows)
+
+
+def component_order(adj: Sequence[Sequence[int]], buckets: int) -> Tuple[List[int], List[Tuple[int, int]]]:
+    """Order nodes so balanced groups of weakly connected components are contiguous.
+
+    Returns the node order and the ``[lo, hi)`` range of each non-empty group.
+    """
+    n = len(adj)
+    root = list(range(n))
+
+    def find(x: int) -> int:
+        while root[x] != x:
+            root[x] = root[root[x]]
+            x = root[x]
+        return x
+
+    for i, succ in enumerate(adj):
+        for j in succ:
+            a, b = find(i), find(j)
+            if a != b:
+                root[a] = b
+    members: Dict[int, List[int]] = {}
+    for i in range(n):
+        members.setdefault(find(i), []).append(i)
+    # longest-processing-time packing by node + edge count
+    weight = {r: len(ms) + sum(len(adj[m]) for m in ms) for r, ms in members.items()}
+    heap = [(0, b, []) for b in range(max(1, min(buckets, len(members))))]
+    for r in sorted(members, key=weight.__getitem__, reverse=True):
+        load, b, group = heapq.heappop(heap)
+        group.append(r)
+        heapq.heappush(heap, (load + weight[r], b, group))
+    order: List[int] = []
+    ranges: List[Tuple[int, int]] = []
+    for _, _, group in sorted(heap, key=lambda entry: entry[1]):
+        lo = len(order)
+        for r in group:
+            order.extend(members[r])
+        if len(order) > lo:
+            ranges.append((lo, len(order)))
+    return order, ranges
+
+
+def source_ranges(n: int, parts: int) -> List[Tuple[int, int]]:
+    """Split ``range(n)`` into at most `parts` contiguous ranges."""
+    step = max(1, -(-n // max(1, parts)))
+    return [(lo, min(n, lo + step)) for lo in range(0, n, step)]
+
+
+def reachability_rows(
+    adj: Sequence[Sequence[int]],
+    ranges: Sequence[Tuple[int, int]],
+    *,
+    compact: bool = False,
+    workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> List[int]:
+    """Reachability bitset of every node, computed per source range in worker processes.
+
+    With `compact`, every range must be closed under edges (as produced by
+    `component_order`) so workers can keep rows relative to the range start.
+    """
+    n = len(adj)
+    offsets = array("q", [0])
+    targets = array("q")
+    for succ in adj:
+        targets.extend(succ)
+        offsets.append(len(targets))
+    graph = _share(offsets.tobytes() + targets.tobytes())
+    own = executor is None
+    if own:
+        executor = ProcessPoolExecutor(min(workers or default_workers(), max(1, len(ranges))))
+    rows: List[int] = [0] * n
+    futures: List[Future] = []
+    collected = 0
+    try:
+        futures = [executor.submit(_rows_task, graph.name, n, len(targets), lo, hi, compact)
+                   for lo, hi in ranges]
+        for (lo, hi), future in zip(ranges, futures):
+            name, size = future.result()
+            collected += 1  # `_collect` unlinks the block even if it fails
+            _collect(name, size, lo, hi, compact, rows)
+    finally:
+        if own:
+            executor.shutdown(cancel_futures=True)
+        # a task failed (or we were interrupted): free the blocks of the others
+        _discard(futures[collected:])
+        graph.close()
+        graph.unlink()
+    return rows
+
+
+def _share(data: bytes) -> shared_memory.SharedMemory:
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    block.buf[:len(data)] = data
+    return block
+
+
+def _collect(name: str, size: int, lo: int, hi: int, compact: bool, rows: List[int]) -> None:
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        k = hi - lo
+        index = block.buf[:16 * k].cast("q")
+        try:
+            data = bytes(block.buf[16 * k:size])
+            shift = lo if compact else 0
+            decoded: Dict[int, int] = {}
+            for v in range(k):
+                start, length = index[2 * v], index[2 * v + 1]
+                if not length:
+                    continue
+                row = decoded.get(start)
+                if row is None:
+                    # members of one cycle point at the same bytes; share the int
+                    row = decoded[start] = int.from_bytes(data[start:start + length], "little") << shift
+                rows[lo + v] = row
+        finally:
+            index.release()
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _discard(futures: Sequence[Future]) -> None:
+    """Cancel `futures` and unlink the result blocks of those that still finish."""
+    for future in futures:
+        future.cancel()
+    wait(futures)
+    for future in futures:
+        if future.cancelled() or future.exception() is not None:
+            continue
+        try:
+            block = shared_memory.SharedMemory(name=future.result()[0])
+        except FileNotFoundError:
+            continue
+        block.close()
+        block.unlink()
+
+
+def _rows_task(graph_name: str, n: int, m: int, lo: int, hi: int, compact: bool) -> Tuple[str, int]:
+    """Worker: compute rows for sources ``[lo, hi)`` and publish them in shared memory."""
+    # pool workers share the parent's resource tracker, so blocks created or
+    # attached here stay registered until the parent unlinks them
+    graph = shared_memory.SharedMemory(name=graph_name)
+    offsets = graph.buf[:8 * (n + 1)].cast("q")
+    targets = graph.buf[8 * (n + 1):8 * (n + 1 + m)].cast("q")
+    try:
+        if compact:
+            nodes = list(range(lo, hi))
+        else:
+            # everything reachable from the range
+            seen = bytearray(n)
+            nodes = []
+            stack = list(range(lo, hi))
+            for v in stack:
+                seen[v] = 1
+            while stack:
+                v = stack.pop()
+                nodes.append(v)
+                for t in targets[offsets[v]:offsets[v + 1]]:
+                    if not seen[t]:
+                        seen[t] = 1
+                        stack.append(t)
+        local = {v: k for k, v in enumerate(nodes)}
+        local_adj = [[local[t] for t in targets[offsets[v]:offsets[v + 1]]] for v in nodes]
+    finally:
+        offsets.release()
+        targets.release()
+        graph.close()
+
+    base = lo if compact else 0
+    components = strongly_connected_components(local_adj)
+    component_of = [0] * len(nodes)
+    masks: List[int] = []
+    comp_rows: List[int] = []
+    for c, members in enumerate(components):
+        mask = 0
+        for k in members:
+            component_of[k] = c
+            mask |= 1 << (nodes[k] - base)
+        successors = {component_of[s] for k in members for s in local_adj[k]}
+        cyclic = len(members) > 1 or c in successors
+        successors.discard(c)
+        row = 0
+        for d in successors:
+            row |= masks[d] | comp_rows[d]
+        if cyclic:
+            row |= mask
+        masks.append(mask)
+        comp_rows.append(row)
+
+    # index: (start, length) per source; one byte string per component used
+    k = hi - lo
+    index = array("q", [0]) * (2 * k)
+    chunks: List[bytes] = []
+    placed: Dict[int, Tuple[int, int]] = {}
+    pos = 0
+    for v in range(lo, hi):
+        c = component_of[local[v]]
+        where = placed.get(c)
+        if where is None:
+            row = comp_rows[c]
+            chunk = row.to_bytes((row.bit_length() + 7) // 8, "little")
+            chunks.append(chunk)
+            where = placed[c] = (pos, len(chunk))
+            pos += len(chunk)
+        index[2 * (v - lo)], index[2 * (v - lo) + 1] = where
+    payload = index.tobytes() + b"".join(chunks)
+    block = _share(payload)
+    name = block.name
+    block.close()
+    return name, len(payload)
@@ -1,8 +1,9 @@
 """Simple kanren-based relations and helpers for business rules prototyping.
 
 This module intentionally keeps things small: it defines a few base facts and
-helper predicates you can extend. It uses the `kanren` library that should
-already be installed in the environment.
+helper predicates you can extend. Facts are held in an indexed `FactStore`
+(see `store.py`) so the helpers are hash lookups; the relations still act as
+`kanren` goals for logic queries.
 """
 from __future__ import annotations
 
@@ -26,55 +27,74 @@ try:
         if not hasattr(collections, _name) and hasattr(_collections_abc, _name):
             setattr(collections, _name, getattr(_collections_abc, _name))
 except Exception:
-    # best-effort; if this fails we'll surface import errors below
+    # best-effort; if this fails kanren surfaces the import error when it is first used
     pass
 
-from kanren import Relation, facts, run, var, conde
+from .stats import instrumented
+from .store import FactStore
+from .tabling import tabled
 
 
-# Define relations
-parent = Relation()
-male = Relation()
-female = Relation()
+# Define relations. They live in an indexed store so the helpers below are hash
+# lookups, but each relation still returns a kanren goal when called, e.g.
+# ``run(0, x, parent(x, "sue"))``.
+store = FactStore()
+parent = store.relation("parent", 2)
+male = store.relation("male", 1)
+female = store.relation("female", 1)
 
 
-# Example: register some simple facts (you can replace these with your domain data)
-facts(parent, ("bob", "alice"), ("bob", "jack"), ("alice", "sue"))
-facts(male, ("bob",), ("jack",))
-facts(female, ("alice",), ("sue",))
+# Example: register some simple facts (you can replace these with your domain data).
+# Deferred: they are added when a relation is first used, and never if a snapshot replaces it
+# first (see `IndexedRelation.defer`), so importing this module builds no fact base.
+parent.defer(lambda: [("bob", "alice"), ("bob", "jack"), ("alice", "sue")])
+male.defer(lambda: [("bob",), ("jack",)])
+female.defer(lambda: [("alice",), ("sue",)])
 
 
+@tabled(store=store)
+def ancestor(x, y):
+    """Tabled, left-recursive ancestry, e.g. ``run(0, a, ancestor(a, "sue"))``.
+
+    Answers are memoized per call pattern and dropped when the store changes.
+    """
+    from kanren import conde, var
+
+    z = var()
+    return conde([ancestor(x, z), parent(z, y)], [parent(x, y)])
+
+
+@instrumented
 def children_of(person):
-    """Return a generator of children for `person`.
+    """Return a tuple of children for `person`.
 
     Example:
-        list(children_of('bob')) -> ['alice', 'jack']
+        children_of('bob') -> ('alice', 'jack')
     """
-    x = var()
-    results = run(0, x, parent(person, x))
-    return results
+    return parent.project(0, person, 1)
 
 
+@instrumented
 def parents_of(child):
-    x = var()
-    results = run(0, x, parent(x, child))
-    return results
+    return parent.project(1, child, 0)
 
 
+@instrumented
 def is_male(name):
-    x = var()
-    return bool(run(1, x, male(name,)) )
+    return (name,) in male
 
 
+@instrumented
 def is_female(name):
-    x = var()
-    return bool(run(1, x, female(name,)) )
+    return (name,) in female
 
 
+@instrumented
 def siblings_of(name):
     """Return names of siblings: share a parent but are not the same person."""
-    p = var()
-    s = var()
-    results = run(0, s, parent(p, name), parent(p, s), conde([s != name]))
-    # run returns tuples for compound answers; ensure simple list
-    return [r for r in results]
+    seen = {}
+    for p in parents_of(name):
+        for s in children_of(p):
+            if s != name:
+                seen[s] = None
+    return list(seen)
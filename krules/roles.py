@@ -0,0 +1,255 @@
+"""Role membership index with role hierarchies and inheritance along a closure.
+
+Subjects are interned to dense ids (`krules.closure.Interner`) and each role's
+members are held as a compressed `krules.bitmap.Bitmap`. Three kinds of facts
+feed a role's *effective* membership:
+
+- direct assignments (`assign`);
+- role hierarchy edges (`add_implication`): members of a senior role are also
+  members of every role it implies, transitively;
+- inheritable assignments (`assign_inherit`): the subject and everything
+  reachable from it in a `ClosureIndex` (by default the ``parent`` ancestry)
+  hold the role.
+
+Nothing is expanded at assignment time. Effective memberships are computed on
+first query from the cached closures and kept until a role change or a change
+to the closure invalidates them, so a descendant added later inherits without
+re-assigning. Checks are then a dict lookup plus a bitmap membership test.
+
+Queries fill those caches, so changes and cache fills hold the index's lock:
+checks may run concurrently, e.g. from `blocking` handlers on a thread pool.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from .bitmap import Bitmap
+from .closure import ClosureIndex, ClosureView, Interner, transitive_closure
+
+_NOBODY = Bitmap()
+
+
+class RoleIndex:
+    """Interned, bitmap-backed role assignments.
+
+    `closure` is a zero-argument callable returning the `ClosureIndex` used for
+    inheritable assignments; it is only called once such an assignment exists.
+    `version` is bumped on every role change.
+    """
+
+    def __init__(self, closure: Optional[Callable[[], ClosureIndex]] = None) -> None:
+        self.subjects = Interner()
+        self._closure = closure
+        self._direct: Dict[str, Bitmap] = {}
+        self._inherit: Dict[str, Bitmap] = {}
+        # senior role -> roles it directly implies
+        self._implies: Dict[str, Set[str]] = {}
+        self._seniors: Optional[ClosureView] = None
+        self.version = 0
+        # derived state, dropped on changes
+        self._effective: Dict[str, Bitmap] = {}
+        self._reach: Dict[int, Bitmap] = {}
+        self._closure_version = -1
+        # guards the tables and caches above; queries fill the caches too
+        self._lock = threading.RLock()
+
+    # -- mutation ---------------------------------------------------------
+
+    def assign(self, role: str, subject: Hashable) -> None:
+        self._add(self._direct, role, subject)
+
+    def assign_inherit(self, role: str, subject: Hashable) -> None:
+        """Give `role` to `subject` and to everything the closure reaches from it."""
+        self._add(self._inherit, role, subject)
+
+    def revoke(self, role: str, subject: Hashable) -> None:
+        """Remove a direct or inheritable assignment of `role` to `subject`.
+
+        Membership obtained through a senior role or an ancestor's inheritable
+        assignment is not affected.
+        """
+        i = self.subjects.id_of(subject)
+        if i is None:
+            return
+        with self._lock:
+            for table in (self._direct, self._inherit):
+                members = table.get(role)
+                if members is not None and i in members:
+                    members.discard(i)
+                    if not members:
+                        del table[role]
+            self._changed(role)
+
+    def add_implication(self, senior: str, junior: str) -> None:
+        """Members of `senior` also hold `junior` (and whatever `junior` implies)."""
+        with self._lock:
+            self._implies.setdefault(senior, set()).add(junior)
+            self._hierarchy_changed()
+
+    def remove_implication(self, senior: str, junior: str) -> None:
+        with self._lock:
+            juniors = self._implies.get(senior)
+            if juniors is None or junior not in juniors:
+                return
+            juniors.discard(junior)
+            if not juniors:
+                del self._implies[senior]
+            self._hierarchy_changed()
+
+    def _add(self, table: Dict[str, Bitmap], role: str, subject: Hashable) -> None:
+        with self._lock:
+            i = self.subjects.intern(subject)
+            members = table.get(role)
+            if members is None:
+                members = table[role] = Bitmap()
+            members.add(i)
+            self._changed(role)
+
+    def _changed(self, role: str) -> None:
+        self.version += 1
+        effective = self._effective
+        if not effective:
+            return
+        effective.pop(role, None)
+        if self._implies:
+            for junior in self._juniors(role):
+                effective.pop(junior, None)
+
+    def _hierarchy_changed(self) -> None:
+        self.version += 1
+        self._seniors = None
+        self._effective.clear()
+
+    # -- queries ----------------------------------------------------------
+
+    def has(self, role: str, subject: Hashable) -> bool:
+        members = self.members_bitmap(role)
+        i = self.subjects.id_of(subject)
+        return i is not None and i in members
+
+    def has_many(self, checks: Iterable[Tuple[str, Hashable]]) -> List[bool]:
+        """Answer many `has(role, subject)` checks; each role is resolved once."""
+        checks = list(checks)
+        resolved: Dict[str, Bitmap] = {}
+        id_of = self.subjects.id_of
+        out = []
+        for role, subject in checks:
+            members = resolved.get(role)
+            if members is None:
+                members = resolved[role] = self.members_bitmap(role)
+            i = id_of(subject)
+            out.append(i is not None and i in members)
+        return out
+
+    def members(self, role: str) -> List[Hashable]:
+        return self.names(self.members_bitmap(role))
+
+    def members_bitmap(self, role: str) -> Bitmap:
+        """Effective members of `role` as subject ids (shared; do not mutate)."""
+        with self._lock:
+            if self._inherit:
+                self._check_closure()
+            members = self._effective.get(role)
+            if members is None:
+                members = self._effective[role] = self._resolve(role)
+            return members
+
+    def select(
+        self,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        none_of: Iterable[str] = (),
+    ) -> Bitmap:
+        """Subjects holding every role in `all_of`, at least one of `any_of`
+        (if given) and none of `none_of`."""
+        all_of, any_of = list(all_of), list(any_of)
+        if not all_of and not any_of:
+            return Bitmap()
+        result: Optional[Bitmap] = None
+        # intersect smallest first so intermediate results stay small
+        for members in sorted((self.members_bitmap(r) for r in all_of), key=len):
+            result = members if result is None else result & members
+            if not result:
+                return Bitmap()
+        if any_of:
+            alternatives = Bitmap.union(self.members_bitmap(r) for r in any_of)
+            result = alternatives if result is None else result & alternatives
+        excluded = [self.members_bitmap(r) for r in none_of]
+        if excluded and result:
+            result = result - Bitmap.union(excluded)
+        return result.copy() if result is not None else Bitmap()
+
+    def names(self, bitmap: Bitmap) -> List[Hashable]:
+        name_of = self.subjects.name_of
+        return [name_of(i) for i in bitmap]
+
+    def roles(self) -> List[str]:
+        """Roles with at least one assignment or hierarchy edge."""
+        with self._lock:
+            seen = dict.fromkeys(self._direct)
+            seen.update(dict.fromkeys(self._inherit))
+            for senior, juniors in self._implies.items():
+                seen[senior] = None
+                seen.update(dict.fromkeys(juniors))
+            return list(seen)
+
+    # -- resolution -------------------------------------------------------
+
+    def _juniors(self, role: str) -> Set[str]:
+        """Roles implied by `role`, transitively (excluding `role`)."""
+        out: Set[str] = set()
+        stack = list(self._implies.get(role, ()))
+        while stack:
+            r = stack.pop()
+            if r not in out:
+                out.add(r)
+                stack.extend(self._implies.get(r, ()))
+        out.discard(role)
+        return out
+
+    def _holders(self, role: str) -> Iterable[str]:
+        """`role` plus every role that implies it."""
+        if not self._implies:
+            return (role,)
+        if self._seniors is None:
+            # junior -> senior edges, so the closure of a role is its seniors
+            self._seniors = transitive_closure(
+                (junior, senior) for senior, juniors in self._implies.items() for junior in juniors
+            )
+        if role not in self._seniors:
+            return (role,)
+        return (role, *self._seniors[role])
+
+    def _resolve(self, role: str) -> Bitmap:
+        holders = self._holders(role)
+        parts = [self._direct[r] for r in holders if r in self._direct]
+        for r in holders:
+            inherit = self._inherit.get(r)
+            if inherit is not None:
+                parts.append(inherit)
+                parts.extend(self._reachable(i) for i in inherit)
+        if not parts:
+            return _NOBODY
+        if len(parts) == 1:
+            return parts[0].copy()
+        return Bitmap.union(parts)
+
+    def _reachable(self, i: int) -> Bitmap:
+        """Subjects reachable from subject `i` in the closure, as ids (cached)."""
+        reach = self._reach.get(i)
+        if reach is None:
+            intern = self.subjects.intern
+            names = self._closure().descendants(self.subjects.name_of(i)) if self._closure else ()
+            reach = self._reach[i] = Bitmap(intern(name) for name in names)
+        return reach
+
+    def _check_closure(self) -> None:
+        if self._closure is None:
+            return
+        version = self._closure().version
+        if version != self._closure_version:
+            self._closure_version = version
+            self._reach.clear()
+            if self._inherit:
+                self._effective.clear()
@@ -0,0 +1,454 @@
+"""Memory-mapped binary snapshots of the krules fact base.
+
+A snapshot file holds:
+
+- an interned string table (every distinct value, sorted by UTF-8 bytes so a
+  value's id can be found by binary search without building a dict);
+- for each binary relation, CSR adjacency arrays in both directions
+  (``indptr``/``indices``, i.e. forward ``parent -> children`` and reverse);
+- for each unary relation, a bitmap over string ids;
+- optionally, the precomputed transitive closure of chosen binary relations,
+  again as forward (descendants) and reverse (ancestors) CSR arrays.
+
+Layout: an 8-byte magic, a little-endian u64 header length, a JSON header that
+describes each section (offset, length, item type), then the 8-byte aligned
+sections. Sections are read through ``memoryview.cast`` over an ``mmap`` of
+the file, so nothing is copied or parsed up front and processes that open the
+same snapshot share its pages.
+
+`load_snapshot` attaches the mapped relations as the read-only base layer of
+the matching `IndexedRelation` objects (by default those in
+`krules.relations.store`), so the existing helpers use it transparently; facts
+asserted later live in the in-memory overlay.
+
+Only string-valued unary and binary relations are supported.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import BinaryIO, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .closure import iter_bits, transitive_closure
+
+MAGIC = b"KRSNAP\x00\x01"
+FORMAT_VERSION = 1
+_ALIGN = 8
+
+
+class SnapshotError(ValueError):
+    """Raised for unreadable or incompatible snapshot files."""
+
+
+# -- reading --------------------------------------------------------------
+
+
+class StringTable:
+    """Id <-> string mapping over the snapshot's sorted string section."""
+
+    def __init__(self, offsets: memoryview, data: memoryview) -> None:
+        self._offsets = offsets
+        self._data = data
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def name(self, i: int) -> str:
+        return str(self._data[self._offsets[i]:self._offsets[i + 1]], "utf8")
+
+    def id_of(self, name: Hashable) -> Optional[int]:
+        i = self._ids.get(name)  # type: ignore[arg-type]
+        if i is not None or not isinstance(name, str):
+            return i
+        key = name.encode("utf8")
+        offsets, data = self._offsets, self._data
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = data[offsets[mid]:offsets[mid + 1]]
+            if probe == key:
+                self._ids[name] = mid
+                return mid
+            if bytes(probe) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+
+class _CSR:
+    """One direction of an adjacency structure: row -> sorted column ids."""
+
+    def __init__(self, indptr: memoryview, indices: memoryview) -> None:
+        self.indptr = indptr
+        self.indices = indices
+
+    def row(self, i: int) -> memoryview:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def degree(self, i: int) -> int:
+        return self.indptr[i + 1] - self.indptr[i]
+
+    def has(self, i: int, j: int) -> bool:
+        row = self.row(i)
+        k = bisect_left(row, j)
+        return k < len(row) and row[k] == j
+
+
+class MappedBinaryRelation:
+    """Read-only binary relation backed by forward and reverse CSR arrays."""
+
+    arity = 2
+    closure: Optional["MappedClosure"] = None
+
+    def __init__(self, strings: StringTable, forward: _CSR, reverse: _CSR) -> None:
+        self._strings = strings
+        self._dirs = (forward, reverse)
+
+    def __len__(self) -> int:
+        return len(self._dirs[0].indices)
+
+    def __contains__(self, fact: object) -> bool:
+        if not isinstance(fact, tuple) or len(fact) != 2:
+            return False
+        i = self._strings.id_of(fact[0])
+        j = self._strings.id_of(fact[1])
+        return i is not None and j is not None and self._dirs[0].has(i, j)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        name = self._strings.name
+        forward = self._dirs[0]
+        for i in range(len(self._strings)):
+            if forward.degree(i):
+                a = name(i)
+                for j in forward.row(i):
+                    yield (a, name(j))
+
+    def project(self, key_position: int, value: Hashable, out_position: int) -> Tuple[str, ...]:
+        i = self._strings.id_of(value)
+        if i is None:
+            return ()
+        if key_position == out_position:
+            return (value,) * self._dirs[key_position].degree(i)  # type: ignore[return-value]
+        name = self._strings.name
+        return tuple(name(j) for j in self._dirs[key_position].row(i))
+
+    def lookup(self, position: int, value: Hashable) -> List[Tuple[str, str]]:
+        other = self.project(position, value, 1 - position)
+        if position == 0:
+            return [(value, o) for o in other]  # type: ignore[misc]
+        return [(o, value) for o in other]  # type: ignore[misc]
+
+    def count(self, position: int, value: Hashable) -> int:
+        i = self._strings.id_of(value)
+        return 0 if i is None else self._dirs[position].degree(i)
+
+    def keys(self, position: int) -> Iterator[str]:
+        csr = self._dirs[position]
+        for i in range(len(self._strings)):
+            if csr.degree(i):
+                yield self._strings.name(i)
+
+
+class MappedUnaryRelation:
+    """Read-only unary relation backed by a bitmap over string ids."""
+
+    arity = 1
+    closure = None
+
+    def __init__(self, strings: StringTable, bitmap: memoryview, size: int) -> None:
+        self._strings = strings
+        self._bitmap = bitmap
+        self._size = size
+
+    def _has(self, i: int) -> bool:
+        return bool(self._bitmap[i >> 3] >> (i & 7) & 1)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, fact: object) -> bool:
+        if not isinstance(fact, tuple) or len(fact) != 1:
+            return False
+        i = self._strings.id_of(fact[0])
+        return i is not None and self._has(i)
+
+    def __iter__(self) -> Iterator[Tuple[str]]:
+        for name in self.keys(0):
+            yield (name,)
+
+    def project(self, key_position: int, value: Hashable, out_position: int) -> Tuple[str, ...]:
+        return (value,) if (value,) in self else ()  # type: ignore[return-value]
+
+    def lookup(self, position: int, value: Hashable) -> List[Tuple[str]]:
+        return [(value,)] if (value,) in self else []  # type: ignore[list-item]
+
+    def count(self, position: int, value: Hashable) -> int:
+        return 1 if (value,) in self else 0
+
+    def keys(self, position: int) -> Iterator[str]:
+        name = self._strings.name
+        for i in iter_bits(int.from_bytes(self._bitmap, "little")):
+            yield name(i)
+
+
+class MappedClosure:
+    """Precomputed descendants/ancestors of a binary relation."""
+
+    def __init__(self, strings: StringTable, descendants: _CSR, ancestors: _CSR) -> None:
+        self._strings = strings
+        self._desc = descendants
+        self._anc = ancestors
+
+    def _names(self, csr: _CSR, node: Hashable) -> Tuple[str, ...]:
+        i = self._strings.id_of(node)
+        if i is None:
+            return ()
+        name = self._strings.name
+        return tuple(name(j) for j in csr.row(i))
+
+    def descendants(self, node: Hashable) -> Tuple[str, ...]:
+        return self._names(self._desc, node)
+
+    def ancestors(self, node: Hashable) -> Tuple[str, ...]:
+        return self._names(self._anc, node)
+
+    def reaches(self, source: Hashable, target: Hashable) -> bool:
+        i = self._strings.id_of(source)
+        j = self._strings.id_of(target)
+        return i is not None and j is not None and self._desc.has(i, j)
+
+
+class Snapshot:
+    """An open snapshot file. Keep it alive while relations use it."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        self._buf = buf
+        if bytes(buf[:8]) != MAGIC:
+            raise SnapshotError(f"{path!s} is not a krules snapshot")
+        (header_len,) = struct.unpack_from("<Q", buf, 8)
+        header = json.loads(bytes(buf[16:16 + header_len]))
+        if header.get("version") != FORMAT_VERSION:
+            raise SnapshotError(f"unsupported snapshot version {header.get('version')!r}")
+        if header.get("byteorder") != sys.byteorder:
+            raise SnapshotError("snapshot was written on a machine with different byte order")
+        self.header = header
+        self._sections = header["sections"]
+        self.strings = StringTable(self._section("strings.offsets"), self._section("strings.data"))
+        self._relations: Dict[str, object] = {}
+        for name, meta in header["relations"].items():
+            if meta["arity"] == 1:
+                self._relations[name] = MappedUnaryRelation(self.strings, self._section(f"{name}.bitmap"), meta["size"])
+            else:
+                self._relations[name] = MappedBinaryRelation(
+                    self.strings,
+                    _CSR(self._section(f"{name}.fwd.indptr"), self._section(f"{name}.fwd.indices")),
+                    _CSR(self._section(f"{name}.rev.indptr"), self._section(f"{name}.rev.indices")),
+                )
+        self._closures = {
+            name: MappedClosure(
+                self.strings,
+                _CSR(self._section(f"{name}.desc.indptr"), self._section(f"{name}.desc.indices")),
+                _CSR(self._section(f"{name}.anc.indptr"), self._section(f"{name}.anc.indices")),
+            )
+            for name in header.get("closures", [])
+        }
+        for name, closure in self._closures.items():
+            self._relations[name].closure = closure
+
+    def _section(self, name: str) -> memoryview:
+        offset, length, typecode = self._sections[name]
+        return self._buf[offset:offset + length].cast(typecode)
+
+    def relation_names(self) -> List[str]:
+        return list(self._relations)
+
+    def relation(self, name: str):
+        return self._relations[name]
+
+    def closure(self, name: str) -> Optional[MappedClosure]:
+        return self._closures.get(name)
+
+    def close(self) -> None:
+        """Release the mapping. Relations attached from it must not be used after."""
+        self._closures.clear()
+        self._relations.clear()
+        self.strings = None  # type: ignore[assignment]
+        try:
+            self._buf.release()
+            self._mmap.close()
+        except BufferError:
+            pass  # views are still referenced; the mapping goes away with them
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_snapshot(path: Union[str, Path]) -> Snapshot:
+    return Snapshot(path)
+
+
+def load_snapshot(path: Union[str, Path], store=None) -> Snapshot:
+    """Open `path` and attach its relations to `store` (default: krules.relations.store)."""
+    if store is None:
+        from .relations import store
+    snap = Snapshot(path)
+    for name in snap.relation_names():
+        rel = snap.relation(name)
+        store.relation(name, rel.arity).attach_base(rel)
+    return snap
+
+
+# -- writing --------------------------------------------------------------
+
+
+def _csr(rows: List[List[int]], typecode: str = "I") -> Tuple[array, array]:
+    indptr = array("Q", [0])
+    indices = array(typecode)
+    for row in rows:
+        row.sort()
+        indices.extend(row)
+        indptr.append(len(indices))
+    return indptr, indices
+
+
+def save_snapshot(
+    path: Union[str, Path],
+    store=None,
+    *,
+    relations: Optional[Iterable[str]] = None,
+    closure: Iterable[str] = (),
+    workers: Optional[int] = None,
+) -> None:
+    """Write the relations of `store` (default: krules.relations.store) to `path`.
+
+    `relations` limits which relations are written; `closure` names binary
+    relations whose transitive closure is precomputed into the file, on
+    `workers` processes if more than one (see `krules.parallel`).
+    """
+    if store is None:
+        from .relations import store
+    names = list(relations) if relations is not None else store.names()
+    closure = list(closure)
+
+    values = set()
+    for name in names:
+        rel = store[name]
+        if rel.arity not in (1, 2):
+            raise SnapshotError(f"relation {name!r} has arity {rel.arity}; only 1 and 2 are supported")
+        for fact in rel:
+            for value in fact:
+                if not isinstance(value, str):
+                    raise SnapshotError(f"relation {name!r} holds non-string value {value!r}")
+                values.add(value)
+    encoded = sorted(v.encode("utf8") for v in values)
+    ids = {b.decode("utf8"): i for i, b in enumerate(encoded)}
+    n = len(encoded)
+
+    sections: List[Tuple[str, array]] = []
+    offsets = array("Q", [0])
+    total = 0
+    for b in encoded:
+        total += len(b)
+        offsets.append(total)
+    sections.append(("strings.offsets", offsets))
+    sections.append(("strings.data", array("B", b"".join(encoded))))
+
+    meta: Dict[str, dict] = {}
+    for name in names:
+        rel = store[name]
+        if rel.arity == 1:
+            bitmap = bytearray((n + 7) // 8)
+            size = 0
+            for (value,) in rel:
+                i = ids[value]
+                bitmap[i >> 3] |= 1 << (i & 7)
+                size += 1
+            sections.append((f"{name}.bitmap", array("B", bytes(bitmap))))
+            meta[name] = {"arity": 1, "size": size}
+            continue
+        forward: List[List[int]] = [[] for _ in range(n)]
+        reverse: List[List[int]] = [[] for _ in range(n)]
+        for a, b in rel:
+            forward[ids[a]].append(ids[b])
+            reverse[ids[b]].append(ids[a])
+        for direction, rows in (("fwd", forward), ("rev", reverse)):
+            indptr, indices = _csr(rows)
+            sections.append((f"{name}.{direction}.indptr", indptr))
+            sections.append((f"{name}.{direction}.indices", indices))
+        meta[name] = {"arity": 2, "size": len(rel)}
+        if name in closure:
+            pairs = ((ids[a], ids[b]) for a, b in rel)
+            if workers is not None and workers > 1:
+                from .parallel import parallel_closure
+
+                view = parallel_closure(pairs, workers)
+            else:
+                view = transitive_closure(pairs)
+            desc: List[List[int]] = [[] for _ in range(n)]
+            anc: List[List[int]] = [[] for _ in range(n)]
+            for node in view:
+                for other in view.interner.names(view.bits(node)):
+                    desc[node].append(other)
+                    anc[other].append(node)
+            for direction, rows in (("desc", desc), ("anc", anc)):
+                indptr, indices = _csr(rows)
+                sections.append((f"{name}.{direction}.indptr", indptr))
+                sections.append((f"{name}.{direction}.indices", indices))
+
+    with open(path, "wb") as fh:
+        _write(fh, sections, {
+            "version": FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "strings": n,
+            "relations": meta,
+            "closures": [c for c in closure if c in meta and meta[c]["arity"] == 2],
+        })
+
+
+def _write(fh: BinaryIO, sections: List[Tuple[str, array]], header: dict) -> None:
+    # Offsets depend on the header length, which depends on the offsets; lay
+    # out with a provisional header and pad it so the final one fits.
+    def layout(header_len: int) -> Dict[str, list]:
+        pos = 16 + header_len
+        out = {}
+        for name, arr in sections:
+            pos += -pos % _ALIGN
+            nbytes = len(arr) * arr.itemsize
+            out[name] = [pos, nbytes, arr.typecode]
+            pos += nbytes
+        return out
+
+    header_len = 0
+    while True:
+        header["sections"] = layout(header_len)
+        blob = json.dumps(header, separators=(",", ":")).encode("utf8")
+        if len(blob) <= header_len:
+            blob = blob.ljust(header_len)
+            break
+        header_len = len(blob) + 64
+        header_len += -(16 + header_len) % _ALIGN
+
+    fh.write(MAGIC)
+    fh.write(struct.pack("<Q", header_len))
+    fh.write(blob)
+    pos = 16 + header_len
+    for name, arr in sections:
+        pad = -pos % _ALIGN
+        fh.write(b"\x00" * pad)
+        pos += pad
+        arr.tofile(fh)
+        pos += len(arr) * arr.itemsize
@@ -0,0 +1,99 @@
+"""Lightweight call/timing/cache counters for krules hot paths.
+
+Instrumentation is off by default. While disabled, an instrumented function
+costs one global flag check on top of the call, so it can stay compiled in.
+Enable it with `enable()`; `collect()` returns the counters in the collector
+format understood by `mcp.metrics.MetricsRegistry.add_collector`::
+
+    from krules import stats
+    stats.enable()
+    registry.add_collector(stats.collect)
+
+Counters are updated under a lock, so helpers instrumented on a thread pool
+(e.g. `blocking` server handlers) don't lose counts.
+"""
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+ENABLED = False
+
+_lock = threading.Lock()
+_calls: Dict[str, int] = {}
+_seconds: Dict[str, float] = {}
+_hits: Dict[str, int] = {}
+_misses: Dict[str, int] = {}
+
+
+def enable() -> None:
+    global ENABLED
+    ENABLED = True
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+def reset() -> None:
+    with _lock:
+        _calls.clear()
+        _seconds.clear()
+        _hits.clear()
+        _misses.clear()
+
+
+def instrumented(func: Callable) -> Callable:
+    """Count calls to `func` and the time spent in it while stats are enabled."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with _lock:
+                _calls[name] = _calls.get(name, 0) + 1
+                _seconds[name] = _seconds.get(name, 0.0) + elapsed
+
+    return wrapper
+
+
+def cache_hit(cache: str) -> None:
+    with _lock:
+        _hits[cache] = _hits.get(cache, 0) + 1
+
+
+def cache_miss(cache: str) -> None:
+    with _lock:
+        _misses[cache] = _misses.get(cache, 0) + 1
+
+
+def hit_rate(cache: str) -> float:
+    with _lock:
+        hits = _hits.get(cache, 0)
+        total = hits + _misses.get(cache, 0)
+    return hits / total if total else 0.0
+
+
+def collect() -> List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]:
+    """Return ``(name, kind, help, [(labels, value), ...])`` metric families."""
+    with _lock:
+        calls, seconds, hits, misses = dict(_calls), dict(_seconds), dict(_hits), dict(_misses)
+    return [
+        ("krules_calls_total", "counter", "Calls to instrumented krules functions.",
+         [({"func": k}, v) for k, v in calls.items()]),
+        ("krules_call_seconds_total", "counter", "Time spent in instrumented krules functions.",
+         [({"func": k}, v) for k, v in seconds.items()]),
+        ("krules_cache_hits_total", "counter", "krules cache hits.",
+         [({"cache": k}, v) for k, v in hits.items()]),
+        ("krules_cache_misses_total", "counter", "krules cache misses.",
+         [({"cache": k}, v) for k, v in misses.items()]),
+    ]
@@ -0,0 +1,347 @@
+"""Indexed in-memory fact store backing the `krules.relations` predicates.
+
+`IndexedRelation` keeps every fact in an insertion-ordered table plus one hash
+index per argument position (value -> facts with that value at that position).
+For a binary relation such as ``parent`` the position-0 index is the forward
+(parent -> children) index and the position-1 index the reverse one, so the
+helper predicates are plain dict lookups instead of kanren searches.
+
+Relations stay usable from kanren: calling a relation with terms returns a goal
+that walks the smallest matching index bucket, so mixed logic queries such as
+``run(0, x, parent(x, "sue"), male(x))`` keep working. They also duck-type
+``kanren.Relation.add_fact`` so ``kanren.facts(rel, ...)`` can populate them.
+
+A relation's initial facts can be deferred with `IndexedRelation.defer`: the
+loader runs on the first use of the relation, and never if its contents are
+replaced first (e.g. by a snapshot).
+
+`FactStore` groups named relations, keeps a version counter that is bumped on
+every change and notifies subscribed listeners, which derived structures (e.g.
+cached closures) use to stay in sync.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+
+Fact = Tuple[Hashable, ...]
+# listener(relation, fact, added) — `added` is False when a fact is retracted.
+# `fact` is None when the relation's contents were replaced wholesale (e.g. a
+# snapshot was attached) and derived state must be rebuilt.
+Listener = Callable[["IndexedRelation", Optional[Fact], bool], None]
+
+_EMPTY: Dict[Fact, None] = {}
+# serializes `IndexedRelation.defer` loads; `_LOADING` marks the relation being loaded
+_pending_lock = threading.RLock()
+_LOADING: Any = object()
+
+
+class IndexedRelation:
+    """A fact table with a hash index per argument position.
+
+    A relation may also sit on top of a read-only *base* layer (for example a
+    memory-mapped snapshot, see `krules.snapshot`). Facts added afterwards go
+    to the in-memory overlay and retracted base facts are hidden, so callers
+    see one combined relation.
+    """
+
+    def __init__(self, name: str, arity: Optional[int] = None, *, store: Optional["FactStore"] = None) -> None:
+        self.name = name
+        self.arity = arity
+        self.store = store
+        # dicts double as insertion-ordered sets
+        self._facts: Dict[Fact, None] = {}
+        self._index: List[Dict[Hashable, Dict[Fact, None]]] = [{} for _ in range(arity or 0)]
+        self.base = None
+        self._hidden: Dict[Fact, None] = {}
+        # loader of facts not added yet, see `defer`
+        self._pending: Optional[Callable[[], Iterable[Fact]]] = None
+
+    def defer(self, loader: Callable[[], Iterable[Fact]]) -> None:
+        """Add the facts from `loader()` when the relation is first used.
+
+        The loader is dropped, without running, if `attach_base` or `replace` sets the
+        relation's contents first.
+        """
+        self._pending = loader
+
+    def _load_pending(self) -> None:
+        with _pending_lock:
+            loader = self._pending
+            if loader is None or loader is _LOADING:
+                return  # loaded by another thread while we waited, or being loaded by this one
+            self._pending = _LOADING
+            try:
+                self._replace(loader())
+            except BaseException:
+                self._pending = loader
+                raise
+            # cleared last, so other threads wait on the lock instead of seeing a half-loaded relation
+            self._pending = None
+
+    # -- mutation ---------------------------------------------------------
+
+    def add_fact(self, *inputs: Hashable) -> bool:
+        """Add a fact; return False if it was already present."""
+        if self._pending is not None:
+            self._load_pending()
+        fact = tuple(inputs)
+        if fact in self._facts:
+            return False
+        if self.base is not None and fact in self.base:
+            if fact not in self._hidden:
+                return False
+            del self._hidden[fact]
+            self._notify(fact, True)
+            return True
+        if self.arity is None:
+            self.arity = len(fact)
+            self._index = [{} for _ in range(self.arity)]
+        elif len(fact) != self.arity:
+            raise ValueError(f"{self.name} expects {self.arity} arguments, got {len(fact)}")
+        self._facts[fact] = None
+        for position, value in enumerate(fact):
+            self._index[position].setdefault(value, {})[fact] = None
+        self._notify(fact, True)
+        return True
+
+    def retract_fact(self, *inputs: Hashable) -> bool:
+        """Remove a fact; return False if it was not present."""
+        if self._pending is not None:
+            self._load_pending()
+        fact = tuple(inputs)
+        if fact not in self._facts:
+            if self.base is None or fact in self._hidden or fact not in self.base:
+                return False
+            self._hidden[fact] = None
+            self._notify(fact, False)
+            return True
+        del self._facts[fact]
+        for position, value in enumerate(fact):
+            bucket = self._index[position][value]
+            del bucket[fact]
+            if not bucket:
+                del self._index[position][value]
+        self._notify(fact, False)
+        return True
+
+    def attach_base(self, base) -> None:
+        """Replace the relation's contents with the read-only layer `base`."""
+        self._pending = None
+        if self.arity is not None and base.arity != self.arity:
+            raise ValueError(f"{self.name} expects arity {self.arity}, base has {base.arity}")
+        self.arity = base.arity
+        self.base = base
+        self._facts = {}
+        self._index = [{} for _ in range(self.arity)]
+        self._hidden = {}
+        if self.store is not None:
+            self.store._changed(self, None, True)
+
+    def replace(self, facts: Iterable[Fact]) -> None:
+        """Replace the relation's contents with `facts` (one change notification)."""
+        self._pending = None
+        self._replace(facts)
+
+    def _replace(self, facts: Iterable[Fact]) -> None:
+        self.base = None
+        self._hidden = {}
+        self._facts = {}
+        self._index = [{} for _ in range(self.arity or 0)]
+        for fact in facts:
+            fact = tuple(fact)
+            if fact in self._facts:
+                continue
+            if self.arity is None:
+                self.arity = len(fact)
+                self._index = [{} for _ in range(self.arity)]
+            elif len(fact) != self.arity:
+                raise ValueError(f"{self.name} expects {self.arity} arguments, got {len(fact)}")
+            self._facts[fact] = None
+            for position, value in enumerate(fact):
+                self._index[position].setdefault(value, {})[fact] = None
+        if self.store is not None:
+            self.store._changed(self, None, True)
+
+    @property
+    def modified(self) -> bool:
+        """True if facts were added or retracted on top of the base layer."""
+        if self._pending is not None:
+            self._load_pending()
+        return bool(self._facts or self._hidden)
+
+    def _notify(self, fact: Fact, added: bool) -> None:
+        if self.store is not None:
+            self.store._changed(self, fact, added)
+
+    # -- lookups ----------------------------------------------------------
+
+    def lookup(self, position: int, value: Hashable) -> Iterable[Fact]:
+        """Return the facts whose argument at `position` equals `value`."""
+        if self._pending is not None:
+            self._load_pending()
+        if position >= len(self._index):
+            return ()
+        overlay = self._index[position].get(value, _EMPTY).keys()
+        if self.base is None:
+            return overlay
+        hidden = self._hidden
+        found = [f for f in self.base.lookup(position, value) if f not in hidden]
+        found.extend(overlay)
+        return found
+
+    def project(self, key_position: int, value: Hashable, out_position: int) -> Tuple[Hashable, ...]:
+        """Return argument `out_position` of every fact with `value` at `key_position`."""
+        if self._pending is not None:
+            self._load_pending()
+        if self.base is None:
+            if key_position >= len(self._index):
+                return ()
+            bucket = self._index[key_position].get(value)
+            if not bucket:
+                return ()
+            return tuple([fact[out_position] for fact in bucket])
+        if not self.modified:
+            return self.base.project(key_position, value, out_position)
+        return tuple([fact[out_position] for fact in self.lookup(key_position, value)])
+
+    def count(self, position: int, value: Hashable) -> int:
+        if self._pending is not None:
+            self._load_pending()
+        if position >= len(self._index):
+            return 0
+        n = len(self._index[position].get(value, _EMPTY))
+        if self.base is not None:
+            n += self.base.count(position, value)
+            if self._hidden:
+                n -= sum(1 for f in self._hidden if f[position] == value)
+        return n
+
+    def keys(self, position: int) -> Iterable[Hashable]:
+        """Distinct values that occur at argument `position`."""
+        if self._pending is not None:
+            self._load_pending()
+        if position >= len(self._index):
+            return ()
+        if self.base is None:
+            return self._index[position].keys()
+        merged = dict.fromkeys(self.base.keys(position))
+        merged.update(self._index[position])
+        if self._hidden:
+            return [k for k in merged if self.count(position, k)]
+        return merged.keys()
+
+    @property
+    def facts(self) -> Iterable[Fact]:
+        if self._pending is not None:
+            self._load_pending()
+        if self.base is None:
+            return self._facts.keys()
+        return list(self)
+
+    def __contains__(self, fact: object) -> bool:
+        if self._pending is not None:
+            self._load_pending()
+        if fact in self._facts:
+            return True
+        return self.base is not None and fact not in self._hidden and fact in self.base
+
+    def __iter__(self) -> Iterator[Fact]:
+        if self._pending is not None:
+            self._load_pending()
+        if self.base is not None:
+            hidden = self._hidden
+            for fact in self.base:
+                if fact not in hidden:
+                    yield fact
+        yield from self._facts
+
+    def __len__(self) -> int:
+        if self._pending is not None:
+            self._load_pending()
+        n = len(self._facts)
+        if self.base is not None:
+            n += len(self.base) - len(self._hidden)
+        return n
+
+    # -- kanren integration -----------------------------------------------
+
+    def __call__(self, *args: Any):
+        """Return a kanren goal unifying `args` against the stored facts."""
+        # imported here, not at module level: unification (and toolz) slow down startup
+        from unification import isvar, reify, unify
+
+        def goal(substitution):
+            if self._pending is not None:
+                self._load_pending()
+            terms = reify(args, substitution)
+            candidates: Iterable[Fact] = self if self.base is not None else self._facts
+            best = None
+            best_count = 0
+            for position, term in enumerate(terms):
+                if position >= len(self._index) or isvar(term):
+                    continue
+                try:
+                    n = self.count(position, term)
+                except TypeError:  # unhashable (partially bound) term
+                    continue
+                if best is None or n < best_count:
+                    best, best_count = position, n
+                    if not n:
+                        break
+            if best is not None:
+                candidates = self.lookup(best, terms[best])
+            # snapshot so the goal tolerates facts changing between yields
+            for fact in tuple(candidates):
+                unified = unify(fact, terms, substitution)
+                if unified is not False:
+                    yield unified
+
+        return goal
+
+    def __str__(self) -> str:
+        return "IndexedRelation: " + self.name
+
+    __repr__ = __str__
+
+
+class FactStore:
+    """A named collection of `IndexedRelation` objects with change tracking."""
+
+    def __init__(self) -> None:
+        self._relations: Dict[str, IndexedRelation] = {}
+        self._listeners: List[Listener] = []
+        self.version = 0
+
+    def relation(self, name: str, arity: Optional[int] = None) -> IndexedRelation:
+        """Return the relation called `name`, creating it if needed."""
+        rel = self._relations.get(name)
+        if rel is None:
+            rel = IndexedRelation(name, arity, store=self)
+            self._relations[name] = rel
+        return rel
+
+    def __getitem__(self, name: str) -> IndexedRelation:
+        return self._relations[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._relations
+
+    def names(self) -> List[str]:
+        return list(self._relations.keys())
+
+    def subscribe(self, listener: Listener) -> None:
+        """Call `listener(relation, fact, added)` after every change."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        try:
+            self._listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def _changed(self, relation: IndexedRelation, fact: Optional[Fact], added: bool) -> None:
+        self.version += 1
+        for listener in list(self._listeners):
+            listener(relation, fact, added)
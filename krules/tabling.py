@@ -0,0 +1,254 @@
+"""Tabled (memoized) evaluation of recursive kanren relations.
+
+Decorate a function that builds a kanren goal from its arguments with
+`tabled` and calls to it are answered from per-call *answer tables* instead of
+re-running the body. Calls are keyed by their argument pattern up to variable
+renaming (``ancestor("bob", X)`` and ``ancestor("bob", Y)`` share a table).
+Recursive calls to a pattern that is still being evaluated consume the answers
+found so far instead of recursing, and the first call of each strongly
+connected group of such calls (the *leader*) re-runs its body until no table
+gains an answer. This SLG-style fixpoint makes left-recursive rules terminate::
+
+    @tabled(store=store)
+    def ancestor(x, y):
+        z = var()
+        return conde([ancestor(x, z), parent(z, y)], [parent(x, y)])
+
+    run(0, x, ancestor("bob", x))
+
+Completed tables are kept across queries in a per-relation LRU cache of at
+most `maxsize` call patterns. With `store` given, every table is dropped when
+the `FactStore` version changes; otherwise call `clear()` after changing the
+facts the rule depends on.
+
+Answers are computed eagerly, so the answer set of each call pattern must be
+finite. Evaluation holds a module-wide lock, so tabled queries from several
+threads (e.g. `blocking` handlers on a thread pool) run one at a time.
+"""
+from __future__ import annotations
+
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from . import stats
+
+# kanren and unification (with toolz) take tens of milliseconds to import, so
+# they are bound by `_import_logic` when a tabled relation is first used
+goaleval = isvar = reify = unify = var = None
+
+
+def _import_logic() -> None:
+    global goaleval, isvar, reify, unify, var
+    if var is None:
+        from kanren.core import goaleval
+        from unification import isvar, reify, unify, var
+
+
+# marks a variable position in a call-pattern key
+_SLOT = object()
+
+
+class _Table:
+    __slots__ = ("answers", "complete")
+
+    def __init__(self) -> None:
+        # insertion-ordered set of answer tuples
+        self.answers: Dict[Tuple, None] = {}
+        self.complete = False
+
+
+class _Frame:
+    """A call pattern under evaluation."""
+
+    __slots__ = ("table", "depth", "leader", "recursive", "members")
+
+    def __init__(self, table: _Table, depth: int) -> None:
+        self.table = table
+        self.depth = depth
+        # lowest stack depth this frame's answers depend on
+        self.leader = depth
+        self.recursive = False
+        # incomplete tables finished inside this frame's SCC
+        self.members: List[_Table] = []
+
+
+# evaluation stack shared by all tabled relations so mutual recursion works;
+# guarded by `_lock`, which a thread holds for a whole (recursive) evaluation
+_lock = threading.RLock()
+_stack: List[_Frame] = []
+_active: Dict[int, _Frame] = {}
+# bumped whenever any table gains an answer
+_added = 0
+
+
+def _variant_key(term, slots: Dict) -> Hashable:
+    if isvar(term):
+        i = slots.get(term)
+        if i is None:
+            i = slots[term] = len(slots)
+        return (_SLOT, i)
+    if isinstance(term, (tuple, list)):
+        return (type(term), tuple(_variant_key(t, slots) for t in term))
+    return term
+
+
+def _freshen(term, fresh: Dict):
+    """Rename the variables in an answer so answers never share variables."""
+    if isvar(term):
+        v = fresh.get(term)
+        if v is None:
+            v = fresh[term] = var()
+        return v
+    if isinstance(term, (tuple, list)):
+        return type(term)(_freshen(t, fresh) for t in term)
+    return term
+
+
+def _ground(term) -> bool:
+    if isvar(term):
+        return False
+    if isinstance(term, (tuple, list)):
+        return all(_ground(t) for t in term)
+    return True
+
+
+class TabledRelation:
+    """A kanren relation whose calls are answered from memoized answer tables."""
+
+    def __init__(self, func: Callable[..., Any], maxsize: int = 1024, store=None) -> None:
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.maxsize = maxsize
+        self.store = store
+        self._tables: "OrderedDict[Hashable, _Table]" = OrderedDict()
+        self._version = store.version if store is not None else None
+        # a clear requested mid-evaluation, run by the next outermost call
+        self._stale = False
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, *args: Any):
+        """Return a goal that unifies `args` with the tabled answers."""
+        _import_logic()
+
+        def goal(substitution):
+            terms = reify(args, substitution)
+            for answer in self.answers(*terms):
+                if not _ground(answer):
+                    answer = _freshen(answer, {})
+                unified = unify(answer, terms, substitution)
+                if unified is not False:
+                    yield unified
+
+        return goal
+
+    def answers(self, *terms: Any) -> List[Tuple]:
+        """Return the answers for the call pattern `terms` (evaluating if needed)."""
+        _import_logic()
+        with _lock:
+            return self._answers(terms)
+
+    def _answers(self, terms: Tuple) -> List[Tuple]:
+        if self.store is not None and self.store.version != self._version:
+            self._version = self.store.version
+            self.clear()
+        if self._stale and not _stack:
+            self.clear()
+        try:
+            key = _variant_key(terms, {})
+            table = self._tables.get(key)
+        except TypeError:  # unhashable argument: evaluate without tabling
+            return self._run(terms)
+        if table is not None and table.complete:
+            self._tables.move_to_end(key)
+            self.hits += 1
+            if stats.ENABLED:
+                stats.cache_hit("tabling")
+            return list(table.answers)
+        if table is None:
+            table = self._tables[key] = _Table()
+        frame = _active.get(id(table))
+        if frame is not None:
+            # a variant of a call still being evaluated: consume what it has so
+            # far; every frame from there up belongs to the same SCC
+            frame.recursive = True
+            for above in _stack[frame.depth:]:
+                above.leader = min(above.leader, frame.depth)
+            return list(table.answers)
+        self.misses += 1
+        if stats.ENABLED:
+            stats.cache_miss("tabling")
+        self._evaluate(table, terms)
+        self._evict()
+        return list(table.answers)
+
+    def _run(self, terms: Tuple) -> List[Tuple]:
+        return [reify(terms, s) for s in goaleval(self.func(*terms))({})]
+
+    def _evaluate(self, table: _Table, terms: Tuple) -> None:
+        global _added
+        frame = _Frame(table, len(_stack))
+        _stack.append(frame)
+        _active[id(table)] = frame
+        try:
+            while True:
+                before = _added
+                for answer in self._run(terms):
+                    if answer not in table.answers:
+                        table.answers[answer] = None
+                        _added += 1
+                if not frame.recursive or _added == before:
+                    break
+        finally:
+            _stack.pop()
+            del _active[id(table)]
+        if frame.leader == frame.depth:
+            # leader of its SCC (or not recursive at all): everything is final
+            table.complete = True
+            for member in frame.members:
+                member.complete = True
+        elif _stack:
+            # answers may still grow until the leader's fixpoint; stay incomplete
+            caller = _stack[-1]
+            caller.leader = min(caller.leader, frame.leader)
+            caller.recursive = True
+            caller.members.append(table)
+            caller.members.extend(frame.members)
+
+    def _evict(self) -> None:
+        tables = self._tables
+        if len(tables) <= self.maxsize or _stack:
+            return
+        for key in list(tables):
+            if len(tables) <= self.maxsize:
+                break
+            if tables[key].complete:
+                del tables[key]
+
+    def clear(self) -> None:
+        """Drop every answer table (after the evaluation in progress, if any)."""
+        with _lock:
+            if _stack:
+                self._stale = True  # tables are in use further up the stack
+                return
+            self._tables.clear()
+            self._stale = False
+
+    def cache_info(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "tables": len(self._tables), "maxsize": self.maxsize}
+
+
+def tabled(func: Optional[Callable] = None, *, maxsize: int = 1024, store=None):
+    """Decorate a goal-building function as a tabled relation.
+
+    Usable bare (``@tabled``) or with options (``@tabled(maxsize=256, store=store)``).
+    """
+
+    def wrap(f: Callable) -> TabledRelation:
+        return TabledRelation(f, maxsize=maxsize, store=store)
+
+    if func is not None:
+        return wrap(func)
+    return wrap
@@ -1,7 +1,36 @@
-"""mcp package: lightweight placeholders for server components."""
-from .server import MCPServer
-from .resources import ResourceManager
-from .tools import ToolManager
-from .prompts import PromptManager
+"""mcp package: lightweight placeholders for server components.
+
+The names below are imported on first access (PEP 562), so ``import mcp`` or a
+CLI that only parses arguments doesn't pay for asyncio and the server.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+# exported name -> submodule that defines it
+_EXPORTS = {
+    "MCPServer": "server",
+    "ResourceManager": "resources",
+    "ToolManager": "tools",
+    "PromptManager": "prompts",
+}
 
 __all__ = ["MCPServer", "ResourceManager", "ToolManager", "PromptManager"]
+
+if TYPE_CHECKING:  # pragma: no cover - for type checkers and IDEs only
+    from .server import MCPServer
+    from .resources import ResourceManager
+    from .tools import ToolManager
+    from .prompts import PromptManager
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -1,15 +1,20 @@
 """Console entrypoint for mcp package.
 
 Usage: python -m mcp or via installed console script `mcp-shim`.
+
+With ``--processes N`` the server runs prefork-style (see `mcp.prefork`): a
+supervisor loads ``--snapshot``/``--preload`` state once, then forks N
+workers that serve the same port and share that state copy-on-write.
+
+Startup is kept short: the server modules are imported after the arguments
+are parsed, and pool workers (with their ``--preload``) start in the
+background once the server is listening (see `MCPServer(warm_up=...)`).
 """
 from __future__ import annotations
 
 from argparse import ArgumentParser
-from mcp.server import MCPServer
-from mcp.resources import ResourceManager
-from mcp.tools import ToolManager
-from mcp.prompts import PromptManager
-import asyncio
+from mcp.executors import EXECUTOR_KINDS, create_executor, preload, warm_up, worker_count
+import functools
 import logging
 import signal
 
@@ -19,6 +24,30 @@ def main(argv=None):
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", type=int, default=31337)
     parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--pipeline", type=int, default=1, help="max concurrent requests per connection")
+    parser.add_argument("--executor", choices=EXECUTOR_KINDS, default="thread",
+                        help="pool used for blocking handlers and tools")
+    parser.add_argument("--workers", type=int, default=None, help="executor pool size")
+    parser.add_argument("--preload", action="append", default=[], metavar="MODULE[:FUNC]",
+                        help="import/call this in every worker before serving (repeatable)")
+    parser.add_argument("--call-timeout", type=float, default=None, help="seconds before a blocking call times out")
+    parser.add_argument("--metrics", action="store_true", help="collect server and krules metrics")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve GET /metrics on this port (worker i of --processes uses PORT+i)")
+    parser.add_argument("--processes", type=int, default=1, help="server processes sharing the port (prefork)")
+    parser.add_argument("--reuse-port", action="store_true",
+                        help="bind the port in every process with SO_REUSEPORT instead of sharing one socket")
+    parser.add_argument("--grace", type=float, default=10.0,
+                        help="seconds in-flight requests get to finish on SIGTERM")
+    parser.add_argument("--snapshot", default=None, help="serve the fact base from this krules snapshot")
+    parser.add_argument("--max-connections", type=int, default=None,
+                        help="refuse connections beyond this many (per process)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="answer busy beyond this many requests in flight (per process)")
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests/sec allowed per client address")
+    parser.add_argument("--rate-burst", type=float, default=None,
+                        help="token bucket size: requests a client may send at once")
+    parser.add_argument("--max-message", type=int, default=1 << 20, help="longest accepted request line in bytes")
     args = parser.parse_args(argv)
 
     if args.debug:
@@ -26,11 +55,56 @@ def main(argv=None):
     else:
         logging.basicConfig(level=logging.INFO)
 
+    snapshot = None  # keep the mapping open while serving
+    if args.snapshot:
+        from krules.snapshot import load_snapshot
+
+        # memory-mapped, so forked workers share its pages
+        snapshot = load_snapshot(args.snapshot)
+
+    if args.processes > 1:
+        from mcp.prefork import Supervisor
+
+        # build shared state once in the supervisor so workers inherit it
+        preload(*args.preload)
+        supervisor = Supervisor(functools.partial(serve, args), args.processes, host=args.host, port=args.port,
+                                reuse_port=args.reuse_port, grace=args.grace)
+        return supervisor.run()
+    serve(args)
+
+
+def serve(args, index: int = 0, sock=None) -> None:
+    """Run one server until SIGINT/SIGTERM (worker `index` of a prefork supervisor)."""
+    import asyncio
+
+    from mcp.metrics import MetricsRegistry
+    from mcp.prompts import PromptManager
+    from mcp.resources import ResourceManager
+    from mcp.server import MCPServer
+    from mcp.tools import ToolManager
+
     resources = ResourceManager()
     tools = ToolManager()
     prompts = PromptManager()
 
-    server = MCPServer(host=args.host, port=args.port, resources=resources, tools=tools, prompts=prompts)
+    # workers start (and run --preload) in the background once the server is listening
+    workers = worker_count(args.executor, args.workers)
+    executor = create_executor(args.executor, workers, preload=args.preload, warm=False)
+
+    metrics = None
+    metrics_port = None if args.metrics_port is None else args.metrics_port + index
+    if args.metrics or args.metrics_port is not None:
+        from krules import stats
+
+        stats.enable()
+        metrics = MetricsRegistry()
+        metrics.add_collector(stats.collect)
+
+    server = MCPServer(host=args.host, port=args.port, resources=resources, tools=tools, prompts=prompts,
+                       pipeline=args.pipeline, executor=executor, call_timeout=args.call_timeout,
+                       metrics=metrics, metrics_port=metrics_port, sock=sock,
+                       reuse_port=args.reuse_port and args.processes > 1, admission=admission_control(args),
+                       max_message=args.max_message, warm_up=functools.partial(warm_up, executor, workers))
 
     async def run():
         loop = asyncio.get_running_loop()
@@ -49,13 +123,39 @@ def main(argv=None):
         await server.start()
         try:
             await stop_event.wait()
+            if args.processes > 1:
+                # the supervisor may forward the signal we already got; it kills us after --grace
+                _ignore_stop_signals(loop)
         finally:
-            await server.stop()
+            await server.stop(grace=args.grace)
 
     try:
         asyncio.run(run())
     except KeyboardInterrupt:
         pass
+    finally:
+        tools.shutdown()
+        resources.close()
+        executor.shutdown(cancel_futures=True)
+
+
+def admission_control(args):
+    """The `AdmissionControl` for the --max-connections/--max-in-flight/--rate-* flags, if any is set."""
+    if args.max_connections is None and args.max_in_flight is None and args.rate_limit is None:
+        return None
+    from mcp.admission import AdmissionControl
+
+    return AdmissionControl(max_connections=args.max_connections, max_in_flight=args.max_in_flight,
+                            rate=args.rate_limit, burst=args.rate_burst)
+
+
+def _ignore_stop_signals(loop) -> None:
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.remove_signal_handler(sig)
+        except (NotImplementedError, RuntimeError):
+            pass
+        signal.signal(sig, signal.SIG_IGN)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+"""Admission control for `MCPServer`.
+
+`AdmissionControl` decides, before any work is queued, whether a new
+connection or request is taken on. It enforces three limits:
+
+- ``max_connections`` — open connections; further clients get a ``busy``
+  error instead of the ``ready`` message and are disconnected;
+- ``max_in_flight`` — requests being handled across all connections;
+- ``rate``/``burst`` — a token bucket per client address, refilled at
+  `rate` requests per second up to `burst`. A ``batch`` costs one token per
+  sub-request; one larger than `burst` is admitted from a full bucket and
+  leaves it in debt, so the client's next requests wait it off. Buckets
+  outlive connections, so reconnecting does not reset them.
+
+Refused requests are answered right away with
+``{"type":"error","reason":"busy","limit":...,"retry_after":seconds}``,
+without calling a handler. The client may retry after that many seconds, and
+`mcp.client.Client` does so automatically::
+
+    server = MCPServer(admission=AdmissionControl(max_connections=512, max_in_flight=256, rate=100))
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("mcp.admission")
+
+# buckets of disconnected clients are pruned once there are more than this many
+MAX_IDLE_BUCKETS = 4096
+
+
+def busy(limit: str, retry_after: float) -> dict:
+    """The error sent for a refused connection or request."""
+    return {"type": "error", "reason": "busy", "limit": limit, "retry_after": round(retry_after, 3)}
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`; a cost above `burst` drives it negative."""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._stamp = clock()
+
+    def take(self, n: float = 1.0) -> float:
+        """Take `n` tokens; returns 0 on success, else the seconds until they are available.
+
+        A cost above the capacity is taken from a full bucket and charged in full, so the
+        debt delays later takes: the long-run rate holds however requests are batched.
+        """
+        self._refill()
+        needed = min(n, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= n
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+
+class AdmissionControl:
+    """Connection, in-flight and per-client rate limits; None disables a limit."""
+
+    def __init__(
+        self,
+        *,
+        max_connections: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        retry_after: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_connections = max_connections
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        # default burst: one second's worth of requests
+        self.burst = burst if burst is not None else (rate or 1.0)
+        # hint sent with connection/in-flight refusals, which have no exact wait time
+        self.retry_after = retry_after
+        self._clock = clock
+        self.connections = 0
+        self.in_flight = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        # client -> open connections
+        self._clients: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {"connections": 0, "in_flight": 0, "rate": 0}
+
+    def connect(self, client: str) -> Optional[dict]:
+        """Register a new connection from `client`, or return the ``busy`` error refusing it."""
+        if self.max_connections is not None and self.connections >= self.max_connections:
+            return self._refuse("connections", self.retry_after)
+        self.connections += 1
+        self._clients[client] = self._clients.get(client, 0) + 1
+        return None
+
+    def disconnect(self, client: str) -> None:
+        self.connections -= 1
+        left = self._clients.get(client, 1) - 1
+        if left:
+            self._clients[client] = left
+        else:
+            self._clients.pop(client, None)
+            if len(self._buckets) > MAX_IDLE_BUCKETS:
+                self._prune()
+
+    def admit(self, client: str, cost: int = 1) -> Optional[dict]:
+        """Take on a request costing `cost` tokens, or return the ``busy`` error refusing it.
+
+        Every admitted request must be matched by a `release` once it is finished.
+        """
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            return self._refuse("in_flight", self.retry_after)
+        if self.rate is not None:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, self._clock)
+            wait = bucket.take(cost)
+            if wait:
+                return self._refuse("rate", wait)
+        self.in_flight += 1
+        return None
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def info(self) -> Dict[str, object]:
+        return {"connections": self.connections, "in_flight": self.in_flight, "clients": len(self._clients),
+                "rejected": dict(self.rejected)}
+
+    def _refuse(self, limit: str, retry_after: float) -> dict:
+        self.rejected[limit] += 1
+        logger.debug("refused (%s limit)", limit)
+        return busy(limit, retry_after)
+
+    def _prune(self) -> None:
+        # a full bucket of a disconnected client carries no state worth keeping
+        for client in [c for c, b in self._buckets.items() if c not in self._clients and b.full()]:
+            del self._buckets[client]
@@ -0,0 +1,118 @@
+"""Cache of encoded responses for repeated read-only requests.
+
+`ResponseCache` maps a normalized request (its content without the ``id``,
+plus the connection's codec) to the response frame exactly as it was written
+to the wire. A hit is written straight back to the socket: the handler is not
+called and nothing is serialized, apart from splicing the request's ``id``
+into the frame (see `mcp.codecs.Codec.with_field`).
+
+Entries are evicted least-recently-used once `maxsize` entries or `max_bytes`
+bytes are exceeded, and expire `ttl` seconds after they were stored. When
+given a `version` callable (e.g. `krules.facts_version`), the cache compares
+its value on every lookup and drops everything once it changes, so answers
+never outlive the facts or role assignments they were computed from::
+
+    cache = ResponseCache(maxsize=10_000, ttl=60, version=krules.facts_version)
+    server = MCPServer(cache=cache)
+    server.cache_responses("rule", when=lambda m: m.get("action") in READ_ONLY)
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger("mcp.cache")
+
+
+def request_key(message: dict) -> str:
+    """Canonical form of a request's content, ignoring its correlation ``id``."""
+    body = {k: v for k, v in message.items() if k != "id"}
+    return json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ResponseCache:
+    """Size- and age-bounded LRU of encoded response frames."""
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        *,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        version: Optional[Callable[[], Hashable]] = None,
+    ) -> None:
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._version = version
+        self._seen = version() if version is not None else None
+        # key -> (frame, expires_at or None)
+        self._entries: OrderedDict[Tuple[str, str], Tuple[bytes, Optional[float]]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def version(self) -> Hashable:
+        """Current version of the data behind the cached answers (None without a source)."""
+        return self._version() if self._version is not None else None
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        self._check_version()
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        frame, expires = entry
+        if expires is not None and time.monotonic() >= expires:
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return frame
+
+    def put(self, key: Tuple[str, str], frame: bytes, version: Hashable = None) -> None:
+        """Store `frame`, unless the data changed since `version` was read."""
+        if self._version is not None and version != self.version():
+            return  # computed from facts that have changed since
+        self._check_version()
+        if self.max_bytes is not None and len(frame) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (frame, expires)
+        self._bytes += len(frame)
+        while len(self._entries) > self.maxsize or (
+                self.max_bytes is not None and self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def info(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                "misses": self.misses, "invalidations": self.invalidations}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self) -> None:
+        if self._version is None:
+            return
+        current = self._version()
+        if current != self._seen:
+            self._seen = current
+            if self._entries:
+                self.invalidations += 1
+                logger.debug("response cache invalidated (version %r)", current)
+                self.clear()
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        frame, _ = self._entries.pop(key)
+        self._bytes -= len(frame)
@@ -0,0 +1,361 @@
+"""Async client for the MCP shim protocol.
+
+`Client` keeps a small pool of persistent connections to one server, so the
+TCP handshake and the ``ready`` exchange are paid once per connection, not
+once per request::
+
+    async with Client("127.0.0.1", 31337, pool_size=4) as client:
+        r = await client.request({"type": "rule", "action": "descendants", "who": "bob"})
+        async for name in client.stream({"type": "rule", "action": "descendants", "who": "bob"}):
+            ...
+
+Every request gets an ``id`` so several can be outstanding on one connection
+(`Connection`). Their responses are matched by ``id`` whatever order the server
+answers in. The ``id`` is removed from the returned response. Each request goes
+to the least busy connection, and new connections are opened up to
+`pool_size`.
+
+With `batch_window` (seconds), requests made within that window are coalesced
+into one ``batch`` message, up to `max_batch` requests per message. Each caller
+still gets its own result.
+
+`read_resource` yields the raw chunks of a binary resource, optionally a byte
+range of it, without JSON-decoding the body.
+
+Requests that fail with a connection error are retried up to `retries` times
+on a fresh connection, with exponential backoff and jitter starting at
+`backoff` seconds. Pass ``retry=False`` for requests that must not run twice.
+A ``busy`` refusal (see `mcp.admission`) is retried as well, after the
+server's ``retry_after`` hint, even with ``retry=False``: a refused request
+never ran. Other error responses from the server are returned as-is, not
+raised.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import random
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .codecs import JSON, Codec, get_codec
+
+logger = logging.getLogger("mcp.client")
+
+# failures that mean the connection is unusable; the request may be retried
+RETRYABLE = (ConnectionError, OSError, asyncio.IncompleteReadError, EOFError)
+
+
+class StreamError(Exception):
+    """A streamed request ended with an ``error`` frame instead of ``done``."""
+
+    def __init__(self, response: dict) -> None:
+        super().__init__(response.get("reason"))
+        self.response = response
+
+
+class Connection:
+    """One persistent connection with id-multiplexed requests."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, codec: Codec,
+                 ready: dict) -> None:
+        self._reader = reader
+        self._writer = writer
+        self.codec = codec
+        self.ready = ready
+        self._ids = itertools.count(1)
+        # id -> future (plain request) or queue (stream)
+        self._pending: Dict[int, Any] = {}
+        self.closed = False
+        self._reading = asyncio.ensure_future(self._read_loop())
+
+    @classmethod
+    async def open(cls, host: str, port: int, codec: str = "json") -> "Connection":
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            ready = json.loads(await reader.readline() or b"null")
+            if _is_busy(ready):
+                raise ConnectionError("server busy: too many connections")
+            if not isinstance(ready, dict) or ready.get("type") != "ready":
+                raise ConnectionError(f"unexpected greeting from server: {ready!r}")
+            chosen = JSON
+            if codec != JSON.name:
+                if codec not in ready.get("codecs", ()):
+                    raise ConnectionError(f"server does not accept codec {codec!r}")
+                JSON.write(writer, {"type": "hello", "codec": codec})
+                await writer.drain()
+                reply = json.loads(await reader.readline() or b"null")
+                if not isinstance(reply, dict) or reply.get("type") != "hello":
+                    raise ConnectionError(f"codec negotiation failed: {reply!r}")
+                chosen = get_codec(codec)
+        except BaseException:
+            writer.close()
+            raise
+        return cls(reader, writer, chosen, ready)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def request(self, message: dict) -> dict:
+        """Send `message` and wait for the response with the same id (returned without it)."""
+        rid = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[rid] = future
+        try:
+            await self._write({**message, "id": rid})
+            response = await future
+        finally:
+            self._pending.pop(rid, None)
+        response.pop("id", None)
+        return response
+
+    async def stream(self, message: dict) -> AsyncIterator[Any]:
+        """Send a streamed request and yield the items of its ``partial`` frames.
+
+        For a binary resource request the raw bytes of each ``chunk`` are yielded instead.
+        """
+        rid = next(self._ids)
+        frames: asyncio.Queue = asyncio.Queue()
+        self._pending[rid] = frames
+        try:
+            await self._write({**message, "id": rid, "stream": True})
+            while True:
+                frame = await frames.get()
+                if isinstance(frame, BaseException):
+                    raise frame
+                kind = frame.get("type")
+                if kind == "partial":
+                    for item in frame.get("items", ()):
+                        yield item
+                elif kind == "chunk":
+                    yield frame["data"]
+                elif kind == "resource_response":
+                    continue  # the header of a binary body
+                elif kind == "done":
+                    return
+                else:
+                    raise StreamError(frame)
+        finally:
+            self._pending.pop(rid, None)
+
+    async def _write(self, message: dict) -> None:
+        if self.closed:
+            raise ConnectionError("connection is closed")
+        self.codec.write(self._writer, message)
+        await self._writer.drain()
+
+    async def _read_loop(self) -> None:
+        error: BaseException = ConnectionError("connection closed by server")
+        try:
+            while True:
+                frame = await self.codec.read_frame(self._reader)
+                if frame is None:
+                    break
+                message = self.codec.decode(frame)
+                if isinstance(message, dict) and message.get("type") == "chunk":
+                    # a binary resource chunk: the raw bytes follow the frame
+                    message["data"] = await self._reader.readexactly(message["length"])
+                target = self._pending.get(message.get("id")) if isinstance(message, dict) else None
+                if isinstance(target, asyncio.Queue):
+                    target.put_nowait(message)
+                elif target is not None and not target.done():
+                    target.set_result(message)
+        except asyncio.CancelledError:
+            error = ConnectionError("connection closed")
+        except Exception as exc:
+            error = exc if isinstance(exc, RETRYABLE) else ConnectionError(f"bad frame from server: {exc}")
+        finally:
+            self.closed = True
+            for target in self._pending.values():
+                if isinstance(target, asyncio.Queue):
+                    target.put_nowait(error)
+                elif not target.done():
+                    target.set_exception(error)
+
+    async def close(self) -> None:
+        self.closed = True
+        self._reading.cancel()
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except Exception:
+            pass
+        await asyncio.gather(self._reading, return_exceptions=True)
+
+
+class Client:
+    """Pooled, multiplexing client for one MCP server."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 31337,
+        *,
+        pool_size: int = 4,
+        codec: str = "json",
+        timeout: Optional[float] = None,
+        retries: int = 2,
+        backoff: float = 0.05,
+        batch_window: Optional[float] = None,
+        max_batch: int = 100,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.pool_size = max(1, pool_size)
+        self.codec = codec
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_window = batch_window
+        self.max_batch = max(1, max_batch)
+        self._connections: List[Connection] = []
+        self._open_lock = asyncio.Lock()
+        # requests waiting for the current batching window to close
+        self._window: List[Tuple[dict, asyncio.Future]] = []
+        self._window_timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def __aenter__(self) -> "Client":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def request(self, message: dict, *, retry: bool = True, timeout: Optional[float] = None) -> dict:
+        """Send one request and return its response."""
+        if self.batch_window is not None and retry and message.get("type") != "batch":
+            future = asyncio.get_running_loop().create_future()
+            self._window.append((message, future))
+            if len(self._window) >= self.max_batch:
+                self._flush()
+            elif self._window_timer is None:
+                self._window_timer = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+            # the wait covers the window and the batch it goes out in
+            return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        return await self._send(message, retry, timeout)
+
+    async def batch(self, messages: List[dict]) -> List[dict]:
+        """Send `messages` as one ``batch`` request and return their results in order."""
+        response = await self._send({"type": "batch", "requests": list(messages)}, True, None)
+        if response.get("type") != "batch_response":
+            return [response] * len(messages)  # the whole batch was rejected
+        return response["results"]
+
+    async def stream(self, message: dict) -> AsyncIterator[Any]:
+        """Yield the items of a streamed response (see "Streaming responses" in the README)."""
+        connection = await self._acquire()
+        async for item in connection.stream(message):
+            yield item
+
+    async def read_resource(self, name: str, *, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Yield the body of binary resource `name` (or a byte range of it) in chunks."""
+        message = {"type": "resource", "name": name, "binary": True, "offset": offset}
+        if length is not None:
+            message["length"] = length
+        async for chunk in self.stream(message):
+            yield chunk
+
+    async def close(self) -> None:
+        if self._window_timer is not None:
+            self._window_timer.cancel()
+            self._window_timer = None
+        for _, future in self._window:
+            future.cancel()
+        self._window.clear()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        connections, self._connections = self._connections, []
+        await asyncio.gather(*(c.close() for c in connections), return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._window_timer is not None:
+            self._window_timer.cancel()
+            self._window_timer = None
+        # requests whose caller timed out or was cancelled before the window closed are not sent
+        pending = [(message, future) for message, future in self._window if not future.done()]
+        self._window = []
+        if not pending:
+            return
+        task = asyncio.ensure_future(self._send_window(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_window(self, pending: List[Tuple[dict, asyncio.Future]]) -> None:
+        try:
+            if len(pending) == 1:
+                results = [await self._send(pending[0][0], True, None)]
+            else:
+                results = await self.batch([message for message, _ in pending])
+        except BaseException as exc:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _send(self, message: dict, retry: bool, timeout: Optional[float]) -> dict:
+        timeout = self.timeout if timeout is None else timeout
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            connection = None
+            try:
+                connection = await self._acquire()
+                response = await asyncio.wait_for(connection.request(message), timeout)
+            except asyncio.TimeoutError:
+                raise  # an OSError since 3.11, but the request may still be running: don't resend
+            except RETRYABLE as exc:
+                if connection is not None:
+                    await self._discard(connection)
+                if last or not retry:
+                    raise
+                delay = self._delay(attempt)
+                logger.debug("request failed (%s); retrying in %.3fs", exc, delay)
+            else:
+                if last or not _is_busy(response):
+                    return response
+                # refused before it ran, so it is safe to resend even without `retry`
+                delay = max(self._delay(attempt), float(response.get("retry_after") or 0))
+                logger.debug("server busy (%s); retrying in %.3fs", response.get("limit"), delay)
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def _delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter."""
+        return self.backoff * 2 ** attempt * (0.5 + random.random())
+
+    async def _acquire(self) -> Connection:
+        connection = self._pick()
+        if connection is not None:
+            return connection
+        async with self._open_lock:
+            connection = self._pick()
+            if connection is None:
+                connection = await Connection.open(self.host, self.port, self.codec)
+                self._connections.append(connection)
+            return connection
+
+    def _pick(self) -> Optional[Connection]:
+        """The least busy live connection, or None if another one should be opened."""
+        live = [c for c in self._connections if not c.closed]
+        self._connections = live
+        if not live:
+            return None
+        best = min(live, key=lambda c: c.in_flight)
+        if best.in_flight == 0 or len(live) >= self.pool_size:
+            return best
+        return None
+
+    async def _discard(self, connection: Connection) -> None:
+        if connection in self._connections:
+            self._connections.remove(connection)
+        await connection.close()
+
+
+def _is_busy(response) -> bool:
+    return isinstance(response, dict) and response.get("type") == "error" and response.get("reason") == "busy"
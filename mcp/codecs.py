@@ -0,0 +1,186 @@
+"""Wire codecs for the MCP shim protocol.
+
+A codec owns both framing and serialization of messages on a connection:
+
+- ``json`` — newline-delimited JSON via the stdlib (the default, and the
+  format of the ``ready``/``hello`` handshake);
+- ``orjson`` — newline-delimited JSON encoded/decoded with ``orjson`` when it
+  is installed; lines are decoded straight from the read buffer's bytes;
+- ``msgpack`` — MessagePack with a 4-byte big-endian length prefix when
+  ``msgpack`` is installed; frames are read with ``readexactly`` and unpacked
+  without an intermediate text copy.
+
+The server lists the codecs it accepts in its ``ready`` message. A client
+switches by sending ``{"type":"hello","codec":"msgpack"}`` as its first
+message; the server confirms with a JSON ``hello`` reply and both sides use
+the new codec from then on.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+try:  # optional fast JSON
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+try:  # optional MessagePack
+    import msgpack
+except ImportError:  # pragma: no cover - depends on environment
+    msgpack = None
+
+# upper bound on a single length-prefixed frame
+MAX_FRAME = 64 * 1024 * 1024
+
+
+class FrameTooLarge(ValueError):
+    """A peer sent (or announced) a frame larger than the codec or reader accepts."""
+
+
+class Codec:
+    """Base class: subclasses provide framing (`read_frame`) and `encode`/`decode`."""
+
+    name = ""
+
+    def encode(self, obj: Any) -> bytes:
+        """Serialize `obj` into one complete frame."""
+        raise NotImplementedError
+
+    def decode(self, frame: bytes) -> Any:
+        raise NotImplementedError
+
+    def write(self, writer: asyncio.StreamWriter, obj: Any) -> None:
+        writer.write(self.encode(obj))
+
+    def with_field(self, frame: bytes, key: str, value: Any) -> bytes:
+        """Return the encoded dict `frame` with ``key: value`` added (used for cached responses)."""
+        return self.encode({**self.decode(frame), key: value})
+
+    async def read_frame(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        """Return the next frame's payload, or None at EOF."""
+        raise NotImplementedError
+
+
+class LineCodec(Codec):
+    """Newline-delimited framing."""
+
+    def with_field(self, frame: bytes, key: str, value: Any) -> bytes:
+        # splice into the JSON object text instead of decoding it: b'{...}\n' + b'{"k":v}\n'
+        extra = self.encode({key: value})
+        if frame.startswith(b"{}"):
+            return extra
+        return frame[:-2] + b"," + extra[1:]
+
+    async def read_frame(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as exc:
+            return exc.partial or None  # EOF, possibly after an unterminated last line
+        except asyncio.LimitOverrunError as exc:
+            # longer than the reader's `limit`: skip to the end of the line without buffering it
+            raise FrameTooLarge(await _skip_line(reader, exc.consumed))
+
+
+async def _skip_line(reader: asyncio.StreamReader, pending: int) -> int:
+    """Discard the rest of an oversized line; returns its length."""
+    skipped = 0
+    while True:
+        await reader.readexactly(pending)
+        skipped += pending
+        try:
+            return skipped + len(await reader.readuntil(b"\n"))
+        except asyncio.IncompleteReadError as exc:
+            return skipped + len(exc.partial)
+        except asyncio.LimitOverrunError as exc:
+            pending = exc.consumed
+
+
+class LengthPrefixedCodec(Codec):
+    """4-byte big-endian length prefix followed by the payload."""
+
+    max_frame = MAX_FRAME
+
+    def write(self, writer: asyncio.StreamWriter, obj: Any) -> None:
+        payload = self.pack(obj)
+        writer.write(len(payload).to_bytes(4, "big"))
+        writer.write(payload)
+
+    def encode(self, obj: Any) -> bytes:
+        payload = self.pack(obj)
+        return len(payload).to_bytes(4, "big") + payload
+
+    def pack(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+    def with_field(self, frame: bytes, key: str, value: Any) -> bytes:
+        return self.encode({**self.decode(frame[4:]), key: value})
+
+    async def read_frame(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        try:
+            header = await reader.readexactly(4)
+        except asyncio.IncompleteReadError as exc:
+            if not exc.partial:
+                return None
+            raise
+        size = int.from_bytes(header, "big")
+        if size > self.max_frame:
+            # skip the payload so the stream stays in sync, then report it
+            remaining = size
+            while remaining:
+                chunk = await reader.read(min(remaining, 1 << 16))
+                if not chunk:
+                    return None
+                remaining -= len(chunk)
+            raise FrameTooLarge(size)
+        return await reader.readexactly(size)
+
+
+class JSONCodec(LineCodec):
+    name = "json"
+
+    def encode(self, obj: Any) -> bytes:
+        return (json.dumps(obj, separators=(",", ":")) + "\n").encode("utf8")
+
+    def decode(self, frame: bytes) -> Any:
+        # json.loads accepts UTF-8 bytes directly; no separate decode step
+        return json.loads(frame)
+
+
+class ORJSONCodec(LineCodec):
+    name = "orjson"
+
+    def encode(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+
+    def decode(self, frame: bytes) -> Any:
+        return orjson.loads(frame)
+
+
+class MsgpackCodec(LengthPrefixedCodec):
+    name = "msgpack"
+
+    def pack(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def decode(self, frame: bytes) -> Any:
+        return msgpack.unpackb(frame, raw=False)
+
+
+JSON = JSONCodec()
+
+CODECS: Dict[str, Codec] = {"json": JSON}
+if orjson is not None:
+    CODECS["orjson"] = ORJSONCodec()
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+
+
+def available_codecs() -> List[str]:
+    return list(CODECS)
+
+
+def get_codec(name: str) -> Codec:
+    """Return the codec called `name` or raise KeyError if it is unavailable."""
+    return CODECS[name]
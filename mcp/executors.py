@@ -0,0 +1,127 @@
+"""Executor helpers for running blocking handlers and tools off the event loop.
+
+Mark a function with `blocking` (or pass ``blocking=True`` when registering it)
+and `MCPServer` runs it on its executor instead of inside the event loop.
+`create_executor` builds a thread or process pool whose workers can be
+pre-warmed, e.g. with the fact base already loaded::
+
+    executor = create_executor("process", 4, preload=["krules.helpers:ancestry"])
+    server = MCPServer(executor=executor, call_timeout=5.0)
+"""
+from __future__ import annotations
+
+import importlib
+import os
+import threading
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+if TYPE_CHECKING:  # concurrent.futures is imported when a pool is made, not at CLI startup
+    from concurrent.futures import Executor
+
+EXECUTOR_KINDS = ("thread", "process")
+
+
+def blocking(func: Optional[Callable] = None, *, timeout: Optional[float] = None):
+    """Mark `func` as blocking so the server runs it on its executor.
+
+    Usable bare (``@blocking``) or with a per-call timeout
+    (``@blocking(timeout=2.0)``).
+    """
+
+    def mark(f: Callable) -> Callable:
+        f.__mcp_blocking__ = True
+        f.__mcp_timeout__ = timeout
+        return f
+
+    if func is not None:
+        return mark(func)
+    return mark
+
+
+def is_blocking(func: Callable) -> bool:
+    return bool(getattr(func, "__mcp_blocking__", False))
+
+
+def default_timeout(func: Callable) -> Optional[float]:
+    return getattr(func, "__mcp_timeout__", None)
+
+
+def preload(*specs: str) -> None:
+    """Import ``module`` or call ``module:function`` for each spec.
+
+    Used as the pool initializer so every worker starts with the expensive
+    state (modules, fact base, closures) already loaded.
+    """
+    for spec in specs:
+        module_name, _, attr = spec.partition(":")
+        module = importlib.import_module(module_name)
+        if attr:
+            getattr(module, attr)()
+
+
+def worker_count(kind: str = "thread", max_workers: Optional[int] = None) -> int:
+    """The number of workers `create_executor(kind, max_workers)` builds."""
+    if max_workers is not None:
+        return max_workers
+    cpus = os.cpu_count() or 1
+    # the concurrent.futures defaults
+    return min(32, cpus + 4) if kind == "thread" else cpus
+
+
+def _arrive(barrier, timeout: float) -> None:
+    barrier.wait(timeout)
+
+
+def warm_up(executor: Executor, workers: int, timeout: float = 60.0) -> None:
+    """Start all `workers` of `executor` (and run their initializer) now rather than on first use.
+
+    Each warm-up task waits on a barrier until `workers` of them are running, so an idle
+    worker can't take a second task while another worker never starts.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if isinstance(executor, ProcessPoolExecutor):
+        import multiprocessing
+
+        with multiprocessing.Manager() as manager:
+            _run_barrier(executor, manager.Barrier(workers), workers, timeout)
+    else:
+        _run_barrier(executor, threading.Barrier(workers), workers, timeout)
+
+
+def _run_barrier(executor: Executor, barrier, workers: int, timeout: float) -> None:
+    for future in [executor.submit(_arrive, barrier, timeout) for _ in range(workers)]:
+        future.result()
+
+
+def create_executor(
+    kind: str = "thread",
+    max_workers: Optional[int] = None,
+    *,
+    preload: Iterable[str] = (),
+    warm: bool = True,
+) -> Executor:
+    """Build a thread or process pool, optionally pre-warmed with `preload` specs.
+
+    With ``warm=False`` the workers start on first use; pass the pool and its
+    `worker_count` to `warm_up` (or `MCPServer(warm_up=...)`) to start them later.
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    specs = tuple(preload)
+    initializer = _preload if specs else None
+    workers = worker_count(kind, max_workers)
+    if kind == "thread":
+        executor: Executor = ThreadPoolExecutor(workers, thread_name_prefix="mcp-worker",
+                                                initializer=initializer, initargs=(specs,))
+    elif kind == "process":
+        executor = ProcessPoolExecutor(workers, initializer=initializer, initargs=(specs,))
+    else:
+        raise ValueError(f"unknown executor kind {kind!r}; expected one of {EXECUTOR_KINDS}")
+    if warm:
+        warm_up(executor, workers)
+    return executor
+
+
+def _preload(specs) -> None:
+    preload(*specs)
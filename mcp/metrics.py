@@ -0,0 +1,264 @@
+"""Prometheus-style metrics for the MCP server.
+
+`MetricsRegistry` holds counters, gauges and histograms keyed by label values
+and renders them in the Prometheus text exposition format (`render`) or as a
+JSON-friendly dict (`snapshot`). Other components expose their own numbers by
+registering a collector, a callable returning
+``[(name, kind, help, [(labels, value), ...]), ...]`` — e.g.
+`krules.stats.collect`::
+
+    registry = MetricsRegistry()
+    registry.add_collector(krules.stats.collect)
+    server = MCPServer(metrics=registry, metrics_port=9100)
+
+Metrics are plain Python numbers updated from the event loop thread; no
+locking is done.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("mcp.metrics")
+
+# latency buckets in seconds, from sub-millisecond dict lookups to slow rule queries
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Dict[str, str]
+Family = Tuple[str, str, str, List[Tuple[Labels, float]]]
+Collector = Callable[[], List[Family]]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Tuple[str, ...]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return labels
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        return [(self.name, dict(zip(self.labelnames, k)), v) for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    """A value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        out = []
+        for key, (counts, total) in self._values.items():
+            labels = dict(zip(self.labelnames, key))
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                out.append((self.name + "_bucket", {**labels, "le": _format_value(bound)}, running))
+            out.append((self.name + "_sum", labels, total))
+            out.append((self.name + "_count", labels, running))
+        return out
+
+
+class MetricsRegistry:
+    """A set of named metrics plus external collectors."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Collector] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"metric {metric.name!r} already registered as a {existing.kind}")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help: str = "", labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+    def add_collector(self, collector: Collector) -> None:
+        """Include the families returned by `collector()` in every export."""
+        self._collectors.append(collector)
+
+    def families(self) -> List[Tuple[str, str, str, List[Tuple[str, Labels, float]]]]:
+        out = [(m.name, m.kind, m.help, m.samples()) for m in self._metrics.values()]
+        for collector in self._collectors:
+            try:
+                for name, kind, help, samples in collector():
+                    out.append((name, kind, help, [(name, labels, value) for labels, value in samples]))
+            except Exception:
+                logger.exception("metrics collector failed")
+        return out
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, kind, help, samples in self.families():
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample, labels, value in samples:
+                lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Return ``{name: {"type": kind, "samples": [...]}}`` for JSON responses."""
+        return {
+            name: {"type": kind, "samples": [{"name": s, "labels": labels, "value": value}
+                                             for s, labels, value in samples]}
+            for name, kind, help, samples in self.families()
+        }
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for k, v in labels.items()
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+async def start_http_server(registry: MetricsRegistry, host: str, port: int) -> asyncio.AbstractServer:
+    """Serve ``GET /metrics`` as Prometheus text from the running event loop."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await reader.readline()
+            # drain the headers; the request line is all we need
+            while True:
+                line = await reader.readline()
+                if not line or line in (b"\r\n", b"\n"):
+                    break
+            parts = request.split()
+            if len(parts) >= 2 and parts[0] in (b"GET", b"HEAD") and parts[1].split(b"?")[0] == b"/metrics":
+                status = "200 OK"
+                body = registry.render().encode("utf8")
+                ctype = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                status = "404 Not Found"
+                body = b"not found\n"
+                ctype = "text/plain; charset=utf-8"
+            head = (f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode("latin1")
+            writer.write(head if parts[:1] == [b"HEAD"] else head + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    return await asyncio.start_server(handle, host, port)
+
+
+class ServerMetrics:
+    """The request/connection metrics `MCPServer` maintains in a registry."""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.requests = registry.counter("mcp_requests_total", "Requests handled, by message type.", ("type",))
+        self.errors = registry.counter("mcp_request_errors_total", "Requests answered with an error.",
+                                       ("type", "reason"))
+        self.duration = registry.histogram("mcp_request_duration_seconds", "Request handling latency.", ("type",))
+        self.in_flight = registry.gauge("mcp_requests_in_flight", "Requests currently being handled.")
+        self.connections = registry.gauge("mcp_connections", "Open client connections.")
+        self.cache = registry.counter("mcp_response_cache_total", "Response cache lookups, by result.",
+                                      ("type", "result"))
+        self.rejected = registry.counter("mcp_rejected_total", "Connections and requests refused as busy, by limit.",
+                                         ("limit",))
+
+    def finished(self, mtype: str, response, seconds: float, reason: Optional[str] = None) -> None:
+        """Record a handled request; `response` may be a dict, None or a stream iterator.
+
+        `reason` labels an error response instead of its ``reason`` field, which for a raised
+        exception holds the message: one series per distinct message would grow without bound.
+        """
+        self.in_flight.dec()
+        if reason is None and isinstance(response, dict) and response.get("type") == "error":
+            reason = str(response.get("reason"))
+            if reason == "unknown_type":
+                # don't let clients create a label per made-up type
+                mtype = "unknown"
+        self.requests.inc(mtype)
+        self.duration.observe(seconds, mtype)
+        if reason is not None:
+            self.errors.inc(mtype, reason)
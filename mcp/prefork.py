@@ -0,0 +1,194 @@
+"""Pre-forked multi-process serving.
+
+One `MCPServer` runs one event loop on one core. `Supervisor` forks N worker
+processes that each run their own server on the same port. The port is
+shared in one of two ways:
+
+- by default the supervisor binds and listens once and the workers inherit
+  the listening socket; whichever worker accepts first gets the connection;
+- with ``reuse_port=True`` every worker binds its own socket with
+  ``SO_REUSEPORT`` and the kernel spreads connections across them (Linux,
+  BSD). A fixed port is required.
+
+Whatever the supervisor loads before `run` — a memory-mapped
+`krules.snapshot`, the fact store, a closure index built by ``--preload`` — is
+shared with the workers copy-on-write. The supervisor calls `gc.freeze()`
+before forking so the collector doesn't write to (and so copy) those pages.
+
+The supervisor restarts workers that exit while it is running, backing off
+when they crash right after starting. On SIGTERM or SIGINT it forwards
+SIGTERM to every worker. Workers stop accepting, let in-flight requests
+finish (`MCPServer.stop(grace=...)`) and exit. Workers still running after
+`grace` seconds are killed. POSIX only.
+"""
+from __future__ import annotations
+
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("mcp.prefork")
+
+# target(index, sock): serve until SIGTERM; sock is None with reuse_port
+WorkerTarget = Callable[[int, Optional[socket.socket]], None]
+
+# a worker that exits sooner than this after starting counts as crash-looping
+MIN_UPTIME = 1.0
+MAX_RESTART_DELAY = 30.0
+
+
+def listen_socket(host: str, port: int, *, reuse_port: bool = False, backlog: int = 1024) -> socket.socket:
+    """Bind and listen on `host`:`port`, returning a non-blocking socket."""
+    family, kind, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM,
+                                                         flags=socket.AI_PASSIVE)[0]
+    sock = socket.socket(family, kind, proto)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(address)
+        sock.listen(backlog)
+        sock.setblocking(False)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+class Supervisor:
+    """Fork `processes` workers running `target` and keep them alive."""
+
+    def __init__(
+        self,
+        target: WorkerTarget,
+        processes: int,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 31337,
+        reuse_port: bool = False,
+        grace: float = 10.0,
+        restart_delay: float = 0.5,
+    ) -> None:
+        if reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("SO_REUSEPORT is not supported on this platform")
+        if reuse_port and port == 0:
+            raise ValueError("reuse_port needs a fixed port")
+        self.target = target
+        self.processes = max(1, processes)
+        self.host = host
+        self.port = port
+        self.reuse_port = reuse_port
+        self.grace = grace
+        self.restart_delay = restart_delay
+        self.sock: Optional[socket.socket] = None
+        # pid -> (worker index, start time)
+        self.workers: Dict[int, Tuple[int, float]] = {}
+        self.restarts = 0
+        self._stopping = False
+        # (due time, index) of workers waiting to be restarted
+        self._pending: List[Tuple[float, int]] = []
+        self._delays: Dict[int, float] = {}
+
+    def listen(self) -> None:
+        """Bind the shared listening socket now (done by `run` if not called first)."""
+        if self.sock is None and not self.reuse_port:
+            self.sock = listen_socket(self.host, self.port)
+            self.port = self.sock.getsockname()[1]
+
+    def stop(self, *_) -> None:
+        """Ask the supervisor to drain and stop its workers (also the SIGTERM/SIGINT handler)."""
+        self._stopping = True
+
+    def run(self) -> int:
+        """Fork the workers and supervise them until stopped; returns an exit status."""
+        self.listen()
+        previous = {sig: signal.signal(sig, self.stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            gc.freeze()
+            for index in range(self.processes):
+                self._spawn(index)
+            logger.info("supervising %d workers on %s:%d", self.processes, self.host, self.port)
+            self._supervise()
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            if self.sock is not None:
+                self.sock.close()
+        return 0
+
+    def _supervise(self) -> None:
+        deadline = None
+        while self.workers or (self._pending and not self._stopping):
+            self._reap()
+            if self._stopping and deadline is None:
+                if self.workers:
+                    logger.info("stopping %d workers (grace %.1fs)", len(self.workers), self.grace)
+                self._pending.clear()
+                self._signal_all(signal.SIGTERM)
+                deadline = time.monotonic() + self.grace
+            if deadline is not None and time.monotonic() >= deadline and self.workers:
+                logger.warning("killing %d workers that did not stop in time", len(self.workers))
+                self._signal_all(signal.SIGKILL)
+                deadline = float("inf")
+            now = time.monotonic()
+            for entry in [e for e in self._pending if e[0] <= now]:
+                self._pending.remove(entry)
+                self._spawn(entry[1])
+            time.sleep(0.05)
+
+    def _spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child
+            code = 0
+            try:
+                for sig in (signal.SIGTERM, signal.SIGINT):
+                    signal.signal(sig, signal.SIG_DFL)
+                self.target(index, self.sock)
+            except SystemExit as exc:
+                code = exc.code if isinstance(exc.code, int) else 1
+            except BaseException:
+                logger.exception("worker %d failed", index)
+                code = 1
+            finally:
+                logging.shutdown()
+                os._exit(code)
+        self.workers[pid] = (index, time.monotonic())
+        logger.info("worker %d started (pid %d)", index, pid)
+
+    def _reap(self) -> None:
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if pid == 0:
+                return
+            entry = self.workers.pop(pid, None)
+            if entry is None:
+                continue
+            index, started = entry
+            code = os.waitstatus_to_exitcode(status)
+            if self._stopping:
+                logger.info("worker %d (pid %d) exited with %d", index, pid, code)
+                continue
+            # back off while a worker keeps dying right after it starts
+            if time.monotonic() - started < MIN_UPTIME:
+                delay = min(MAX_RESTART_DELAY, max(self.restart_delay, 2 * self._delays.get(index, 0.0)))
+            else:
+                delay = 0.0
+            self._delays[index] = delay
+            logger.warning("worker %d (pid %d) exited with %d; restarting in %.1fs", index, pid, code, delay)
+            self.restarts += 1
+            self._pending.append((time.monotonic() + delay, index))
+
+    def _signal_all(self, sig: int) -> None:
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
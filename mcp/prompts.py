@@ -1,22 +1,167 @@
-"""Placeholder PromptManager for the MCP shim.
+"""Prompt templates for the MCP shim.
 
-Implement prompt templates, parameterization and rendering here.
+Templates use `str.format` syntax. `register` compiles each one into a
+`Template`: a list of literal segments and pre-parsed replacement fields.
+Rendering then only looks up and formats the fields and joins the pieces,
+without re-parsing the template text. A template without fields always
+renders to the same string object.
+
+`PromptManager.render` memoizes results in an LRU of `cache_size` entries,
+keyed by the prompt and its arguments when those are all str, int, bool or
+None. `iter_render` yields the pieces one at a time instead of joining them,
+so a large prompt can be streamed (the server does this for ``prompt``
+requests with ``stream``) without building it in memory first.
 """
 from __future__ import annotations
 
-from typing import Any, Dict
+from _string import formatter_field_name_split  # the parser behind string.Formatter.get_field
+from collections import OrderedDict
+from string import Formatter
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple, Union
+
+_FORMATTER = Formatter()
+
+# argument types whose equality implies an identical rendering
+_CACHEABLE = (str, int, bool, type(None))
+
+_CONVERSIONS = {None: None, "s": str, "r": repr, "a": ascii}
+
+
+class _Field:
+    """One compiled ``{name.attr[key]!conversion:spec}`` replacement field."""
+
+    __slots__ = ("name", "path", "convert", "spec", "spec_template")
+
+    def __init__(self, field: str, spec: str, conversion: Optional[str]) -> None:
+        first, rest = formatter_field_name_split(field)
+        self.name = first
+        self.path: Tuple[Tuple[bool, Any], ...] = tuple(rest)
+        if conversion not in _CONVERSIONS:
+            raise ValueError(f"Unknown conversion specifier {conversion}")
+        self.convert = _CONVERSIONS[conversion]
+        self.spec = spec
+        # a spec may itself contain fields, e.g. "{price:{width}}"
+        self.spec_template = Template(spec) if "{" in spec else None
+
+    def render(self, kwargs: Dict[str, Any]) -> str:
+        value = kwargs[self.name]
+        for is_attr, key in self.path:
+            value = getattr(value, key) if is_attr else value[key]
+        if self.convert is not None:
+            value = self.convert(value)
+        spec = self.spec if self.spec_template is None else self.spec_template.render(kwargs)
+        return format(value, spec)
+
+
+class Template:
+    """A `str.format` template compiled into literal segments and fields."""
+
+    __slots__ = ("source", "parts", "names", "static")
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        parts: List[Union[str, _Field]] = []
+        positional = False
+        for literal, field, spec, conversion in _FORMATTER.parse(source):
+            if literal:
+                if parts and isinstance(parts[-1], str):
+                    parts[-1] += literal
+                else:
+                    parts.append(literal)
+            if field is None:
+                continue
+            compiled = _Field(field, spec or "", conversion)
+            if not isinstance(compiled.name, str) or not compiled.name:
+                positional = True  # {} / {0}: render takes keywords only, leave the error to str.format
+            parts.append(compiled)
+        self.parts: Optional[List[Union[str, _Field]]] = None if positional else parts
+        self.names: FrozenSet[str] = frozenset(p.name for p in parts if isinstance(p, _Field)
+                                               and isinstance(p.name, str))
+        # the whole rendering when there is nothing to substitute
+        self.static: Optional[str] = None
+        if not positional and not any(isinstance(p, _Field) for p in parts):
+            self.static = parts[0] if parts else ""
+
+    def render(self, kwargs: Dict[str, Any]) -> str:
+        if self.static is not None:
+            return self.static
+        if self.parts is None:
+            return self.source.format(**kwargs)
+        return "".join([p if p.__class__ is str else p.render(kwargs) for p in self.parts])
+
+    def iter_render(self, kwargs: Dict[str, Any]) -> Iterator[str]:
+        """Yield the rendered pieces in order; literal segments are yielded as-is."""
+        if self.parts is None:
+            yield self.render(kwargs)
+            return
+        for part in self.parts:
+            yield part if part.__class__ is str else part.render(kwargs)
 
 
 class PromptManager:
-    def __init__(self) -> None:
-        self._prompts: Dict[str, Any] = {}
+    def __init__(self, cache_size: int = 256) -> None:
+        self._prompts: Dict[str, Template] = {}
+        # (prompt_id, arguments) -> rendered text, least recently used first
+        self._renders: OrderedDict[tuple, str] = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
 
     def register(self, prompt_id: str, template: str) -> None:
-        self._prompts[prompt_id] = template
+        """Compile and store `template`; raises ValueError if it is malformed."""
+        self._prompts[prompt_id] = Template(template)
+        for key in [k for k in self._renders if k[0] == prompt_id]:
+            del self._renders[key]
+
+    def get(self, prompt_id: str) -> Template:
+        return self._prompts[prompt_id]
 
     def render(self, prompt_id: str, **kwargs) -> str:
         template = self._prompts[prompt_id]
-        return template.format(**kwargs)
+        if template.static is not None:
+            return template.static
+        key = _render_key(prompt_id, kwargs) if self.cache_size > 0 else None
+        if key is None:
+            return template.render(kwargs)
+        text = self._renders.get(key)
+        if text is not None:
+            self._renders.move_to_end(key)
+            self.hits += 1
+            return text
+        self.misses += 1
+        text = template.render(kwargs)
+        self._renders[key] = text
+        if len(self._renders) > self.cache_size:
+            self._renders.popitem(last=False)
+        return text
+
+    def iter_render(self, prompt_id: str, **kwargs) -> Iterator[str]:
+        """Return an iterator over the pieces of the rendered prompt.
+
+        Raises KeyError right away for an unknown prompt or a missing argument.
+        """
+        template = self._prompts[prompt_id]
+        missing = template.names - kwargs.keys()
+        if missing:
+            raise KeyError(min(missing))
+        return template.iter_render(kwargs)
+
+    def cache_info(self) -> Dict[str, int]:
+        return {"entries": len(self._renders), "hits": self.hits, "misses": self.misses}
 
     def list(self) -> list[str]:
         return list(self._prompts.keys())
+
+    def __contains__(self, prompt_id: object) -> bool:
+        return prompt_id in self._prompts
+
+
+def _render_key(prompt_id: str, kwargs: Dict[str, Any]) -> Optional[tuple]:
+    # the type is part of the key: 1 == True, but they render differently
+    items = []
+    for name, value in kwargs.items():
+        if value.__class__ not in _CACHEABLE:
+            return None
+        items.append((name, value.__class__, value))
+    items.sort(key=lambda item: item[0])
+    return (prompt_id, tuple(items))
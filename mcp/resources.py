@@ -1,23 +1,302 @@
-"""Placeholder ResourceManager for the MCP shim.
+"""Resource registry for the MCP shim.
 
-Implement resource loading/access in this module.
+Resources are registered either built (`register`) or as factories
+(`register_factory`) that are called on first access:
+
+- `get` (sync) and `load` (async) materialize a lazy resource on first use.
+  Concurrent first accesses share one load, whether they come from threads
+  (`get`) or tasks (`load`), so a factory runs only once;
+- with ``ttl``, a value older than `ttl` seconds is still returned, and a
+  refresh is started in the background (in a thread for sync factories, as a
+  task for async ones). Callers never wait for a reload;
+- with ``memory_budget`` (bytes), the least recently used lazy resources are
+  evicted once the loaded ones exceed the budget, and reloaded on their next
+  access. Sizes come from ``size=`` or the manager's `sizeof` (``len`` of
+  bytes/str/memoryview, else `sys.getsizeof`). Resources from `register` are
+  pinned and never evicted.
+
+From async code, prefer ``await load(name)``: `get` calls a sync factory in
+the calling thread, and cannot run an async one.
+
+Large binary resources should be a `FileResource` (a path) or a buffer
+(bytes, memoryview or `mmap.mmap`). `MCPServer` sends their bodies in raw
+chunks, not as JSON content; see "Binary resources" in the README.
 """
 from __future__ import annotations
 
-from typing import Any, Dict
+import asyncio
+import inspect
+import logging
+import mmap
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger("mcp.resources")
+
+_UNSET = object()
+
+
+def default_sizeof(value: Any) -> int:
+    """Approximate memory footprint of a resource, in bytes."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        with memoryview(value) as view:
+            return view.nbytes
+    if isinstance(value, str):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+class FileResource:
+    """A resource whose body is a file, sent with `loop.sendfile` (no copy through Python where supported)."""
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: Union[str, "os.PathLike[str]"]) -> None:
+        self.path = os.fspath(path)
+
+    def size(self) -> int:
+        return os.stat(self.path).st_size
+
+    def open(self):
+        return open(self.path, "rb")
+
+    def __repr__(self) -> str:
+        return f"FileResource({self.path!r})"
+
+
+def is_binary(value: Any) -> bool:
+    """True for resources served as raw bytes: a `FileResource` or a bytes-like buffer."""
+    return isinstance(value, (FileResource, bytes, bytearray, memoryview, mmap.mmap))
+
+
+def binary_size(value: Any) -> int:
+    if isinstance(value, FileResource):
+        return value.size()
+    with memoryview(value) as view:
+        return view.nbytes
+
+
+class _Entry:
+    __slots__ = ("factory", "is_async", "ttl", "size", "value", "bytes", "loaded_at", "lock", "loading",
+                 "refreshing")
+
+    def __init__(self, factory: Optional[Callable], ttl: Optional[float], size, value: Any = _UNSET) -> None:
+        self.factory = factory
+        self.is_async = factory is not None and inspect.iscoroutinefunction(factory)
+        self.ttl = ttl
+        self.size = size
+        self.value = value
+        self.bytes = 0
+        self.loaded_at = 0.0
+        # serializes loads from threads; `loading` is the task loading it for `load` callers
+        self.lock = threading.Lock()
+        self.loading: Optional[asyncio.Future] = None
+        self.refreshing = False
 
 
 class ResourceManager:
-    def __init__(self) -> None:
-        self._resources: Dict[str, Any] = {}
+    def __init__(
+        self,
+        *,
+        memory_budget: Optional[int] = None,
+        sizeof: Callable[[Any], int] = default_sizeof,
+        executor: Optional[Executor] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._resources: Dict[str, _Entry] = {}
+        self.memory_budget = memory_budget
+        self.sizeof = sizeof
+        # runs sync factories for `load` and background refreshes; a small pool is made if None
+        self.executor = executor
+        self._own_executor: Optional[ThreadPoolExecutor] = None
+        self._clock = clock
+        # loaded lazy resources, least recently used first
+        self._lru: OrderedDict[str, None] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.loads = 0
+        self.refreshes = 0
+        self.evictions = 0
 
     def register(self, name: str, obj: Any) -> None:
         """Register a resource by name."""
-        self._resources[name] = obj
+        self.invalidate(name)
+        self._resources[name] = _Entry(None, None, None, obj)
+
+    def register_factory(self, name: str, factory: Callable[[], Any], *, ttl: Optional[float] = None,
+                         size: Union[int, Callable[[Any], int], None] = None) -> None:
+        """Register `factory()` (sync or async) to build the resource on first access.
+
+        `ttl` is the age after which it is refreshed in the background. `size` is its size in
+        bytes, or a function of the value, for the memory budget.
+        """
+        self.invalidate(name)
+        self._resources[name] = _Entry(factory, ttl, size)
 
     def get(self, name: str) -> Any:
-        """Return the resource or raise KeyError."""
-        return self._resources[name]
+        """Return the resource or raise KeyError, loading it first if needed."""
+        entry = self._resources[name]
+        if entry.factory is None:
+            return entry.value
+        value = self._cached(name, entry)
+        if value is not _UNSET:
+            return value
+        if entry.is_async:
+            raise TypeError(f"resource {name!r} has an async factory; use `await load({name!r})`")
+        return self._load_sync(name, entry)
+
+    async def load(self, name: str) -> Any:
+        """Async `get`: loads without blocking the event loop (sync factories run on the executor)."""
+        entry = self._resources[name]
+        if entry.factory is None:
+            return entry.value
+        value = self._cached(name, entry)
+        if value is not _UNSET:
+            return value
+        if entry.loading is None:
+            entry.loading = asyncio.ensure_future(self._produce(name, entry))
+            entry.loading.add_done_callback(lambda _: setattr(entry, "loading", None))
+        # shielded: one caller going away does not cancel the load the others wait for
+        return await asyncio.shield(entry.loading)
+
+    def invalidate(self, name: str) -> None:
+        """Drop the loaded value of a lazy resource; it is rebuilt on next access."""
+        entry = self._resources.get(name)
+        if entry is not None and entry.factory is not None:
+            with self._lock:
+                self._forget(name, entry)
+
+    def info(self) -> Dict[str, int]:
+        return {"resources": len(self._resources), "loaded": len(self._lru), "bytes": self._bytes,
+                "hits": self.hits, "loads": self.loads, "refreshes": self.refreshes, "evictions": self.evictions}
+
+    def close(self) -> None:
+        """Stop the refresh pool created by the manager, if any."""
+        if self._own_executor is not None:
+            self._own_executor.shutdown(wait=False, cancel_futures=True)
+            self._own_executor = None
 
     def list(self) -> list[str]:
         return list(self._resources.keys())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._resources
+
+    def _cached(self, name: str, entry: _Entry) -> Any:
+        """The loaded value (starting a refresh if it is stale), or _UNSET."""
+        with self._lock:
+            value = entry.value
+            if value is _UNSET:
+                return _UNSET
+            self._lru.move_to_end(name)
+            self.hits += 1
+            stale = entry.ttl is not None and self._clock() - entry.loaded_at >= entry.ttl
+        if stale:
+            self._refresh_later(name, entry)
+        return value
+
+    def _load_sync(self, name: str, entry: _Entry) -> Any:
+        with entry.lock:
+            if entry.value is not _UNSET:
+                return entry.value  # loaded by another thread while we waited
+            value = entry.factory()
+            self._store(name, entry, value)
+            return value
+
+    async def _produce(self, name: str, entry: _Entry) -> Any:
+        if entry.is_async:
+            value = await entry.factory()
+            self._store(name, entry, value)
+            return value
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(), self._load_sync, name, entry)
+
+    def _store(self, name: str, entry: _Entry, value: Any) -> None:
+        size = entry.size
+        if size is None:
+            size = self.sizeof(value)
+        elif callable(size):
+            size = size(value)
+        with self._lock:
+            if self._resources.get(name) is not entry:
+                return  # re-registered or replaced while loading
+            self._forget(name, entry)
+            entry.value = value
+            entry.bytes = size
+            entry.loaded_at = self._clock()
+            self._lru[name] = None
+            self._bytes += size
+            self.loads += 1
+            self._evict(keep=name)
+
+    def _forget(self, name: str, entry: _Entry) -> None:
+        if entry.value is not _UNSET:
+            self._bytes -= entry.bytes
+            self._lru.pop(name, None)
+            entry.value = _UNSET
+            entry.bytes = 0
+
+    def _evict(self, keep: str) -> None:
+        if self.memory_budget is None:
+            return
+        while self._bytes > self.memory_budget:
+            victim = next((n for n in self._lru if n != keep), None)
+            if victim is None:
+                break  # only the resource just loaded is left, even if it alone is over budget
+            logger.debug("evicting resource %s (%d bytes)", victim, self._resources[victim].bytes)
+            self._forget(victim, self._resources[victim])
+            self.evictions += 1
+
+    def _refresh_later(self, name: str, entry: _Entry) -> None:
+        with self._lock:
+            if entry.refreshing:
+                return
+            entry.refreshing = True
+        if entry.is_async:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                entry.refreshing = False  # no loop in this thread; keep serving the old value
+                return
+            loop.create_task(self._refresh_async(name, entry))
+        else:
+            self._executor().submit(self._refresh_sync, name, entry)
+
+    def _refresh_sync(self, name: str, entry: _Entry) -> None:
+        try:
+            value = entry.factory()
+        except Exception:
+            logger.exception("refreshing resource %s failed; keeping the old value", name)
+        else:
+            self._refreshed(name, entry, value)
+        finally:
+            entry.refreshing = False
+
+    async def _refresh_async(self, name: str, entry: _Entry) -> None:
+        try:
+            value = await entry.factory()
+        except Exception:
+            logger.exception("refreshing resource %s failed; keeping the old value", name)
+        else:
+            self._refreshed(name, entry, value)
+        finally:
+            entry.refreshing = False
+
+    def _refreshed(self, name: str, entry: _Entry, value: Any) -> None:
+        self.refreshes += 1
+        self._store(name, entry, value)
+
+    def _executor(self) -> Executor:
+        if self.executor is not None:
+            return self.executor
+        if self._own_executor is None:
+            with self._lock:
+                if self._own_executor is None:
+                    self._own_executor = ThreadPoolExecutor(2, thread_name_prefix="mcp-resources")
+        return self._own_executor
@@ -4,38 +4,239 @@ This implements a tiny line-delimited JSON protocol as a starting point. Clients
 messages (newline-terminated). The server dispatches to a simple `on_request` hook that can be
 implemented using resources/tools/prompts managers.
 
+Pipelining, batches, streamed and binary responses, wire codecs (`mcp.codecs`), the response cache
+(`mcp.cache`), admission control (`mcp.admission`), metrics (`mcp.metrics`) and blocking handlers
+(`mcp.executors`) are opt-in; the README and those modules describe each one.
+
 This is intentionally minimal; extend it to match the real MCP spec you plan to implement.
 """
 from __future__ import annotations
 
 import asyncio
-import json
+import functools
+import itertools
 import logging
-from typing import Optional
+import socket
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .admission import AdmissionControl
+from .cache import ResponseCache, request_key
+from .codecs import JSON, Codec, FrameTooLarge, available_codecs, get_codec
+from .executors import default_timeout, is_blocking
+from .metrics import MetricsRegistry, ServerMetrics, start_http_server
+from .resources import FileResource, binary_size, is_binary
 
 logger = logging.getLogger("mcp.server")
 
+# returned by _read_message for lines that are not valid JSON
+_INVALID = object()
+_INVALID_JSON = {"type": "error", "reason": "invalid_json"}
+# returned by _read_message for frames over the size limit
+_TOO_LARGE = object()
+
 
 class MCPServer:
-    def __init__(self, host: str = "127.0.0.1", port: int = 31337, *, resources=None, tools=None, prompts=None):
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 31337,
+        *,
+        resources=None,
+        tools=None,
+        prompts=None,
+        pipeline: int = 1,
+        executor: Optional[Executor] = None,
+        call_timeout: Optional[float] = None,
+        max_batch: int = 1000,
+        codecs: Optional[list] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        metrics_port: Optional[int] = None,
+        stream_chunk: int = 256,
+        cache: Optional[ResponseCache] = None,
+        sock: Optional[socket.socket] = None,
+        reuse_port: bool = False,
+        admission: Optional[AdmissionControl] = None,
+        max_message: int = 1 << 20,
+        resource_chunk: int = 1 << 20,
+        warm_up: Optional[Callable[[], Any]] = None,
+    ):
         self.host = host
         self.port = port
+        # max in-flight requests per connection; 1 = strictly one at a time
+        self.pipeline = max(1, pipeline)
         self._server: Optional[asyncio.AbstractServer] = None
         self._resources = resources
         self._tools = tools
         self._prompts = prompts
         self._clients: set[asyncio.Task] = set()
+        # client task -> its in-flight request tasks (empty while the connection is idle)
+        self._connections: Dict[asyncio.Task, set] = {}
+        # an already listening socket (e.g. inherited from a prefork supervisor) to serve on
+        self.sock = sock
+        # bind with SO_REUSEPORT so several processes can listen on the same port
+        self.reuse_port = reuse_port
+        # executor for blocking handlers/tools; None means the loop's default thread pool
+        self.executor = executor
+        # default timeout (seconds) for blocking calls; None = no limit
+        self.call_timeout = call_timeout
+        # mtype -> (handler, blocking, timeout)
+        self._handlers: Dict[str, tuple] = {}
+        self._batch_handlers: Dict[str, tuple] = {}
+        # largest accepted `batch` message
+        self.max_batch = max_batch
+        # codecs a client may switch to with `hello`
+        self.codecs = [c for c in (codecs or available_codecs()) if c in available_codecs()]
+        # metrics are collected only when a registry is given (or an HTTP port requested)
+        if metrics is None and metrics_port is not None:
+            metrics = MetricsRegistry()
+        self.metrics = metrics
+        self._instruments = ServerMetrics(metrics) if metrics is not None else None
+        self.metrics_port = metrics_port
+        self._metrics_server: Optional[asyncio.AbstractServer] = None
+        # largest `partial` frame of a streamed response (items)
+        self.stream_chunk = max(1, stream_chunk)
+        # encoded responses of cacheable message types (see `cache_responses`)
+        self.cache = cache
+        self._cacheable: Dict[str, Optional[Callable[[dict], bool]]] = {}
+        # connection/in-flight/rate limits; None admits everything
+        self.admission = admission
+        # longest accepted line (bytes); the StreamReader buffers no more than this
+        self.max_message = max_message
+        # largest raw chunk of a binary resource body (bytes)
+        self.resource_chunk = max(1, resource_chunk)
+        # run in a thread after `start` begins listening, so startup doesn't wait for it
+        self.warm_up = warm_up
+        self._warming: Optional[asyncio.Future] = None
+
+    def register_handler(
+        self,
+        mtype: str,
+        handler: Callable,
+        *,
+        blocking: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Route messages of type `mtype` to `handler(message) -> response`.
+
+        `handler` may be a coroutine function or a plain function. Plain functions marked
+        blocking (argument or `mcp.executors.blocking`) run on the executor; for a process
+        pool they must be picklable (defined at module level).
+        """
+        if blocking is None:
+            blocking = is_blocking(handler)
+        if timeout is None:
+            timeout = default_timeout(handler)
+        self._handlers[mtype] = (handler, blocking, timeout)
+
+    def register_batch_handler(
+        self,
+        mtype: str,
+        handler: Callable,
+        *,
+        blocking: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Answer all sub-requests of type `mtype` in a batch with one call.
+
+        `handler(messages) -> responses` receives the distinct sub-requests of that type and
+        must return one response per message, in order.
+        """
+        if blocking is None:
+            blocking = is_blocking(handler)
+        if timeout is None:
+            timeout = default_timeout(handler)
+        self._batch_handlers[mtype] = (handler, blocking, timeout)
+
+    def cache_responses(self, mtype: str, when: Optional[Callable[[dict], bool]] = None) -> None:
+        """Serve repeated `mtype` requests from the response cache.
+
+        `when(message)` can restrict caching to read-only requests; messages that change state
+        must not be cached, or repeating them would skip the change.
+        """
+        self._cacheable[mtype] = when
+
+    async def run_blocking(self, func: Callable, *args: Any, timeout: Optional[float] = None, **kwargs: Any):
+        """Run `func(*args, **kwargs)` on the executor and await the result.
+
+        Raises asyncio.TimeoutError after `timeout` (default: `call_timeout`). Cancelling the
+        awaiting task cancels the executor job if it has not started yet.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        if timeout is None:
+            timeout = self.call_timeout
+        if timeout is None:
+            return await future
+        return await asyncio.wait_for(future, timeout)
+
+    async def _call(self, func: Callable, blocking: bool, timeout: Optional[float], *args: Any, **kwargs: Any):
+        if blocking:
+            result = await self.run_blocking(func, *args, timeout=timeout, **kwargs)
+            if _is_stream(result) and not hasattr(result, "__anext__"):
+                # a lazy iterator does its work as it is pulled: keep that off the loop too
+                result = _Offloaded(result, self.executor)
+            return result
+        result = func(*args, **kwargs)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
 
     async def start(self) -> None:
-        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        if self.sock is not None:
+            self._server = await asyncio.start_server(self._handle_client, sock=self.sock, limit=self.max_message)
+            self.host, self.port = self.sock.getsockname()[:2]
+        else:
+            self._server = await asyncio.start_server(self._handle_client, self.host, self.port,
+                                                      reuse_port=self.reuse_port or None, limit=self.max_message)
+        if self.port == 0 and self._server.sockets:
+            # an ephemeral port was requested; report the one we got
+            self.port = self._server.sockets[0].getsockname()[1]
         logger.info("MCPServer listening on %s:%d", self.host, self.port)
+        if self.metrics_port is not None:
+            self._metrics_server = await start_http_server(self.metrics, self.host, self.metrics_port)
+            if self.metrics_port == 0 and self._metrics_server.sockets:
+                self.metrics_port = self._metrics_server.sockets[0].getsockname()[1]
+            logger.info("metrics endpoint on http://%s:%d/metrics", self.host, self.metrics_port)
+        if self.warm_up is not None:
+            self._warming = asyncio.ensure_future(self._warm())
+
+    @property
+    def warming(self) -> bool:
+        """True while `warm_up` is still running."""
+        return self._warming is not None and not self._warming.done()
 
-    async def stop(self) -> None:
+    async def wait_warm(self) -> None:
+        """Wait for `warm_up` to finish (returns at once without one)."""
+        if self._warming is not None:
+            await asyncio.shield(self._warming)
+
+    async def _warm(self) -> None:
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.warm_up)
+        except Exception:
+            logger.exception("warm-up failed; serving without it")
+        else:
+            logger.info("warm-up finished in %.2fs", time.perf_counter() - started)
+
+    async def stop(self, grace: Optional[float] = None) -> None:
+        """Stop serving. With `grace`, let in-flight requests finish for up to that many seconds."""
         if self._server is None:
             return
+        if self._warming is not None:
+            self._warming.cancel()  # the thread finishes on its own; nobody waits for it
         # Stop accepting new connections
         self._server.close()
         await self._server.wait_closed()
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            await self._metrics_server.wait_closed()
+            self._metrics_server = None
+        if grace:
+            await self._drain(grace)
         # Cancel client tasks
         for task in list(self._clients):
             task.cancel()
@@ -43,37 +244,68 @@ class MCPServer:
         self._clients.clear()
         logger.info("MCPServer stopped")
 
+    async def _drain(self, grace: float) -> None:
+        """Close connections as they go idle, waiting up to `grace` seconds for busy ones."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + grace
+        while self._clients:
+            for task, active in list(self._connections.items()):
+                if not active:
+                    task.cancel()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning("%d connections still busy after %.1fs; cancelling", len(self._clients), grace)
+                return
+            await asyncio.wait(set(self._clients), timeout=min(0.05, remaining))
+
     async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         addr = writer.get_extra_info("peername")
+        client = _client_key(addr)
+        if self.admission is not None:
+            refusal = self.admission.connect(client)
+            if refusal is not None:
+                await self._refuse_connection(writer, refusal)
+                return
         logger.info("client connected: %s", addr)
         task = asyncio.current_task()
         if task is not None:
             self._clients.add(task)
+        instruments = self._instruments
+        if instruments is not None:
+            instruments.connections.inc()
+        # request tasks in flight on this connection; `_drain` closes the connection while empty
+        active: set[asyncio.Task] = set()
+        if task is not None:
+            self._connections[task] = active
 
         try:
             # Send a welcome / ready message
-            await self._send_json(writer, {"type": "ready"})
-
-            while True:
-                line = await reader.readline()
-                if not line:
-                    break
-                try:
-                    message = json.loads(line.decode("utf8"))
-                except Exception:
-                    logger.exception("failed to decode incoming message")
-                    await self._send_json(writer, {"type": "error", "reason": "invalid_json"})
-                    continue
+            ready = {"type": "ready", "codecs": self.codecs}
+            if self.pipeline > 1:
+                ready["pipeline"] = self.pipeline
+            if self.warming:
+                ready["warming"] = True
+            await self._send_json(writer, ready)
 
-                # Dispatch
-                try:
-                    response = await self.on_request(message)
-                except Exception as exc:  # pragma: no cover - behaviour depends on user code
-                    logger.exception("error in request handler")
-                    response = {"type": "error", "reason": str(exc)}
+            codec, pending = await self._negotiate(reader, writer)
 
-                if response is not None:
-                    await self._send_json(writer, response)
+            # Requests still running when the transport goes away are cancelled. An orderly
+            # half-close (EOF from the client) is not a disconnect: outstanding requests finish.
+            lost = asyncio.ensure_future(writer.wait_closed())
+            on_lost = functools.partial(self._cancel_active, active)
+            lost.add_done_callback(on_lost)
+            try:
+                if pending is None:
+                    pass  # EOF before the first request
+                elif self.pipeline > 1:
+                    await self._serve_pipelined(reader, writer, active, codec, pending, client)
+                else:
+                    await self._serve_sequential(reader, writer, active, codec, pending, client)
+            finally:
+                # don't cancel `lost`: that would cancel the protocol's shared close waiter;
+                # it completes on its own once the writer is closed below
+                lost.remove_done_callback(on_lost)
+                lost.add_done_callback(self._retrieve)
 
         except asyncio.CancelledError:
             logger.debug("client handler cancelled")
@@ -81,17 +313,419 @@ class MCPServer:
             try:
                 writer.close()
                 await writer.wait_closed()
-            except Exception:
+            except (Exception, asyncio.CancelledError):
+                # `stop` may cancel us while closing; finish the bookkeeping below regardless
                 pass
             logger.info("client disconnected: %s", addr)
+            if self.admission is not None:
+                self.admission.disconnect(client)
+            if instruments is not None:
+                instruments.connections.dec()
             if task is not None:
                 self._clients.discard(task)
+                self._connections.pop(task, None)
 
-    async def _send_json(self, writer: asyncio.StreamWriter, obj: object) -> None:
-        payload = (json.dumps(obj, separators=(",", ":")) + "\n").encode("utf8")
-        writer.write(payload)
+    async def _refuse_connection(self, writer: asyncio.StreamWriter, refusal: dict) -> None:
+        """Send `refusal` in place of ``ready`` and hang up."""
+        if self._instruments is not None:
+            self._instruments.rejected.inc(refusal["limit"])
+        try:
+            await self._send_json(writer, refusal)
+            writer.close()
+            await writer.wait_closed()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def _admit(self, client: str, message) -> Optional[dict]:
+        """None if `message` may be handled (release it with `_release`), else the error to send."""
+        if self.admission is None:
+            return None
+        cost = 1
+        if isinstance(message, dict) and message.get("type") == "batch" and isinstance(message.get("requests"), list):
+            cost = max(1, len(message["requests"]))
+        refusal = self.admission.admit(client, cost)
+        if refusal is None:
+            return None
+        if self._instruments is not None:
+            self._instruments.rejected.inc(refusal["limit"])
+        return _with_id(refusal, message.get("id") if isinstance(message, dict) else None)
+
+    def _release(self) -> None:
+        if self.admission is not None:
+            self.admission.release()
+
+    async def _negotiate(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Handle an optional `hello` as the first message.
+
+        Returns the connection's codec and the first request still to be served (None at EOF).
+        """
+        first = await self._read_message(reader, JSON)
+        if not (isinstance(first, dict) and first.get("type") == "hello"):
+            return JSON, first
+        name = first.get("codec", JSON.name)
+        if name not in self.codecs:
+            await self._send_json(writer, {"type": "error", "reason": "unsupported_codec", "codecs": self.codecs})
+            return JSON, await self._read_message(reader, JSON)
+        await self._send_json(writer, {"type": "hello", "codec": name})
+        codec = get_codec(name)
+        return codec, await self._read_message(reader, codec)
+
+    async def _read_message(self, reader: asyncio.StreamReader, codec: Codec = JSON):
+        """Read the next message; returns None at EOF and `_INVALID` for undecodable frames."""
+        try:
+            frame = await codec.read_frame(reader)
+        except FrameTooLarge as exc:
+            logger.warning("rejected %d-byte frame", exc.args[0])
+            return _TOO_LARGE
+        if frame is None:
+            return None
+        try:
+            return codec.decode(frame)
+        except Exception:
+            logger.exception("failed to decode incoming message")
+            return _INVALID
+
+    @staticmethod
+    def _retrieve(fut: asyncio.Future) -> None:
+        if not fut.cancelled():
+            fut.exception()  # retrieve so it is not reported as unhandled
+
+    @classmethod
+    def _cancel_active(cls, active: set, lost: asyncio.Future) -> None:
+        cls._retrieve(lost)
+        for t in list(active):
+            t.cancel()
+
+    async def _dispatch(self, message):
+        """Run `on_request` for one message, turning failures into error responses.
+
+        Returns a response dict, None, or an iterator to stream (see `_stream`).
+        """
+        instruments = self._instruments
+        if instruments is not None:
+            instruments.in_flight.inc()
+            started = time.perf_counter()
+        response = None
+        # metrics label for a raised exception; the message only goes to the response and the log
+        failure = None
+        try:
+            response = await self.on_request(message)
+        except asyncio.CancelledError:
+            if instruments is not None:
+                instruments.finished(_message_type(message), {"type": "error", "reason": "cancelled"},
+                                     time.perf_counter() - started)
+            raise
+        except asyncio.TimeoutError:
+            logger.warning("request timed out: %s", message.get("type") if isinstance(message, dict) else None)
+            response = {"type": "error", "reason": "timeout"}
+        except Exception as exc:  # pragma: no cover - behaviour depends on user code
+            logger.exception("error in request handler")
+            response = {"type": "error", "reason": str(exc)}
+            failure = "handler_exception"
+        if instruments is not None:
+            instruments.finished(_message_type(message), response, time.perf_counter() - started, failure)
+        if isinstance(response, dict) and isinstance(message, dict) and "id" in message:
+            response = {**response, "id": message["id"]}
+        return response
+
+    async def _respond(self, message, send: Callable[[Any], Awaitable[None]], codec: Codec) -> None:
+        """Dispatch `message` and send its response (or stream of frames) with `send`."""
+        if self.cache is not None and self._is_cacheable(message):
+            await self._respond_cached(message, send, codec)
+            return
+        await self._deliver(message, await self._dispatch(message), send)
+
+    async def _deliver(self, message, response, send: Callable[..., Awaitable[None]]) -> None:
+        if response is None:
+            return
+        if _is_stream(response):
+            await self._stream(message, response, send)
+        elif isinstance(response, _Body):
+            await self._send_body(message, response, send)
+        else:
+            await send(response)
+
+    def _is_cacheable(self, message) -> bool:
+        if not isinstance(message, dict):
+            return False
+        mtype = message.get("type")
+        if mtype not in self._cacheable:
+            return False
+        when = self._cacheable[mtype]
+        return when is None or bool(when(message))
+
+    async def _respond_cached(self, message: dict, send: Callable[[Any], Awaitable[None]], codec: Codec) -> None:
+        cache = self.cache
+        key = (codec.name, request_key(message))
+        rid = message.get("id")
+        instruments = self._instruments
+        started = time.perf_counter()
+        frame = cache.get(key)
+        if instruments is not None:
+            instruments.cache.inc(message["type"], "miss" if frame is None else "hit")
+        if frame is None:
+            # read before evaluating so an answer computed across a change is not stored
+            version = cache.version()
+            response = await self._dispatch(message)
+            if not isinstance(response, dict) or response.get("type") == "error":
+                await self._deliver(message, response, send)
+                return
+            frame = codec.encode({k: v for k, v in response.items() if k != "id"})
+            cache.put(key, frame, version)
+        elif instruments is not None:
+            instruments.requests.inc(message["type"])
+            instruments.duration.observe(time.perf_counter() - started, message["type"])
+        await send(frame if rid is None else codec.with_field(frame, "id", rid))
+
+    async def _stream(self, message: dict, items, send: Callable[[dict], Awaitable[None]]) -> None:
+        """Send `items` as `partial` frames and a final `done` frame, honouring offset/limit."""
+        rid = message.get("id")
+        try:
+            offset = max(0, int(message.get("offset") or 0))
+            limit = message.get("limit")
+            limit = None if limit is None else max(0, int(limit))
+            chunk = max(1, int(message.get("chunk_size") or self.stream_chunk))
+        except (TypeError, ValueError):
+            await send(_with_id({"type": "error", "reason": "invalid_stream_options"}, rid))
+            _close(items)
+            return
+
+        take = _taker(items)
+        try:
+            if offset:
+                await take(offset, skip=True)
+            sent = seq = 0
+            more = False
+            while True:
+                # start small for a fast first frame, then grow to `chunk`
+                size = min(chunk, 16 << seq)
+                if limit is not None:
+                    size = min(size, limit - sent)
+                    if size == 0:
+                        more = bool(await take(1))
+                        break
+                batch = await take(size)
+                if batch:
+                    await send(_with_id({"type": "partial", "seq": seq, "items": batch}, rid))
+                    sent += len(batch)
+                    seq += 1
+                    # drain() only yields when the buffer is full; let other replies in
+                    await asyncio.sleep(0)
+                if len(batch) < size:
+                    break
+            done = {"type": "done", "count": sent}
+            if more:
+                done["next_offset"] = offset + sent
+            await send(_with_id(done, rid))
+        except (asyncio.CancelledError, ConnectionError):
+            raise
+        except Exception as exc:  # pragma: no cover - behaviour depends on user code
+            logger.exception("error while streaming response")
+            await send(_with_id({"type": "error", "reason": str(exc)}, rid))
+        finally:
+            _close(items)
+
+    async def _send_body(self, message: dict, body: "_Body", send: Callable[..., Awaitable[None]]) -> None:
+        """Send a binary resource as a header, raw `chunk` frames and `done` (see the module docs)."""
+        rid = message.get("id")
+        value = body.value
+        size = binary_size(value)
+        try:
+            offset = int(message.get("offset") or 0)
+            length = message.get("length")
+            length = size - offset if length is None else int(length)
+        except (TypeError, ValueError):
+            offset = length = -1
+        if not 0 <= offset <= size or length < 0:
+            await send(_with_id({"type": "error", "reason": "invalid_range", "size": size}, rid))
+            return
+        length = min(length, size - offset)
+        await send(_with_id({"type": "resource_response", "name": body.name, "size": size, "offset": offset,
+                             "length": length}, rid))
+        if isinstance(value, FileResource):
+            with value.open() as f:
+                await self._send_chunks(rid, offset, length, lambda pos, n: _FileRange(f, pos, n), send)
+        else:
+            with memoryview(value) as view, view.cast("B") as data:
+                await self._send_chunks(rid, offset, length, lambda pos, n: data[pos:pos + n], send)
+        await send(_with_id({"type": "done", "count": length}, rid))
+
+    async def _send_chunks(self, rid, offset: int, length: int, piece: Callable, send) -> None:
+        pos, end = offset, offset + length
+        while pos < end:
+            n = min(self.resource_chunk, end - pos)
+            await send(_with_id({"type": "chunk", "offset": pos, "length": n}, rid), piece(pos, n))
+            pos += n
+            # let other replies on this connection in between chunks
+            await asyncio.sleep(0)
+
+    def _invalid(self, message) -> dict:
+        """The error for an undecodable (`_INVALID`) or oversized (`_TOO_LARGE`) frame."""
+        if message is _TOO_LARGE:
+            error = {"type": "error", "reason": "message_too_large", "max_message": self.max_message}
+        else:
+            error = _INVALID_JSON
+        if self._instruments is not None:
+            self._instruments.errors.inc("invalid", error["reason"])
+        return error
+
+    async def _serve_sequential(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                active: set, codec: Codec, message, client: str = "") -> None:
+        async def send(response, body=None) -> None:
+            await self._send(writer, response, codec, body)
+
+        while True:
+            if message is None:
+                break
+            if message is _INVALID or message is _TOO_LARGE:
+                await self._send(writer, self._invalid(message), codec)
+                message = await self._read_message(reader, codec)
+                continue
+            refusal = self._admit(client, message)
+            if refusal is not None:
+                await self._send(writer, refusal, codec)
+                message = await self._read_message(reader, codec)
+                continue
+            t = asyncio.ensure_future(self._respond(message, send, codec))
+            active.add(t)
+            try:
+                await t
+            finally:
+                active.discard(t)
+                self._release()
+            message = await self._read_message(reader, codec)
+
+    async def _serve_pipelined(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                               in_flight: set, codec: Codec, message, client: str = "") -> None:
+        slots = asyncio.Semaphore(self.pipeline)
+        write_lock = asyncio.Lock()
+
+        async def reply(response, body=None) -> None:
+            # a chunk's header and raw body go out together under the lock
+            async with write_lock:
+                await self._send(writer, response, codec, body)
+
+        async def run_one(message) -> None:
+            try:
+                # streamed frames take the lock one at a time, so they interleave with other replies
+                await self._respond(message, reply, codec)
+            except ConnectionError:
+                logger.debug("client went away before response was sent")
+            finally:
+                slots.release()
+
+        try:
+            while message is not None:
+                if message is _INVALID or message is _TOO_LARGE:
+                    await reply(self._invalid(message))
+                else:
+                    # backpressure: don't read further until a slot frees up
+                    await slots.acquire()
+                    refusal = self._admit(client, message)
+                    if refusal is not None:
+                        slots.release()
+                        await reply(refusal)
+                        message = await self._read_message(reader, codec)
+                        continue
+                    t = asyncio.create_task(run_one(message))
+                    in_flight.add(t)
+                    t.add_done_callback(in_flight.discard)
+                    if self.admission is not None:
+                        # a callback, not `finally`: a task cancelled before it starts skips its body
+                        t.add_done_callback(lambda _: self.admission.release())
+                message = await self._read_message(reader, codec)
+            # EOF: let outstanding requests finish and reply
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+        finally:
+            for t in in_flight:
+                t.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def _send(self, writer: asyncio.StreamWriter, obj: object, codec: Codec, body=None) -> None:
+        """Write one frame, then `body` (raw bytes or a `_FileRange`) if given."""
+        if isinstance(obj, bytes):
+            writer.write(obj)  # an already encoded frame
+        else:
+            codec.write(writer, obj)
+        if isinstance(body, _FileRange):
+            await writer.drain()
+            loop = asyncio.get_running_loop()
+            sent = await loop.sendfile(writer.transport, body.file, body.offset, body.count)
+            if sent != body.count:
+                # the file shrank: the frame promised more bytes than exist, so the stream is broken
+                writer.close()
+                raise ConnectionError(f"sent {sent} of {body.count} bytes of a file")
+        elif body is not None:
+            writer.write(body)
         await writer.drain()
 
+    async def _send_json(self, writer: asyncio.StreamWriter, obj: object) -> None:
+        await self._send(writer, obj, JSON)
+
+    async def _handle_batch(self, message: dict) -> dict:
+        requests = message.get("requests")
+        if not isinstance(requests, list) or not all(isinstance(r, dict) for r in requests):
+            return {"type": "error", "reason": "invalid_batch"}
+        if len(requests) > self.max_batch:
+            return {"type": "error", "reason": "batch_too_large", "max_batch": self.max_batch}
+
+        # deduplicate on content, ignoring the correlation id
+        slots: list[int] = []
+        unique: Dict[str, int] = {}
+        distinct: list[dict] = []
+        for request in requests:
+            body = {k: v for k, v in request.items() if k != "id"}
+            key = request_key(body)
+            index = unique.get(key)
+            if index is None:
+                index = unique[key] = len(distinct)
+                distinct.append(body)
+            slots.append(index)
+
+        answers: list[Optional[dict]] = [None] * len(distinct)
+        groups: Dict[str, list[int]] = {}
+        singles: list[int] = []
+        for i, body in enumerate(distinct):
+            mtype = body.get("type")
+            if mtype == "batch":
+                answers[i] = {"type": "error", "reason": "nested_batch"}
+            elif mtype in self._batch_handlers:
+                groups.setdefault(mtype, []).append(i)
+            else:
+                singles.append(i)
+
+        async def run_group(mtype: str, indexes: list[int]) -> None:
+            func, blocking, timeout = self._batch_handlers[mtype]
+            try:
+                results = await self._call(func, blocking, timeout, [distinct[i] for i in indexes])
+                if len(results) != len(indexes):
+                    raise ValueError(f"batch handler for {mtype!r} returned {len(results)} results")
+            except asyncio.TimeoutError:
+                results = [{"type": "error", "reason": "timeout"}] * len(indexes)
+            except Exception as exc:  # pragma: no cover - behaviour depends on user code
+                logger.exception("error in batch handler")
+                results = [{"type": "error", "reason": str(exc)}] * len(indexes)
+            for i, result in zip(indexes, results):
+                answers[i] = _no_stream(result)
+
+        async def run_single(i: int) -> None:
+            answers[i] = _no_stream(await self._dispatch(distinct[i]))
+
+        await asyncio.gather(
+            *(run_group(mtype, indexes) for mtype, indexes in groups.items()),
+            *(run_single(i) for i in singles),
+        )
+
+        results = []
+        for request, index in zip(requests, slots):
+            answer = answers[index]
+            if answer is not None and "id" in request:
+                answer = {**answer, "id": request["id"]}
+            results.append(answer)
+        return {"type": "batch_response", "results": results}
+
     async def on_request(self, message: dict) -> Optional[dict]:
         """Handle an incoming request message and return a response dict or None.
 
@@ -102,26 +736,199 @@ class MCPServer:
         mtype = message.get("type")
         logger.debug("on_request: %s", mtype)
 
+        handler = self._handlers.get(mtype)
+        if handler is not None:
+            func, blocking, timeout = handler
+            return await self._call(func, blocking, timeout, message)
+
         if mtype == "echo":
             return {"type": "echo", "payload": message.get("payload")}
 
+        if mtype == "batch":
+            return await self._handle_batch(message)
+
+        if mtype == "metrics":
+            if self.metrics is None:
+                return {"type": "error", "reason": "metrics_disabled"}
+            if message.get("format") == "prometheus":
+                return {"type": "metrics_response", "format": "prometheus", "text": self.metrics.render()}
+            return {"type": "metrics_response", "metrics": self.metrics.snapshot()}
+
         if mtype == "resource":
             name = message.get("name")
             if self._resources is None:
                 return {"type": "error", "reason": "no_resources"}
-            # example hook: resources.get(name).call(...)
-            return {"type": "resource_response", "name": name}
+            if name not in self._resources:
+                return {"type": "error", "reason": "unknown_resource", "name": name}
+            # lazy resources are loaded (once, however many requests ask) without blocking the loop
+            value = await self._resources.load(name)
+            if is_binary(value):
+                if message.get("binary"):
+                    return _Body(name, value)
+                return {"type": "resource_response", "name": name, "size": binary_size(value)}
+            if message.get("binary"):
+                return {"type": "error", "reason": "not_binary", "name": name}
+            response = {"type": "resource_response", "name": name}
+            if isinstance(value, (str, int, float, bool, list, dict)) or value is None:
+                response["content"] = value
+            return response
 
         if mtype == "tool":
             name = message.get("name")
             if self._tools is None:
                 return {"type": "error", "reason": "no_tools"}
-            return {"type": "tool_response", "name": name}
+            if name not in self._tools:
+                return {"type": "error", "reason": "unknown_tool", "name": name}
+            # limits, executor choice and coalescing are per tool (see `mcp.tools`)
+            result = await self._tools.run(name, message.get("args", ()), message.get("kwargs", {}),
+                                           executor=self.executor, default_timeout=self.call_timeout)
+            return {"type": "tool_response", "name": name, "result": result}
 
         if mtype == "prompt":
             pid = message.get("prompt_id")
             if self._prompts is None:
                 return {"type": "error", "reason": "no_prompts"}
-            return {"type": "prompt_response", "prompt_id": pid}
+            if pid not in self._prompts:
+                return {"type": "error", "reason": "unknown_prompt", "prompt_id": pid}
+            args = message.get("args") or {}
+            if not isinstance(args, dict):
+                return {"type": "error", "reason": "invalid_arguments"}
+            try:
+                if message.get("stream"):
+                    # text pieces go out in `partial` frames as they are rendered
+                    return self._prompts.iter_render(pid, **args)
+                return {"type": "prompt_response", "prompt_id": pid, "text": self._prompts.render(pid, **args)}
+            except KeyError as exc:
+                return {"type": "error", "reason": "missing_argument", "name": exc.args[0]}
 
         return {"type": "error", "reason": "unknown_type"}
+
+
+def _message_type(message) -> str:
+    mtype = message.get("type") if isinstance(message, dict) else None
+    return mtype if isinstance(mtype, str) else "invalid"
+
+
+def _client_key(addr) -> str:
+    """The client a connection counts against for rate limits: its host address."""
+    if isinstance(addr, tuple) and addr:
+        return str(addr[0])
+    return str(addr or "local")
+
+
+def _with_id(frame: dict, rid) -> dict:
+    if rid is not None:
+        frame["id"] = rid
+    return frame
+
+
+def _is_stream(obj) -> bool:
+    if isinstance(obj, (dict, list, tuple, str, bytes)) or obj is None:
+        return False
+    return hasattr(obj, "__next__") or hasattr(obj, "__anext__")
+
+
+def _no_stream(answer):
+    """Batch responses are single frames; reject iterators and binary bodies inside a batch."""
+    if _is_stream(answer) or isinstance(answer, _Body):
+        _close(answer)
+        return {"type": "error", "reason": "stream_in_batch"}
+    return answer
+
+
+class _Body:
+    """A binary resource to send with `_send_body`, returned by `on_request`."""
+
+    __slots__ = ("name", "value")
+
+    def __init__(self, name: str, value: Any) -> None:
+        self.name = name
+        self.value = value
+
+
+class _Offloaded:
+    """A sync iterator returned by a blocking handler; `_stream` pulls it on the executor."""
+
+    __slots__ = ("items", "executor", "lock")
+
+    def __init__(self, items, executor: Optional[Executor]) -> None:
+        self.items = items
+        # generators can't cross a process pool; use the loop's default threads for those
+        self.executor = None if isinstance(executor, ProcessPoolExecutor) else executor
+        # a pull abandoned by a cancelled stream may still be running when we close
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.items)
+
+    async def take(self, n: int, skip: bool = False) -> List:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._pull, n, skip)
+
+    def _pull(self, n: int, skip: bool) -> List:
+        with self.lock:
+            if skip:
+                next(itertools.islice(self.items, n, n), None)
+                return []
+            return list(itertools.islice(self.items, n))
+
+    def close(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._close()
+        else:
+            loop.run_in_executor(self.executor, self._close)
+
+    def _close(self) -> None:
+        with self.lock:
+            _close(self.items)
+
+
+class _FileRange:
+    __slots__ = ("file", "offset", "count")
+
+    def __init__(self, file, offset: int, count: int) -> None:
+        self.file = file
+        self.offset = offset
+        self.count = count
+
+
+def _close(items) -> None:
+    # async generators are finalized by the loop's asyncgen hooks instead
+    close = getattr(items, "close", None)
+    if close is not None:
+        close()
+
+
+def _taker(items) -> Callable[..., Awaitable[List]]:
+    """Return ``take(n, skip=False)`` reading the next `n` items of a (async) iterator.
+
+    With `skip` the items are consumed and an empty list is returned.
+    """
+    if isinstance(items, _Offloaded):
+        return items.take
+
+    if hasattr(items, "__anext__"):
+        async def take_async(n: int, skip: bool = False) -> List:
+            out: List = []
+            for _ in range(n):
+                try:
+                    item = await items.__anext__()
+                except StopAsyncIteration:
+                    break
+                if not skip:
+                    out.append(item)
+            return out
+
+        return take_async
+
+    async def take(n: int, skip: bool = False) -> List:
+        if skip:
+            next(itertools.islice(items, n, n), None)  # consume n items at C speed
+            return []
+        return list(itertools.islice(items, n))
+
+    return take
@@ -1,21 +1,199 @@
-"""Placeholder ToolManager for the MCP shim.
+"""Tool registry and execution engine for the MCP shim.
+
+`ToolManager.run` awaits a tool call without blocking the event loop:
+
+- coroutine functions are awaited on the loop; plain functions run inline
+  unless they are blocking, in which case they go to an executor;
+- ``executor=`` picks the executor per tool: ``"inline"``, ``"thread"`` or
+  ``"process"`` (pools owned by the manager, created on first use and closed
+  by `shutdown`), or an `concurrent.futures.Executor`. Other blocking tools
+  use the executor passed to `run` (the server's);
+- ``concurrency=N`` lets at most N calls of that tool run at once; the rest
+  wait their turn;
+- ``timeout`` covers waiting for a slot and running, and raises
+  `asyncio.TimeoutError`;
+- with ``coalesce=True``, concurrent calls with identical (JSON-serializable)
+  arguments share one execution. Only use it for tools without side effects.
+  The shared call is cancelled once every caller has gone.
 """
 from __future__ import annotations
 
-from typing import Any, Dict
+import asyncio
+import functools
+import inspect
+import json
+import weakref
+from concurrent.futures import Executor
+from typing import Any, Dict, Optional, Sequence, Union
+
+from .executors import EXECUTOR_KINDS, create_executor, default_timeout, is_blocking
+
+TOOL_EXECUTORS = ("inline",) + EXECUTOR_KINDS
+
+
+class _Tool:
+    __slots__ = ("func", "blocking", "timeout", "executor", "concurrency", "limits", "coalesce", "is_async")
+
+    def __init__(self, func, blocking: bool, timeout: Optional[float], executor: Union[str, Executor, None],
+                 concurrency: Optional[int], coalesce: bool) -> None:
+        self.func = func
+        self.blocking = blocking
+        self.timeout = timeout
+        self.executor = executor
+        self.concurrency = concurrency
+        # a semaphore binds to the loop that first waits on it, so keep one per loop
+        self.limits: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.coalesce = coalesce
+        self.is_async = inspect.iscoroutinefunction(func)
+
+    def limit(self) -> asyncio.Semaphore:
+        """The concurrency semaphore for the running loop."""
+        loop = asyncio.get_running_loop()
+        limit = self.limits.get(loop)
+        if limit is None:
+            limit = self.limits[loop] = asyncio.Semaphore(self.concurrency)
+        return limit
+
+
+class _Shared:
+    """One running execution awaited by `waiters` coalesced callers."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
 
 
 class ToolManager:
-    def __init__(self) -> None:
-        self._tools: Dict[str, Any] = {}
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self._tools: Dict[str, _Tool] = {}
+        # size of the "thread"/"process" pools this manager creates
+        self.max_workers = max_workers
+        self._pools: Dict[str, Executor] = {}
+        # coalescing key -> execution in progress
+        self._running: Dict[tuple, _Shared] = {}
+        self.coalesced = 0
+
+    def register(self, name: str, callable_obj, *, blocking: Optional[bool] = None,
+                 timeout: Optional[float] = None, executor: Union[str, Executor, None] = None,
+                 concurrency: Optional[int] = None, coalesce: bool = False) -> None:
+        """Register a tool. Blocking tools, and tools with a pool `executor`, run off the event loop."""
+        if isinstance(executor, str):
+            if executor not in TOOL_EXECUTORS:
+                raise ValueError(f"unknown executor {executor!r}; expected one of {TOOL_EXECUTORS}")
+            blocking = executor != "inline"
+        elif executor is not None:
+            blocking = True
+        if blocking is None:
+            blocking = is_blocking(callable_obj)
+        if timeout is None:
+            timeout = default_timeout(callable_obj)
+        self._tools[name] = _Tool(callable_obj, blocking, timeout, executor, concurrency, coalesce)
+
+    def get(self, name: str):
+        return self._tools[name].func
 
-    def register(self, name: str, callable_obj) -> None:
-        self._tools[name] = callable_obj
+    def is_blocking(self, name: str) -> bool:
+        tool = self._tools.get(name)
+        return tool is not None and tool.blocking
+
+    def timeout(self, name: str) -> Optional[float]:
+        tool = self._tools.get(name)
+        return tool.timeout if tool is not None else None
 
     def call(self, name: str, *args, **kwargs):
+        """Call a tool synchronously in the current thread (no limits or timeouts)."""
         if name not in self._tools:
             raise KeyError(name)
-        return self._tools[name](*args, **kwargs)
+        return self._tools[name].func(*args, **kwargs)
+
+    async def run(self, name: str, args: Sequence = (), kwargs: Optional[Dict[str, Any]] = None, *,
+                  executor: Optional[Executor] = None, default_timeout: Optional[float] = None):
+        """Call tool `name` and await its result.
+
+        `executor` runs blocking tools without an executor of their own (None: the loop's default
+        thread pool); `default_timeout` applies to blocking tools without a timeout of their own.
+        Raises KeyError for an unknown tool.
+        """
+        tool = self._tools[name]
+        kwargs = kwargs or {}
+        timeout = tool.timeout
+        if timeout is None and tool.blocking:
+            timeout = default_timeout
+        key = _call_key(name, args, kwargs) if tool.coalesce else None
+        if key is None:
+            return await _wait(self._execute(tool, args, kwargs, executor), timeout)
+
+        shared = self._running.get(key)
+        if shared is None:
+            shared = self._running[key] = _Shared(asyncio.ensure_future(self._execute(tool, args, kwargs, executor)))
+            shared.task.add_done_callback(functools.partial(self._finished, key, shared))
+        else:
+            self.coalesced += 1
+        shared.waiters += 1
+        try:
+            return await _wait(asyncio.shield(shared.task), timeout)
+        finally:
+            shared.waiters -= 1
+            if not shared.waiters and not shared.task.done():
+                shared.task.cancel()  # nobody is waiting for the answer any more
+
+    def _finished(self, key: tuple, shared: _Shared, task: asyncio.Task) -> None:
+        if self._running.get(key) is shared:
+            del self._running[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller gave up
+
+    async def _execute(self, tool: _Tool, args: Sequence, kwargs: Dict[str, Any], executor: Optional[Executor]):
+        if not tool.concurrency:
+            return await self._invoke(tool, args, kwargs, executor)
+        async with tool.limit():
+            return await self._invoke(tool, args, kwargs, executor)
+
+    async def _invoke(self, tool: _Tool, args: Sequence, kwargs: Dict[str, Any], executor: Optional[Executor]):
+        if tool.is_async:
+            return await tool.func(*args, **kwargs)
+        if not tool.blocking:
+            result = tool.func(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(tool, executor), functools.partial(tool.func, *args, **kwargs))
+
+    def _executor(self, tool: _Tool, default: Optional[Executor]) -> Optional[Executor]:
+        if isinstance(tool.executor, Executor):
+            return tool.executor
+        if tool.executor in EXECUTOR_KINDS:
+            pool = self._pools.get(tool.executor)
+            if pool is None:
+                pool = self._pools[tool.executor] = create_executor(tool.executor, self.max_workers, warm=False)
+            return pool
+        return default
+
+    def shutdown(self) -> None:
+        """Shut down the pools created for ``executor="thread"``/``"process"`` tools."""
+        pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.shutdown(cancel_futures=True)
 
     def list(self) -> list[str]:
         return list(self._tools.keys())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._tools
+
+
+async def _wait(awaitable, timeout: Optional[float]):
+    if timeout is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, timeout)
+
+
+def _call_key(name: str, args: Sequence, kwargs: Dict[str, Any]) -> Optional[tuple]:
+    """Identity of a call for coalescing; None when the arguments aren't plain JSON data."""
+    try:
+        return name, json.dumps([list(args), kwargs], sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
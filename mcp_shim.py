@@ -7,6 +7,7 @@ implementing resources, tools and prompts in the `mcp` package.
 
 Usage:
     python mcp_shim.py --host 127.0.0.1 --port 31337
+    python mcp_shim.py --processes 4 --snapshot facts.krs   # prefork, see mcp.prefork
 
 Run as executable (optional):
     chmod +x mcp_shim.py
@@ -16,12 +17,17 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import functools
 import logging
 import signal
 from mcp.server import MCPServer
 from mcp.resources import ResourceManager
 from mcp.tools import ToolManager
 from mcp.prompts import PromptManager
+from mcp.executors import EXECUTOR_KINDS, create_executor, preload, warm_up, worker_count
+from mcp.metrics import MetricsRegistry
+from mcp.admission import AdmissionControl
+from mcp.prefork import Supervisor
 
 logger = logging.getLogger("mcp_shim")
 
@@ -31,10 +37,35 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--host", default="127.0.0.1", help="Host to bind")
     p.add_argument("--port", type=int, default=31337, help="Port to bind")
     p.add_argument("--debug", action="store_true", help="Enable debug logging")
+    p.add_argument("--pipeline", type=int, default=1, help="Max concurrent requests per connection")
+    p.add_argument("--executor", choices=EXECUTOR_KINDS, default="thread",
+                   help="Pool used for blocking handlers and tools")
+    p.add_argument("--workers", type=int, default=None, help="Executor pool size")
+    p.add_argument("--preload", action="append", default=[], metavar="MODULE[:FUNC]",
+                   help="Import/call this in every worker before serving (repeatable)")
+    p.add_argument("--call-timeout", type=float, default=None, help="Seconds before a blocking call times out")
+    p.add_argument("--metrics", action="store_true", help="Collect server and krules metrics")
+    p.add_argument("--metrics-port", type=int, default=None,
+                   help="Serve GET /metrics on this port (worker i of --processes uses PORT+i)")
+    p.add_argument("--processes", type=int, default=1, help="Server processes sharing the port (prefork)")
+    p.add_argument("--reuse-port", action="store_true",
+                   help="Bind the port in every process with SO_REUSEPORT instead of sharing one socket")
+    p.add_argument("--grace", type=float, default=10.0, help="Seconds in-flight requests get to finish on SIGTERM")
+    p.add_argument("--snapshot", default=None, help="Serve the fact base from this krules snapshot")
+    p.add_argument("--max-connections", type=int, default=None,
+                   help="Refuse connections beyond this many (per process)")
+    p.add_argument("--max-in-flight", type=int, default=None,
+                   help="Answer busy beyond this many requests in flight (per process)")
+    p.add_argument("--rate-limit", type=float, default=None, help="Requests/sec allowed per client address")
+    p.add_argument("--rate-burst", type=float, default=None,
+                   help="Token bucket size: requests a client may send at once")
+    p.add_argument("--max-message", type=int, default=1 << 20, help="Longest accepted request line in bytes")
     return p.parse_args()
 
 
-async def run_server(host: str, port: int, debug: bool) -> None:
+async def run_server(host: str, port: int, debug: bool, pipeline: int = 1, executor=None,
+                     call_timeout=None, metrics=None, metrics_port=None, sock=None, reuse_port=False,
+                     grace=None, admission=None, max_message=1 << 20, warm_up=None) -> None:
     if debug:
         logging.basicConfig(level=logging.DEBUG)
     else:
@@ -44,7 +75,10 @@ async def run_server(host: str, port: int, debug: bool) -> None:
     tools = ToolManager()
     prompts = PromptManager()
 
-    server = MCPServer(host=host, port=port, resources=resources, tools=tools, prompts=prompts)
+    server = MCPServer(host=host, port=port, resources=resources, tools=tools, prompts=prompts,
+                       pipeline=pipeline, executor=executor, call_timeout=call_timeout,
+                       metrics=metrics, metrics_port=metrics_port, sock=sock, reuse_port=reuse_port,
+                       admission=admission, max_message=max_message, warm_up=warm_up)
 
     loop = asyncio.get_running_loop()
     stop_event = asyncio.Event()
@@ -61,17 +95,64 @@ async def run_server(host: str, port: int, debug: bool) -> None:
 
     try:
         await stop_event.wait()
+        if sock is not None or reuse_port:
+            # prefork worker: ignore the supervisor's forwarded signal; it kills us after --grace
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
+                signal.signal(sig, signal.SIG_IGN)
     finally:
         logger.info("shutting down server")
-        await server.stop()
+        await server.stop(grace=grace)
+        tools.shutdown()
+        resources.close()
 
 
 def main():
     args = parse_args()
+    snapshot = None  # keep the mapping open while serving
+    if args.snapshot:
+        from krules.snapshot import load_snapshot
+
+        snapshot = load_snapshot(args.snapshot)
+    if args.processes > 1:
+        logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+        # build shared state once so the forked workers inherit it copy-on-write
+        preload(*args.preload)
+        Supervisor(functools.partial(serve, args), args.processes, host=args.host, port=args.port,
+                   reuse_port=args.reuse_port, grace=args.grace).run()
+        return
+    serve(args)
+
+
+def serve(args, index: int = 0, sock=None) -> None:
+    # start the pool (and its --preload) after the server is listening, not before
+    workers = worker_count(args.executor, args.workers)
+    executor = create_executor(args.executor, workers, preload=args.preload, warm=False)
+    metrics = None
+    metrics_port = None if args.metrics_port is None else args.metrics_port + index
+    if args.metrics or args.metrics_port is not None:
+        from krules import stats
+
+        stats.enable()
+        metrics = MetricsRegistry()
+        metrics.add_collector(stats.collect)
     try:
-        asyncio.run(run_server(args.host, args.port, args.debug))
+        asyncio.run(run_server(args.host, args.port, args.debug, args.pipeline, executor, args.call_timeout,
+                               metrics, metrics_port, sock, args.reuse_port and args.processes > 1, args.grace,
+                               admission_control(args), args.max_message,
+                               functools.partial(warm_up, executor, workers)))
     except KeyboardInterrupt:
         pass
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def admission_control(args):
+    """Build an AdmissionControl from the limit flags (None when no limit is set)."""
+    if args.max_connections is None and args.max_in_flight is None and args.rate_limit is None:
+        return None
+    return AdmissionControl(max_connections=args.max_connections, max_in_flight=args.max_in_flight,
+                            rate=args.rate_limit, burst=args.rate_burst)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+import asyncio
+import json
+
+from mcp.admission import AdmissionControl, TokenBucket
+from mcp.client import Client
+from mcp.server import MCPServer
+
+
+class SlowServer(MCPServer):
+    async def on_request(self, message):
+        if message.get("type") == "sleep":
+            await asyncio.sleep(message["seconds"])
+            return {"type": "slept"}
+        return await super().on_request(message)
+
+
+async def _connect(server):
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    return reader, writer, json.loads(await reader.readline())
+
+
+async def _send(writer, obj):
+    writer.write((json.dumps(obj) + "\n").encode("utf8"))
+    await writer.drain()
+
+
+def test_token_bucket_refills_at_rate():
+    now = [0.0]
+    bucket = TokenBucket(rate=10, burst=2, clock=lambda: now[0])
+    assert bucket.take() == 0 and bucket.take() == 0
+    assert abs(bucket.take() - 0.1) < 1e-9  # empty: one token in 0.1s
+    now[0] += 0.1
+    assert bucket.take() == 0
+    # a cost above the burst is admitted from a full bucket, but charged in full
+    now[0] += 1
+    assert bucket.take(5) == 0
+    assert abs(bucket.take() - 0.4) < 1e-9  # 3 tokens of debt plus the one asked for
+    now[0] += 0.41
+    assert bucket.take() == 0
+
+
+def test_big_batches_do_not_bypass_the_rate_limit():
+    now = [0.0]
+    admission = AdmissionControl(rate=1, burst=3, clock=lambda: now[0])
+    assert admission.admit("c", cost=1000) is None
+    admission.release()
+    refusal = admission.admit("c", cost=1000)
+    assert refusal["limit"] == "rate" and refusal["retry_after"] == 1000
+    now[0] += 999
+    assert admission.admit("c", cost=1000) is not None
+    now[0] += 1
+    assert admission.admit("c", cost=1000) is None
+
+
+def test_connection_limit_refuses_with_busy():
+    async def scenario():
+        admission = AdmissionControl(max_connections=1)
+        server = MCPServer(port=0, admission=admission)
+        await server.start()
+        try:
+            r1, w1, ready = await _connect(server)
+            assert ready["type"] == "ready"
+            r2, w2, refusal = await _connect(server)
+            assert refusal["reason"] == "busy" and refusal["limit"] == "connections"
+            assert await r2.read() == b""  # and hung up
+            w1.close()
+            await w1.wait_closed()
+            await asyncio.sleep(0.05)
+            r3, w3, ready = await _connect(server)
+            assert ready["type"] == "ready"
+            w3.close()
+            assert admission.rejected["connections"] == 1
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit_per_client_and_batch_cost():
+    async def scenario():
+        now = [0.0]
+        admission = AdmissionControl(rate=1, burst=3, clock=lambda: now[0])
+        server = MCPServer(port=0, admission=admission)
+        await server.start()
+        try:
+            reader, writer, _ = await _connect(server)
+            await _send(writer, {"type": "batch", "requests": [{"type": "echo", "payload": 1}] * 2})
+            assert json.loads(await reader.readline())["type"] == "batch_response"
+            await _send(writer, {"type": "echo", "payload": 2, "id": "a"})
+            assert json.loads(await reader.readline())["payload"] == 2
+            await _send(writer, {"type": "echo", "payload": 3, "id": "b"})
+            refusal = json.loads(await reader.readline())
+            assert refusal == {"type": "error", "reason": "busy", "limit": "rate", "retry_after": 1.0, "id": "b"}
+            # a second connection from the same address shares the bucket
+            r2, w2, _ = await _connect(server)
+            await _send(w2, {"type": "echo", "payload": 4})
+            assert json.loads(await r2.readline())["reason"] == "busy"
+            now[0] += 1
+            await _send(writer, {"type": "echo", "payload": 5})
+            assert json.loads(await reader.readline())["payload"] == 5
+            writer.close()
+            w2.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_in_flight_cap_sheds_load_immediately():
+    async def scenario():
+        admission = AdmissionControl(max_in_flight=1)
+        server = SlowServer(port=0, pipeline=4, admission=admission)
+        await server.start()
+        try:
+            reader, writer, _ = await _connect(server)
+            await _send(writer, {"type": "sleep", "seconds": 0.3, "id": 1})
+            await _send(writer, {"type": "echo", "payload": "x", "id": 2})
+            first = json.loads(await asyncio.wait_for(reader.readline(), 0.2))
+            assert first["id"] == 2 and first["reason"] == "busy" and first["limit"] == "in_flight"
+            assert json.loads(await reader.readline()) == {"type": "slept", "id": 1}
+            await _send(writer, {"type": "echo", "payload": "y", "id": 3})
+            assert json.loads(await reader.readline())["payload"] == "y"
+            writer.close()
+            await writer.wait_closed()
+            await asyncio.sleep(0.05)
+            assert admission.in_flight == 0 and admission.connections == 0
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_oversized_line_is_skipped_not_buffered():
+    async def scenario():
+        server = MCPServer(port=0, max_message=1024)
+        await server.start()
+        try:
+            reader, writer, _ = await _connect(server)
+            await _send(writer, {"type": "echo", "payload": "x" * 100_000})
+            error = json.loads(await reader.readline())
+            assert error == {"type": "error", "reason": "message_too_large", "max_message": 1024}
+            await _send(writer, {"type": "echo", "payload": "ok"})
+            assert json.loads(await reader.readline())["payload"] == "ok"
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_client_retries_busy_responses():
+    async def scenario():
+        admission = AdmissionControl(rate=50, burst=1)
+        server = MCPServer(port=0, admission=admission)
+        await server.start()
+        try:
+            async with Client(server.host, server.port, pool_size=1, retries=5, backoff=0.001) as client:
+                for i in range(3):
+                    response = await client.request({"type": "echo", "payload": i}, retry=False)
+                    assert response == {"type": "echo", "payload": i}
+            assert admission.rejected["rate"] >= 1
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+import asyncio
+
+from benchmarks import graphs, krules_bench, load, report
+from krules import helpers
+from krules.relations import parent
+
+
+def test_graph_shapes_have_requested_size():
+    for shape in graphs.SHAPES:
+        edges = graphs.generate(shape, 500, seed=1)
+        nodes = {x for edge in edges for x in edge}
+        assert len(nodes) == 500, shape
+    assert graphs.parse_size("100k") == 100_000
+
+
+def test_krules_suite_restores_facts_and_roles():
+    before = set(parent.facts)
+    results = krules_bench.run("tree", 300, queries=50)
+    assert {r["name"] for r in results} >= {"closure_from_edges", "descendants_of", "ancestors_of",
+                                            "siblings_of", "has_role"}
+    assert all(r["ops_per_sec"] > 0 for r in results)
+    assert set(parent.facts) == before
+    assert not helpers.has_role("bench-role", "n0")
+
+
+def test_load_generator_reports_throughput():
+    result = asyncio.run(load.run("dag", 200, connections=3, requests=20, pipeline=2, cache=True))
+    assert result["ops"] == 60 and result["errors"] == 0
+    assert result["requests_per_sec"] > 0 and result["p99_us"] >= result["p50_us"]
+
+
+def test_compare_flags_slowdowns_only():
+    base = {"suite": "krules", "name": "descendants_of", "shape": "tree", "nodes": 10}
+    old = report.document([{**base, "ops_per_sec": 100.0}], {})
+    assert report.compare(old, report.document([{**base, "ops_per_sec": 90.0}], {})) == []
+    [regression] = report.compare(old, report.document([{**base, "ops_per_sec": 50.0}], {}))
+    assert regression["ratio"] == 0.5
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import time
+
+from mcp.cache import ResponseCache
+from mcp.codecs import JSON
+from mcp.server import MCPServer
+
+
+def test_lru_ttl_and_version_invalidation(monkeypatch):
+    version = [0]
+    cache = ResponseCache(maxsize=2, ttl=10, version=lambda: version[0])
+    for k in ("a", "b", "c"):
+        cache.put(("json", k), b"x", cache.version())
+    assert cache.get(("json", "a")) is None and len(cache) == 2
+
+    v = cache.version()
+    version[0] += 1
+    cache.put(("json", "stale"), b"x", v)  # computed before the change: dropped
+    assert cache.get(("json", "stale")) is None and len(cache) == 0
+
+    cache.put(("json", "d"), b"x", cache.version())
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get(("json", "d")) is None
+
+
+def test_codec_splices_id_into_cached_frame():
+    frame = JSON.encode({"type": "r", "v": [1]})
+    assert json.loads(JSON.with_field(frame, "id", "q")) == {"type": "r", "v": [1], "id": "q"}
+
+
+def test_server_serves_hits_without_calling_handler():
+    calls = []
+    facts = [0]
+
+    def lookup(message):
+        calls.append(message["who"])
+        return {"type": "answer", "who": message["who"], "facts": facts[0]}
+
+    async def scenario():
+        server = MCPServer(port=0, cache=ResponseCache(version=lambda: facts[0]))
+        server.register_handler("lookup", lookup)
+        server.cache_responses("lookup", when=lambda m: m.get("who") != "nobody")
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            await reader.readline()
+
+            async def ask(**request):
+                writer.write((json.dumps({"type": "lookup", **request}) + "\n").encode("utf8"))
+                await writer.drain()
+                return json.loads(await reader.readline())
+
+            assert await ask(who="bob", id=1) == {"type": "answer", "who": "bob", "facts": 0, "id": 1}
+            assert await ask(who="bob", id=2) == {"type": "answer", "who": "bob", "facts": 0, "id": 2}
+            assert await ask(who="bob") == {"type": "answer", "who": "bob", "facts": 0}
+            assert calls == ["bob"]
+            facts[0] += 1
+            assert (await ask(who="bob"))["facts"] == 1
+            await ask(who="nobody")
+            await ask(who="nobody")
+            assert calls == ["bob", "bob", "nobody", "nobody"]
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from mcp.client import Client, StreamError
+from mcp.server import MCPServer
+
+
+class CountingServer(MCPServer):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.messages = []
+        self.connections = 0
+
+    async def _handle_client(self, reader, writer):
+        self.connections += 1
+        await super()._handle_client(reader, writer)
+
+    async def on_request(self, message):
+        self.messages.append(message.get("type"))
+        if message.get("type") == "sleep":
+            await asyncio.sleep(message["seconds"])
+            return {"type": "slept", "n": message["n"]}
+        if message.get("type") == "count":
+            return iter(range(message["n"]))
+        return await super().on_request(message)
+
+
+def test_pooled_connections_multiplex_requests():
+    async def scenario():
+        server = CountingServer(port=0, pipeline=8)
+        await server.start()
+        try:
+            async with Client(server.host, server.port, pool_size=2) as client:
+                replies = await asyncio.gather(*(client.request({"type": "sleep", "seconds": 0.05 * (3 - i % 3),
+                                                                 "n": i}) for i in range(12)))
+                assert [r["n"] for r in replies] == list(range(12))
+                assert all("id" not in r for r in replies)
+                for _ in range(5):
+                    assert await client.request({"type": "echo", "payload": 1}) == {"type": "echo", "payload": 1}
+                assert [x async for x in client.stream({"type": "count", "n": 40, "offset": 5})] == list(range(5, 40))
+                with pytest.raises(StreamError):
+                    [x async for x in client.stream({"type": "nope"})]
+            assert server.connections == 2
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_batching_window_coalesces_concurrent_calls():
+    async def scenario():
+        server = CountingServer(port=0)
+        await server.start()
+        try:
+            async with Client(server.host, server.port, batch_window=0.005) as client:
+                replies = await asyncio.gather(*(client.request({"type": "echo", "payload": i}) for i in range(10)))
+                assert [r["payload"] for r in replies] == list(range(10))
+            assert server.messages.count("batch") == 1
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_batching_window_honours_timeouts():
+    async def scenario():
+        server = CountingServer(port=0)
+        await server.start()
+        try:
+            async with Client(server.host, server.port, batch_window=0.005, timeout=5) as client:
+                with pytest.raises(asyncio.TimeoutError):
+                    await client.request({"type": "sleep", "seconds": 0.5, "n": 1}, timeout=0.05)
+            async with Client(server.host, server.port, batch_window=0.005, timeout=0.05) as client:
+                with pytest.raises(asyncio.TimeoutError):
+                    await client.request({"type": "sleep", "seconds": 0.5, "n": 2})
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_retries_after_server_restart():
+    async def scenario():
+        server = CountingServer(port=0)
+        await server.start()
+        port = server.port
+        client = Client(server.host, port, retries=3, backoff=0.01)
+        assert (await client.request({"type": "echo", "payload": 1}))["payload"] == 1
+        await server.stop()
+        server = CountingServer(port=port)
+        await server.start()
+        try:
+            # the pooled connection is dead; the request is resent on a new one
+            assert (await client.request({"type": "echo", "payload": 2}))["payload"] == 2
+        finally:
+            await client.close()
+            await server.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,91 @@
+import random
+
+from krules.closure import Interner, iter_bits, transitive_closure
+from krules.helpers import closure_from_edges
+
+
+def _naive_closure(edges):
+    reach = {}
+    for a, b in edges:
+        reach.setdefault(a, set()).add(b)
+        reach.setdefault(b, set())
+    nodes = list(reach)
+    for k in nodes:
+        for i in nodes:
+            if k in reach[i]:
+                reach[i].update(reach[k])
+    return reach
+
+
+def test_iter_bits_and_interner():
+    assert list(iter_bits(0)) == []
+    assert list(iter_bits(0b100101 | 1 << 200)) == [0, 2, 5, 200]
+    interner = Interner(["a", "b", "c"])
+    assert interner.intern("b") == 1
+    assert set(interner.names(interner.bits(["a", "c", "zz"]))) == {"a", "c"}
+
+
+def test_closure_matches_naive_on_random_graphs():
+    rng = random.Random(7)
+    for _ in range(25):
+        n = rng.randint(1, 30)
+        edges = [(f"n{rng.randrange(n)}", f"n{rng.randrange(n)}") for _ in range(rng.randint(0, 3 * n))]
+        assert dict(closure_from_edges(edges)) == _naive_closure(edges)
+
+
+def test_closure_view_queries():
+    view = transitive_closure([("a", "b"), ("b", "c"), ("c", "b"), ("d", "d")])
+    assert view["a"] == {"b", "c"}
+    assert view["b"] == {"b", "c"}
+    assert view["d"] == {"d"}
+    assert view.reaches("a", "c") and not view.reaches("c", "a")
+    assert not view.reaches("a", "missing")
+    assert view.count("a") == 2
+    assert len(view) == 4 and "c" in view
+
+
+def test_closure_long_chain():
+    n = 5000
+    view = closure_from_edges((i, i + 1) for i in range(n))
+    assert view.count(0) == n
+    assert view[n - 1] == {n}
+
+
+def test_closure_index_tracks_incremental_changes():
+    from krules.closure import ClosureIndex
+    from krules.store import FactStore
+
+    rng = random.Random(11)
+    store = FactStore()
+    edge = store.relation("edge", 2)
+    for _ in range(40):
+        edge.add_fact(rng.randrange(15), rng.randrange(15))
+    index = ClosureIndex(edge)
+    for _ in range(200):
+        a, b = rng.randrange(18), rng.randrange(18)
+        if rng.random() < 0.5:
+            edge.add_fact(a, b)
+        else:
+            facts = list(edge.facts)
+            if facts:
+                edge.retract_fact(*rng.choice(facts))
+        expected = _naive_closure(edge.facts)
+        for node, reach in expected.items():
+            assert set(index.descendants(node)) == reach
+            assert set(index.ancestors(node)) == {n for n, r in expected.items() if node in r}
+    index.close()
+
+
+def test_descendants_and_ancestors_follow_parent_facts():
+    from krules import helpers, relations
+
+    assert sorted(helpers.descendants_of("bob")) == ["alice", "jack", "sue"]
+    assert sorted(helpers.ancestors_of("sue")) == ["alice", "bob"]
+    relations.parent.add_fact("sue", "tom")
+    try:
+        assert "tom" in helpers.descendants_of("bob")
+        assert sorted(helpers.ancestors_of("tom")) == ["alice", "bob", "sue"]
+    finally:
+        relations.parent.retract_fact("sue", "tom")
+    assert "tom" not in helpers.descendants_of("bob")
+    assert helpers.ancestors_of("tom") == []
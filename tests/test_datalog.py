@@ -0,0 +1,57 @@
+import pytest
+from kanren import var
+
+from krules.closure import transitive_closure
+from krules.datalog import Program, StratificationError, neg, neq
+from krules.store import FactStore
+
+X, Y, Z, P = var("X"), var("Y"), var("Z"), var("P")
+
+
+def _family():
+    store = FactStore()
+    parent = store.relation("parent", 2)
+    for a, b in [("bob", "alice"), ("bob", "jack"), ("alice", "sue"), ("sue", "tom")]:
+        parent.add_fact(a, b)
+    store.relation("female", 1).add_fact("alice")
+    store.relation("female", 1).add_fact("sue")
+    return store, parent
+
+
+def test_recursive_rules_match_closure_and_are_stored():
+    store, parent = _family()
+    program = Program(store)
+    program.rule(("ancestor", X, Y), (parent, X, Y))
+    program.rule(("ancestor", X, Z), ("ancestor", X, Y), ("parent", Y, Z))
+    assert program.evaluate() == {"ancestor": 7}
+
+    expected = transitive_closure(parent.facts)
+    assert set(store["ancestor"].facts) == {(a, b) for a in expected for b in expected[a]}
+    assert set(store["ancestor"].project(0, "bob", 1)) == {"alice", "jack", "sue", "tom"}
+
+    parent.add_fact("tom", "ann")
+    program.evaluate()
+    assert ("bob", "ann") in store["ancestor"]
+
+
+def test_inequality_and_stratified_negation():
+    store, _ = _family()
+    program = Program(store)
+    program.rule(("sibling", X, Y), ("parent", P, X), ("parent", P, Y), neq(X, Y))
+    program.rule(("son", X, P), ("parent", P, X), neg(("female", X)))
+    program.rule(("only_child", X), ("parent", P, X), neg(("has_sibling", X)))
+    program.rule(("has_sibling", X), ("sibling", X, Y))
+    program.evaluate()
+    assert set(store["sibling"].facts) == {("alice", "jack"), ("jack", "alice")}
+    assert set(store["son"].facts) == {("jack", "bob"), ("tom", "sue")}
+    assert set(store["only_child"].facts) == {("sue",), ("tom",)}
+
+
+def test_rejects_unsafe_and_unstratifiable_programs():
+    store, _ = _family()
+    program = Program(store)
+    with pytest.raises(ValueError):
+        program.rule(("odd", X, Y), ("parent", X, Z))
+    program.rule(("win", X), ("parent", X, Y), neg(("win", Y)))
+    with pytest.raises(StratificationError):
+        program.evaluate()
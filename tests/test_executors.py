@@ -0,0 +1,24 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp.executors import create_executor, warm_up, worker_count
+
+
+def test_warm_up_starts_every_thread_worker():
+    started = set()
+    executor = ThreadPoolExecutor(4, initializer=lambda: started.add(threading.get_ident()))
+    try:
+        warm_up(executor, 4)
+        assert len(started) == 4
+    finally:
+        executor.shutdown()
+
+
+def test_create_executor_warms_the_whole_pool():
+    executor = create_executor("thread", 3, preload=["krules.helpers"])
+    try:
+        names = {t.name for t in threading.enumerate() if t.name.startswith("mcp-worker")}
+        assert len(names) == 3
+    finally:
+        executor.shutdown()
+    assert worker_count("thread", 3) == 3 and worker_count("process") >= 1
@@ -0,0 +1,46 @@
+import gzip
+import json
+
+import pytest
+
+from krules import __main__ as cli
+from krules.loader import chunked, detect_format, load_facts
+from krules.store import FactStore
+
+
+def test_load_csv_skips_duplicates_and_reports_progress(tmp_path):
+    path = tmp_path / "edges.csv"
+    path.write_text("src,dst\na,b\na,c\na,b\nc,d\n")
+    rel = FactStore().relation("edge", 2)
+    seen = []
+    stats = load_facts(rel, path, header=True, chunk_size=2, progress=lambda s: seen.append(s.rows))
+    assert (stats.rows, stats.added, stats.duplicates, stats.chunks) == (4, 3, 1, 2)
+    assert seen == [2, 4]
+    assert rel.project(0, "a", 1) == ("b", "c")
+
+
+def test_load_jsonl_objects_and_gzip(tmp_path):
+    path = tmp_path / "edges.jsonl.gz"
+    with gzip.open(path, "wt") as fh:
+        for src, dst in [("x", "y"), ("y", "z")]:
+            fh.write(json.dumps({"parent": src, "child": dst, "note": "-"}) + "\n")
+    assert detect_format(path) == "jsonl"
+    rel = FactStore().relation("edge", 2)
+    stats = load_facts(rel, path, columns=["parent", "child"])
+    assert stats.added == 2 and ("y", "z") in rel
+
+
+def test_chunked_and_unknown_format():
+    assert list(chunked(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    with pytest.raises(ValueError):
+        detect_format("facts.xlsx")
+
+
+def test_cli_load(tmp_path, capsys):
+    path = tmp_path / "people.tsv"
+    path.write_text("carol\tdave\n")
+    assert cli.main(["load", "parent", str(path), "--quiet"]) == 0
+    assert "1 facts added" in capsys.readouterr().out
+    from krules import relations
+
+    assert ("carol", "dave") not in relations.parent  # loaded into a store of its own
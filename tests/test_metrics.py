@@ -0,0 +1,144 @@
+import asyncio
+import json
+import sys
+import threading
+
+from krules import stats
+from krules.helpers import descendants_of
+from mcp.metrics import MetricsRegistry
+from mcp.server import MCPServer
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.counter("hits_total", "Hits.", ("path",)).inc("/a")
+    registry.gauge("open").set(3)
+    hist = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    hist.observe(0.05)
+    hist.observe(0.5)
+    registry.add_collector(lambda: [("extra_total", "counter", "", [({"k": 'a"b'}, 2)])])
+
+    text = registry.render()
+    assert '# TYPE hits_total counter' in text
+    assert 'hits_total{path="/a"} 1' in text
+    assert 'open 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert 'latency_seconds_count 2' in text
+    assert 'extra_total{k="a\\"b"} 2' in text
+    assert registry.snapshot()["open"]["samples"][0]["value"] == 3
+
+
+def test_krules_stats_count_calls_only_when_enabled():
+    stats.reset()
+    descendants_of("bob")
+    assert not stats._calls
+    stats.enable()
+    try:
+        descendants_of("bob")
+        descendants_of("bob")
+    finally:
+        stats.disable()
+    assert stats._calls["descendants_of"] == 2
+    assert stats.hit_rate("closure") > 0
+    families = {name: samples for name, _, _, samples in stats.collect()}
+    assert ({"func": "descendants_of"}, 2) in families["krules_calls_total"]
+    stats.reset()
+
+
+def test_krules_stats_do_not_lose_concurrent_updates():
+    @stats.instrumented
+    def step():
+        stats.cache_hit("test")
+
+    def work():
+        for _ in range(2000):
+            step()
+
+    stats.reset()
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads mid-update as often as possible
+    stats.enable()
+    try:
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        stats.disable()
+        sys.setswitchinterval(interval)
+    assert stats._calls["step"] == 16000 and stats._hits["test"] == 16000
+    stats.reset()
+
+
+def test_server_metrics_message_and_http_endpoint():
+    async def scenario():
+        server = MCPServer(port=0, metrics_port=0)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            await reader.readline()
+            for msg in ({"type": "echo", "payload": 1}, {"type": "nope"}, {"type": "metrics"}):
+                writer.write((json.dumps(msg) + "\n").encode("utf8"))
+            await writer.drain()
+            await reader.readline()
+            await reader.readline()
+            snapshot = json.loads(await reader.readline())["metrics"]
+            requests = {tuple(s["labels"].values()): s["value"] for s in snapshot["mcp_requests_total"]["samples"]}
+            assert requests == {("echo",): 1, ("unknown",): 1}
+            assert snapshot["mcp_connections"]["samples"][0]["value"] == 1
+            # the metrics request itself is in flight while the snapshot is taken
+            assert snapshot["mcp_requests_in_flight"]["samples"][0]["value"] == 1
+            writer.close()
+
+            r, w = await asyncio.open_connection(server.host, server.metrics_port)
+            w.write(b"GET /metrics HTTP/1.1\r\nHost: x\r\n\r\n")
+            await w.drain()
+            body = (await r.read()).decode("utf8")
+            assert body.startswith("HTTP/1.1 200 OK")
+            assert 'mcp_request_errors_total{type="unknown",reason="unknown_type"} 1' in body
+            assert 'mcp_request_duration_seconds_count{type="echo"} 1' in body
+            w.close()
+
+            r, w = await asyncio.open_connection(server.host, server.metrics_port)
+            w.write(b"GET / HTTP/1.1\r\n\r\n")
+            assert (await r.read()).startswith(b"HTTP/1.1 404")
+            w.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_metrics_disabled_by_default():
+    async def scenario():
+        server = MCPServer(port=0)
+        assert await server.on_request({"type": "metrics"}) == {"type": "error", "reason": "metrics_disabled"}
+
+    asyncio.run(scenario())
+
+
+def test_handler_exceptions_use_a_bounded_error_label():
+    def fail(message):
+        raise ValueError(f"bad input {message['n']}")
+
+    async def scenario():
+        server = MCPServer(port=0, metrics=MetricsRegistry())
+        server.register_handler("fail", fail)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            await reader.readline()
+            for n in range(3):
+                writer.write((json.dumps({"type": "fail", "n": n}) + "\n").encode("utf8"))
+                assert json.loads(await reader.readline())["reason"] == f"bad input {n}"
+            writer.write(b'{"type":"metrics"}\n')
+            snapshot = json.loads(await reader.readline())["metrics"]
+            errors = [(s["labels"], s["value"]) for s in snapshot["mcp_request_errors_total"]["samples"]]
+            assert errors == [({"type": "fail", "reason": "handler_exception"}, 3)]
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from mcp.server import MCPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _children(pid):
+    out = subprocess.run(["pgrep", "-P", str(pid)], capture_output=True, text=True).stdout
+    return {int(p) for p in out.split()}
+
+
+def _echo(port):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as s:
+        f = s.makefile("rwb")
+        f.readline()
+        f.write(b'{"type":"echo","payload":"hi"}\n')
+        f.flush()
+        return json.loads(f.readline())
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="prefork needs fork()")
+def test_supervisor_restarts_workers_and_stops_on_sigterm():
+    proc = subprocess.Popen([sys.executable, "-m", "mcp", "--port", "0", "--processes", "2", "--grace", "1"],
+                            cwd=ROOT, stderr=subprocess.PIPE, text=True)
+    try:
+        port = None
+        while port is None:
+            line = proc.stderr.readline()
+            assert line, "supervisor exited early"
+            match = re.search(r"supervising 2 workers on [\d.]+:(\d+)", line)
+            if match:
+                port = int(match.group(1))
+        deadline = time.monotonic() + 10
+        while len(_children(proc.pid)) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        workers = _children(proc.pid)
+        assert len(workers) == 2
+        assert _echo(port) == {"type": "echo", "payload": "hi"}
+
+        victim = min(workers)
+        os.kill(victim, signal.SIGKILL)
+        while (len(_children(proc.pid)) < 2 or victim in _children(proc.pid)) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert victim not in _children(proc.pid) and len(_children(proc.pid)) == 2
+        assert _echo(port)["payload"] == "hi"
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=10) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.stderr.close()
+
+
+class SlowServer(MCPServer):
+    async def on_request(self, message):
+        if message.get("type") == "sleep":
+            await asyncio.sleep(message["seconds"])
+            return {"type": "slept"}
+        return await super().on_request(message)
+
+
+def test_stop_with_grace_drains_in_flight_requests():
+    async def scenario():
+        server = SlowServer(port=0)
+        await server.start()
+        busy_reader, busy = await asyncio.open_connection(server.host, server.port)
+        idle_reader, idle = await asyncio.open_connection(server.host, server.port)
+        await busy_reader.readline()
+        await idle_reader.readline()
+        busy.write(b'{"type":"sleep","seconds":0.3}\n')
+        await busy.drain()
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        stopping = asyncio.ensure_future(server.stop(grace=5))
+        assert await asyncio.wait_for(idle_reader.read(), 1) == b""  # idle connection closed at once
+        assert json.loads(await busy_reader.readline()) == {"type": "slept"}
+        await stopping
+        assert time.monotonic() - started < 2
+        busy.close()
+        idle.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from mcp.prompts import PromptManager, Template
+from mcp.server import MCPServer
+
+
+class _User:
+    name = "ada"
+
+
+def test_compiled_template_matches_str_format():
+    kwargs = {"who": "bob", "n": 42, "price": 3.14159, "width": 8, "user": _User(), "items": ["x", {"k": "v"}]}
+    for source in [
+        "plain text, no fields",
+        "",
+        "hello {who}!",
+        "{who}{who} {{literal}} {n:05d} {n!r:>6}",
+        "{price:{width}.2f}|",
+        "{user.name} {items[0]} {items[1][k]} {who!a}",
+    ]:
+        assert Template(source).render(kwargs) == source.format(**kwargs), source
+        assert "".join(Template(source).iter_render(kwargs)) == source.format(**kwargs)
+
+
+def test_positional_and_malformed_templates_behave_like_str_format():
+    try:
+        Template("{0}").render({})
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("expected IndexError")
+    try:
+        Template("unclosed {")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_render_is_cached_per_argument_types_and_reset_on_register():
+    prompts = PromptManager(cache_size=2)
+    prompts.register("p", "value={v}")
+    assert prompts.render("p", v=1) == "value=1"
+    assert prompts.render("p", v=True) == "value=True"  # 1 == True but renders differently
+    assert prompts.render("p", v=1) == "value=1"
+    assert prompts.cache_info() == {"entries": 2, "hits": 1, "misses": 2}
+    prompts.render("p", v="a")  # evicts the least recently used entry (v=True)
+    assert prompts.cache_info()["entries"] == 2
+    assert prompts.render("p", v=[1]) == "value=[1]"  # unhashable: rendered, not cached
+    prompts.register("p", "v is {v}")
+    assert prompts.render("p", v=1) == "v is 1"
+    static = "x" * 10_000
+    prompts.register("s", static)
+    assert prompts.render("s") is prompts.render("s")
+
+
+def test_iter_render_checks_arguments_eagerly():
+    prompts = PromptManager()
+    prompts.register("p", "{a} and {b}")
+    try:
+        prompts.iter_render("p", a=1)
+    except KeyError as exc:
+        assert exc.args[0] == "b"
+    else:
+        raise AssertionError("expected KeyError")
+    assert list(prompts.iter_render("p", a=1, b=2)) == ["1", " and ", "2"]
+
+
+def test_server_renders_and_streams_prompts():
+    async def scenario():
+        prompts = PromptManager()
+        prompts.register("greet", "System: be brief.\nUser: {who} asks {q}")
+        server = MCPServer(port=0, prompts=prompts)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            await reader.readline()
+
+            async def ask(message):
+                writer.write((json.dumps(message) + "\n").encode())
+                await writer.drain()
+                return json.loads(await reader.readline())
+
+            args = {"who": "bob", "q": "why?"}
+            reply = await ask({"type": "prompt", "prompt_id": "greet", "args": args})
+            assert reply["text"] == "System: be brief.\nUser: bob asks why?"
+            frame = await ask({"type": "prompt", "prompt_id": "greet", "args": args, "stream": True})
+            assert frame["type"] == "partial"
+            assert "".join(frame["items"]) == reply["text"]
+            assert json.loads(await reader.readline()) == {"type": "done", "count": len(frame["items"])}
+            assert (await ask({"type": "prompt", "prompt_id": "greet", "args": {"who": "x"}}))["name"] == "q"
+            assert (await ask({"type": "prompt", "prompt_id": "nope"}))["reason"] == "unknown_prompt"
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
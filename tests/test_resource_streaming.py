@@ -0,0 +1,100 @@
+import asyncio
+import json
+import mmap
+import os
+
+from mcp.client import Client, StreamError
+from mcp.resources import FileResource, ResourceManager
+from mcp.server import MCPServer
+
+
+def _payload(size):
+    return bytes(i % 251 for i in range(size))
+
+
+async def _read_body(reader):
+    """Read header, chunks and done of a binary resource reply from a raw connection."""
+    header = json.loads(await reader.readline())
+    if header["type"] != "resource_response":
+        return header, None, None
+    body = bytearray()
+    chunks = 0
+    while True:
+        frame = json.loads(await reader.readline())
+        if frame["type"] == "done":
+            return header, bytes(body), (chunks, frame)
+        assert frame["type"] == "chunk" and frame["offset"] == header["offset"] + len(body)
+        body += await reader.readexactly(frame["length"])
+        chunks += 1
+
+
+def test_file_resource_is_sent_in_raw_chunks(tmp_path):
+    data = _payload(300_000)
+    path = tmp_path / "artifact.bin"
+    path.write_bytes(data)
+
+    async def scenario():
+        resources = ResourceManager()
+        resources.register("artifact", FileResource(path))
+        server = MCPServer(port=0, resources=resources, resource_chunk=64 * 1024)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            await reader.readline()
+            writer.write(b'{"type":"resource","name":"artifact","binary":true,"id":1}\n')
+            header, body, (chunks, done) = await _read_body(reader)
+            assert header == {"type": "resource_response", "name": "artifact", "size": len(data), "offset": 0,
+                              "length": len(data), "id": 1}
+            assert body == data and chunks == 5 and done == {"type": "done", "count": len(data), "id": 1}
+
+            # a byte range, then the same connection keeps working
+            writer.write(b'{"type":"resource","name":"artifact","binary":true,"offset":1000,"length":70000}\n')
+            header, body, (chunks, _) = await _read_body(reader)
+            assert body == data[1000:71000] and chunks == 2
+            writer.write(b'{"type":"resource","name":"artifact"}\n')
+            assert json.loads(await reader.readline())["size"] == len(data)  # no body without "binary"
+            writer.write(b'{"type":"resource","name":"artifact","binary":true,"offset":400000}\n')
+            assert json.loads(await reader.readline())["reason"] == "invalid_range"
+            writer.write(b'{"type":"echo","payload":"still in sync"}\n')
+            assert json.loads(await reader.readline())["payload"] == "still in sync"
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_client_reads_mmap_and_bytes_resources(tmp_path):
+    data = _payload(200_000)
+    path = tmp_path / "mapped.bin"
+    path.write_bytes(data)
+
+    async def scenario():
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            resources = ResourceManager()
+            resources.register("mapped", mapped)
+            resources.register_factory("blob", lambda: data[:5000])
+            resources.register("text", "not binary")
+            server = MCPServer(port=0, resources=resources, pipeline=4, resource_chunk=32 * 1024)
+            await server.start()
+            try:
+                async with Client(server.host, server.port, pool_size=1) as client:
+                    async def read(name, **kw):
+                        return b"".join([chunk async for chunk in client.read_resource(name, **kw)])
+
+                    whole, part, blob, echo = await asyncio.gather(
+                        read("mapped"), read("mapped", offset=123, length=45_678), read("blob"),
+                        client.request({"type": "echo", "payload": 1}))
+                    assert whole == data and part == data[123:123 + 45_678] and blob == data[:5000]
+                    assert echo == {"type": "echo", "payload": 1}
+                    try:
+                        await read("text")
+                    except StreamError as exc:
+                        assert exc.response["reason"] == "not_binary"
+                    else:
+                        raise AssertionError("expected StreamError")
+            finally:
+                await server.stop()
+
+    asyncio.run(scenario())
+    assert os.path.getsize(path) == len(data)
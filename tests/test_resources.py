@@ -0,0 +1,135 @@
+import asyncio
+import json
+import threading
+import time
+
+from mcp.resources import ResourceManager
+from mcp.server import MCPServer
+
+
+def test_factories_load_lazily_and_once_across_threads():
+    resources = ResourceManager()
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return b"x" * 100
+
+    resources.register("big", build)  # eager: the function itself is the resource
+    resources.register_factory("lazy", build)
+    assert resources.get("big") is build and not calls
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(resources.get("lazy"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and results == [b"x" * 100] * 4
+    assert resources.info()["bytes"] == 100
+
+
+def test_async_load_is_single_flight():
+    resources = ResourceManager()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"rows": 3}
+
+    resources.register_factory("remote", fetch)
+    resources.register_factory("sync", lambda: calls.append(2) or "text")
+
+    async def scenario():
+        values = await asyncio.gather(*(resources.load("remote") for _ in range(5)))
+        assert values == [{"rows": 3}] * 5
+        assert await asyncio.gather(resources.load("sync"), resources.load("sync")) == ["text", "text"]
+
+    asyncio.run(scenario())
+    assert calls == [1, 2]
+    try:
+        ResourceManager().get("missing")
+    except KeyError:
+        pass
+    resources.register_factory("remote", fetch)
+    try:
+        resources.get("remote")
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("expected TypeError for an async factory in get()")
+    resources.close()
+
+
+def test_stale_values_are_served_while_refreshing_in_background():
+    now = [0.0]
+    resources = ResourceManager(clock=lambda: now[0])
+    version = [0]
+    refreshed = threading.Event()
+
+    def build():
+        version[0] += 1
+        if version[0] > 1:
+            refreshed.set()
+        return f"v{version[0]}"
+
+    resources.register_factory("config", build, ttl=10)
+    assert resources.get("config") == "v1"
+    now[0] = 5
+    assert resources.get("config") == "v1"
+    now[0] = 11
+    assert resources.get("config") == "v1"  # stale, returned without waiting
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if resources.get("config") == "v2":
+            break
+        time.sleep(0.01)
+    assert resources.get("config") == "v2" and resources.info()["refreshes"] == 1
+    resources.close()
+
+
+def test_memory_budget_evicts_least_recently_used():
+    resources = ResourceManager(memory_budget=250)
+    loads = []
+
+    def factory(name, size):
+        def build():
+            loads.append(name)
+            return b"\0" * size
+        return build
+
+    resources.register("pinned", b"\0" * 1000)  # registered values don't count and stay
+    for name in "abc":
+        resources.register_factory(name, factory(name, 100))
+    resources.get("a")
+    resources.get("b")
+    resources.get("a")  # b is now the least recently used
+    resources.get("c")
+    assert resources.info()["bytes"] == 200 and resources.evictions == 1
+    resources.get("a")
+    resources.get("b")  # reloaded
+    assert loads == ["a", "b", "c", "b"]
+    assert len(resources.get("pinned")) == 1000
+
+
+def test_server_serves_lazy_resources():
+    async def scenario():
+        resources = ResourceManager()
+        resources.register_factory("motd", lambda: "hello")
+        server = MCPServer(port=0, resources=resources)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            await reader.readline()
+            writer.write(b'{"type":"resource","name":"motd"}\n{"type":"resource","name":"nope"}\n')
+            assert json.loads(await reader.readline()) == {"type": "resource_response", "name": "motd",
+                                                           "content": "hello"}
+            assert json.loads(await reader.readline())["reason"] == "unknown_resource"
+            writer.close()
+        finally:
+            await server.stop()
+            resources.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,10 @@
+from krules import helpers
+
+
+def test_has_roles_batch():
+    helpers.assign_role("auditor", "jack")
+    try:
+        assert helpers.has_roles([("auditor", "jack"), ("auditor", "bob"), ("nope", "jack")]) == [True, False, False]
+    finally:
+        helpers.revoke_role("auditor", "jack")
+    assert not helpers.has_role("auditor", "jack")
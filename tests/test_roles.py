@@ -0,0 +1,97 @@
+import random
+import threading
+
+from krules.bitmap import Bitmap
+from krules.closure import ClosureIndex
+from krules.roles import RoleIndex
+from krules.store import FactStore
+
+
+def test_bitmap_matches_set_semantics_across_containers():
+    rng = random.Random(7)
+    for size in (10, 6000, 150000):
+        a = set(rng.sample(range(3 * size), size))
+        b = set(rng.sample(range(3 * size), size // 2))
+        A, B = Bitmap(a), Bitmap(b)
+        assert list(A) == sorted(a) and len(A) == len(a)
+        assert set(A & B) == a & b
+        assert set(A | B) == a | b
+        assert set(A - B) == a - b
+        assert set(Bitmap.union([A, B])) == a | b
+        probe = rng.randrange(3 * size)
+        assert (probe in A) == (probe in a)
+        C = A.copy()
+        C.discard(min(a))
+        C.add(3 * size + 1)
+        assert set(A) == a
+
+
+def _family():
+    store = FactStore()
+    parent = store.relation("parent", 2)
+    parent.add_fact("ann", "bea")
+    parent.add_fact("bea", "cal")
+    index = ClosureIndex(parent)
+    return parent, RoleIndex(lambda: index)
+
+
+def test_inherited_roles_follow_later_descendants():
+    parent, roles = _family()
+    roles.assign_inherit("heir", "ann")
+    assert roles.has("heir", "cal")
+    assert not roles.has("heir", "dan")
+    parent.add_fact("cal", "dan")
+    assert roles.has("heir", "dan")
+    parent.retract_fact("bea", "cal")
+    assert roles.members("heir") == ["ann", "bea"]
+
+
+def test_role_hierarchy_and_set_algebra():
+    _, roles = _family()
+    roles.add_implication("admin", "editor")
+    roles.add_implication("editor", "viewer")
+    roles.assign("admin", "ann")
+    roles.assign("viewer", "bea")
+    roles.assign("oncall", "ann")
+    roles.assign("oncall", "bea")
+    roles.assign("suspended", "bea")
+    assert roles.has("viewer", "ann") and roles.has("editor", "ann")
+    assert not roles.has("editor", "bea")
+    assert roles.has_many([("viewer", "bea"), ("admin", "bea"), ("nope", "x")]) == [True, False, False]
+    assert roles.names(roles.select(all_of=["viewer", "oncall"])) == ["ann", "bea"]
+    assert roles.names(roles.select(all_of=["viewer", "oncall"], none_of=["suspended"])) == ["ann"]
+    assert roles.names(roles.select(any_of=["admin", "suspended"])) == ["ann", "bea"]
+
+    roles.remove_implication("editor", "viewer")
+    assert not roles.has("viewer", "ann")
+    roles.revoke("oncall", "ann")
+    assert roles.members("oncall") == ["bea"]
+
+
+def test_assignment_during_a_check_is_not_lost():
+    parent, _ = _family()
+    index = ClosureIndex(parent)
+    entered, release = threading.Event(), threading.Event()
+    calls = []
+
+    def closure():
+        # the second call comes from inside resolution, after the role tables were read:
+        # park the check there
+        calls.append(None)
+        if len(calls) == 2:
+            entered.set()
+            release.wait(5)
+        return index
+
+    roles = RoleIndex(closure)
+    roles.assign_inherit("heir", "bea")
+    check = threading.Thread(target=roles.members_bitmap, args=("heir",))
+    check.start()
+    assert entered.wait(5)
+    assign = threading.Thread(target=roles.assign, args=("heir", "zed"))
+    assign.start()
+    assign.join(0.1)
+    release.set()
+    check.join()
+    assign.join()
+    assert set(roles.members("heir")) == {"bea", "cal", "zed"}
@@ -0,0 +1,305 @@
+import asyncio
+import json
+
+from mcp.server import MCPServer
+
+
+class SlowServer(MCPServer):
+    async def on_request(self, message):
+        if message.get("type") == "sleep":
+            await asyncio.sleep(message["seconds"])
+            return {"type": "slept", "seconds": message["seconds"]}
+        return await super().on_request(message)
+
+
+async def _connect(server):
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    ready = json.loads(await reader.readline())
+    return reader, writer, ready
+
+
+async def _send(writer, obj):
+    writer.write((json.dumps(obj) + "\n").encode("utf8"))
+    await writer.drain()
+
+
+def test_sequential_echo_and_invalid_json():
+    async def scenario():
+        server = MCPServer(port=0)
+        await server.start()
+        try:
+            reader, writer, ready = await _connect(server)
+            assert ready["type"] == "ready" and "json" in ready["codecs"]
+            writer.write(b"not json\n")
+            await _send(writer, {"type": "echo", "payload": 1, "id": 7})
+            assert json.loads(await reader.readline())["reason"] == "invalid_json"
+            assert json.loads(await reader.readline()) == {"type": "echo", "payload": 1, "id": 7}
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_pipelined_responses_complete_out_of_order():
+    async def scenario():
+        server = SlowServer(port=0, pipeline=4)
+        await server.start()
+        try:
+            reader, writer, ready = await _connect(server)
+            assert ready["pipeline"] == 4
+            await _send(writer, {"type": "sleep", "seconds": 0.2, "id": "slow"})
+            await _send(writer, {"type": "echo", "payload": "x", "id": "fast"})
+            first = json.loads(await reader.readline())
+            second = json.loads(await reader.readline())
+            assert first["id"] == "fast"
+            assert second["id"] == "slow"
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_pipeline_limit_applies_backpressure():
+    async def scenario():
+        server = SlowServer(port=0, pipeline=2)
+        await server.start()
+        try:
+            reader, writer, _ = await _connect(server)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            for i in range(4):
+                await _send(writer, {"type": "sleep", "seconds": 0.1, "id": i})
+            ids = [json.loads(await reader.readline())["id"] for _ in range(4)]
+            # 4 requests, 2 at a time -> two rounds of 0.1s
+            assert sorted(ids) == [0, 1, 2, 3]
+            assert loop.time() - started >= 0.19
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def _sleepy(message):
+    import time
+
+    time.sleep(message["seconds"])
+    return {"type": "slept"}
+
+
+def test_blocking_handler_does_not_stall_other_clients():
+    async def scenario():
+        server = MCPServer(port=0)
+        server.register_handler("sleep", _sleepy, blocking=True)
+        await server.start()
+        try:
+            r1, w1, _ = await _connect(server)
+            r2, w2, _ = await _connect(server)
+            await _send(w1, {"type": "sleep", "seconds": 0.3})
+            await asyncio.sleep(0.05)
+            await _send(w2, {"type": "echo", "payload": "hi"})
+            # the echo on the second connection is answered while the first still sleeps
+            reply = await asyncio.wait_for(r2.readline(), 0.2)
+            assert json.loads(reply)["payload"] == "hi"
+            assert json.loads(await r1.readline()) == {"type": "slept"}
+            w1.close()
+            w2.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_blocking_call_timeout_and_tools():
+    from mcp.executors import blocking
+    from mcp.tools import ToolManager
+
+    @blocking(timeout=0.05)
+    def slow_tool():
+        import time
+
+        time.sleep(0.3)
+
+    tools = ToolManager()
+    tools.register("add", lambda a, b: a + b, blocking=True)
+    tools.register("slow", slow_tool)
+    assert tools.is_blocking("slow") and tools.timeout("slow") == 0.05
+
+    async def scenario():
+        server = MCPServer(port=0, tools=tools)
+        await server.start()
+        try:
+            reader, writer, _ = await _connect(server)
+            await _send(writer, {"type": "tool", "name": "add", "args": [2, 3]})
+            assert json.loads(await reader.readline())["result"] == 5
+            await _send(writer, {"type": "tool", "name": "slow"})
+            assert json.loads(await reader.readline())["reason"] == "timeout"
+            await _send(writer, {"type": "tool", "name": "nope"})
+            assert json.loads(await reader.readline())["reason"] == "unknown_tool"
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_requests_cancelled_when_connection_is_lost():
+    import socket
+    import struct
+
+    cancelled = asyncio.Event()
+
+    async def wait_forever(message):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def scenario():
+        server = MCPServer(port=0)
+        server.register_handler("hang", wait_forever)
+        await server.start()
+        try:
+            reader, writer, _ = await _connect(server)
+            await _send(writer, {"type": "hang"})
+            await asyncio.sleep(0.05)
+            # abortive close (RST) so the server sees the connection drop
+            sock = writer.get_extra_info("socket")
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            writer.transport.abort()
+            await asyncio.wait_for(cancelled.wait(), 1.0)
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_process_executor_preloads_workers():
+    from mcp.executors import create_executor
+
+    executor = create_executor("process", 2, preload=["krules.helpers:ancestry"])
+    try:
+        async def scenario():
+            server = MCPServer(port=0, executor=executor)
+            from krules.helpers import descendants_of
+
+            result = await server.run_blocking(descendants_of, "bob")
+            assert sorted(result) == ["alice", "jack", "sue"]
+
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+
+def test_batch_dedupes_and_groups_sub_requests():
+    calls = []
+
+    def check_many(messages):
+        calls.append(len(messages))
+        return [{"type": "ok", "n": m["n"] * 2} for m in messages]
+
+    async def scenario():
+        server = MCPServer(port=0)
+        server.register_batch_handler("double", check_many)
+        batch = {"type": "batch", "requests": [
+            {"type": "double", "n": 1, "id": "a"},
+            {"type": "echo", "payload": "p"},
+            {"type": "double", "n": 2},
+            {"type": "double", "n": 1, "id": "b"},
+            {"type": "batch", "requests": []},
+        ]}
+        response = await server.on_request(batch)
+        assert response["type"] == "batch_response"
+        assert response["results"] == [
+            {"type": "ok", "n": 2, "id": "a"},
+            {"type": "echo", "payload": "p"},
+            {"type": "ok", "n": 4},
+            {"type": "ok", "n": 2, "id": "b"},
+            {"type": "error", "reason": "nested_batch"},
+        ]
+        assert calls == [2]
+        assert (await server.on_request({"type": "batch", "requests": "x"}))["reason"] == "invalid_batch"
+        server.max_batch = 1
+        too_big = await server.on_request({"type": "batch", "requests": [{}, {}]})
+        assert too_big["reason"] == "batch_too_large"
+
+    asyncio.run(scenario())
+
+
+def test_hello_switches_codec():
+    import pytest
+
+    from mcp.codecs import available_codecs, get_codec
+
+    if "orjson" not in available_codecs():
+        pytest.skip("orjson not installed")
+
+    async def scenario():
+        server = MCPServer(port=0)
+        await server.start()
+        try:
+            reader, writer, ready = await _connect(server)
+            assert "orjson" in ready["codecs"]
+            await _send(writer, {"type": "hello", "codec": "orjson"})
+            assert json.loads(await reader.readline()) == {"type": "hello", "codec": "orjson"}
+            codec = get_codec("orjson")
+            writer.write(codec.encode({"type": "echo", "payload": [1, "ü"], "id": 1}))
+            frame = await codec.read_frame(reader)
+            assert codec.decode(frame) == {"type": "echo", "payload": [1, "ü"], "id": 1}
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_unsupported_codec_keeps_json():
+    async def scenario():
+        server = MCPServer(port=0, codecs=["json"])
+        await server.start()
+        try:
+            reader, writer, ready = await _connect(server)
+            assert ready["codecs"] == ["json"]
+            await _send(writer, {"type": "hello", "codec": "msgpack"})
+            assert json.loads(await reader.readline())["reason"] == "unsupported_codec"
+            await _send(writer, {"type": "echo", "payload": 2})
+            assert json.loads(await reader.readline())["payload"] == 2
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_length_prefixed_framing_round_trip():
+    from mcp.codecs import FrameTooLarge, LengthPrefixedCodec
+
+    class ReprCodec(LengthPrefixedCodec):
+        name = "repr"
+        max_frame = 16
+
+        def pack(self, obj):
+            return json.dumps(obj).encode()
+
+        def decode(self, frame):
+            return json.loads(frame)
+
+    async def scenario():
+        codec = ReprCodec()
+        reader = asyncio.StreamReader()
+        reader.feed_data(codec.encode([1, 2]) + codec.encode("x" * 40) + codec.encode({"a": 1}))
+        reader.feed_eof()
+        assert codec.decode(await codec.read_frame(reader)) == [1, 2]
+        try:
+            await codec.read_frame(reader)
+        except FrameTooLarge:
+            pass
+        else:
+            raise AssertionError("expected FrameTooLarge")
+        assert codec.decode(await codec.read_frame(reader)) == {"a": 1}
+        assert await codec.read_frame(reader) is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+from kanren import run, var
+
+from krules.closure import ClosureIndex
+from krules.snapshot import load_snapshot, open_snapshot, save_snapshot
+from krules.store import FactStore
+
+
+def _people():
+    store = FactStore()
+    parent = store.relation("parent", 2)
+    for a, b in [("bob", "alice"), ("bob", "jack"), ("alice", "sue"), ("sue", "zoë")]:
+        parent.add_fact(a, b)
+    male = store.relation("male", 1)
+    male.add_fact("bob")
+    male.add_fact("jack")
+    return store
+
+
+def test_round_trip_and_mapped_lookups(tmp_path):
+    path = tmp_path / "facts.krs"
+    save_snapshot(path, _people(), closure=["parent"])
+    with open_snapshot(path) as snap:
+        parent = snap.relation("parent")
+        assert len(parent) == 4
+        assert parent.project(0, "bob", 1) == ("alice", "jack")
+        assert parent.project(1, "zoë", 0) == ("sue",)
+        assert ("alice", "sue") in parent and ("sue", "alice") not in parent
+        assert set(parent) == {("bob", "alice"), ("bob", "jack"), ("alice", "sue"), ("sue", "zoë")}
+        assert ("jack",) in snap.relation("male") and ("sue",) not in snap.relation("male")
+        closure = snap.closure("parent")
+        assert set(closure.descendants("bob")) == {"alice", "jack", "sue", "zoë"}
+        assert set(closure.ancestors("zoë")) == {"bob", "alice", "sue"}
+        assert snap.strings.id_of("nobody") is None
+
+
+def test_attached_snapshot_with_overlay(tmp_path):
+    path = tmp_path / "facts.krs"
+    save_snapshot(path, _people(), closure=["parent"])
+    store = FactStore()
+    parent = store.relation("parent", 2)
+    snap = load_snapshot(path, store)
+    index = ClosureIndex(parent)
+    assert index.descendants("alice") == ("sue", "zoë")
+
+    x = var()
+    assert set(run(0, x, parent("bob", x), store["male"](x))) == {"jack"}
+
+    assert parent.add_fact("bob", "alice") is False
+    assert parent.add_fact("jack", "tim") is True
+    assert parent.retract_fact("alice", "sue") is True
+    assert len(parent) == 4
+    assert parent.project(0, "alice", 1) == ()
+    assert set(index.descendants("bob")) == {"alice", "jack", "tim"}
+    assert parent.add_fact("alice", "sue") is True
+    assert "zoë" in index.descendants("bob")
+    index.close()
+    snap.close()
+
+
+def test_cli_load_can_save_snapshot(tmp_path, capsys):
+    from krules import __main__ as cli
+
+    src = tmp_path / "edges.csv"
+    src.write_text("pat,quinn\n")
+    out = tmp_path / "out.krs"
+    assert cli.main(["load", "parent", str(src), "--quiet", "--save", str(out), "--closure", "parent"]) == 0
+    with open_snapshot(out) as snap:
+        # only the loaded facts: none of the demo parent/male/female facts
+        assert snap.relation_names() == ["parent"]
+        assert list(snap.relation("parent")) == [("pat", "quinn")]
+        assert snap.closure("parent").reaches("pat", "quinn")
+        assert not snap.closure("parent").reaches("bob", "sue")
+    store = FactStore()
+    with load_snapshot(out, store):
+        assert store.names() == ["parent"] and list(store["parent"]) == [("pat", "quinn")]
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+import types
+from pathlib import Path
+
+from mcp.server import MCPServer
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# generous: cold imports on a loaded CI box are slow, but kanren/asyncio would blow these
+IMPORT_BUDGET_US = {"krules": 150_000, "mcp": 150_000}
+
+
+def _importtime(statement):
+    """Run `statement` under ``python -X importtime``; return {module: cumulative microseconds}."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_krules_is_lazy_and_within_budget():
+    times = _importtime("import krules")
+    assert times["krules"] < IMPORT_BUDGET_US["krules"]
+    assert not {"kanren", "unification", "toolz", "krules.relations"} & set(times)
+
+    # the indexed helpers answer queries without loading the logic libraries (checked through
+    # sys.modules: -X importtime doesn't report the lazy importlib.import_module loads)
+    subprocess.run([sys.executable, "-c", "import krules, sys\n"
+                    "assert krules.descendants_of('bob') == ['alice', 'jack', 'sue']\n"
+                    "assert 'krules.helpers' in sys.modules and 'unification' not in sys.modules"],
+                   cwd=ROOT, check=True)
+
+
+def test_krules_submodules_are_not_shadowed():
+    import krules
+    import krules.roles as roles
+    import krules.store as store
+
+    assert isinstance(store, types.ModuleType) and isinstance(roles, types.ModuleType)
+    assert krules.FactStore is store.FactStore and krules.RoleIndex is roles.RoleIndex
+
+
+def test_import_mcp_does_not_load_the_server():
+    times = _importtime("import mcp, mcp.executors")
+    assert times["mcp"] < IMPORT_BUDGET_US["mcp"]
+    assert not {"asyncio", "mcp.server", "concurrent.futures"} & set(times)
+
+
+def test_server_accepts_connections_while_warming_up():
+    release = threading.Event()
+
+    async def scenario():
+        server = MCPServer(port=0, warm_up=release.wait)
+        await server.start()
+        try:
+            assert server.warming
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            assert json.loads(await reader.readline())["warming"] is True
+            writer.write(b'{"type":"echo","payload":1}\n')
+            assert json.loads(await reader.readline())["payload"] == 1
+            release.set()
+            await server.wait_warm()
+            assert not server.warming
+            writer.close()
+        finally:
+            release.set()
+            await server.stop()
+
+    asyncio.run(scenario())
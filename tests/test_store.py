@@ -0,0 +1,74 @@
+from kanren import run, var
+
+from krules import relations
+from krules.store import FactStore
+
+
+def test_indexed_relation_lookups_and_retract():
+    store = FactStore()
+    edge = store.relation("edge", 2)
+    assert edge.add_fact("a", "b") is True
+    assert edge.add_fact("a", "b") is False
+    edge.add_fact("a", "c")
+    edge.add_fact("d", "c")
+    assert edge.project(0, "a", 1) == ("b", "c")
+    assert edge.project(1, "c", 0) == ("a", "d")
+    assert edge.count(1, "c") == 2
+    version = store.version
+    assert edge.retract_fact("a", "c") is True
+    assert edge.retract_fact("a", "c") is False
+    assert store.version == version + 1
+    assert edge.project(0, "a", 1) == ("b",)
+    assert ("a", "c") not in edge
+
+
+def test_listeners_see_changes():
+    store = FactStore()
+    seen = []
+    store.subscribe(lambda rel, fact, added: seen.append((rel.name, fact, added)))
+    rel = store.relation("r")
+    rel.add_fact(1, 2)
+    rel.retract_fact(1, 2)
+    assert seen == [("r", (1, 2), True), ("r", (1, 2), False)]
+
+
+def test_relations_still_work_as_kanren_goals():
+    x, y = var(), var()
+    assert set(run(0, x, relations.parent("bob", x))) == {"alice", "jack"}
+    assert run(0, x, relations.parent(x, "sue"), relations.female(x)) == ("alice",)
+    assert set(run(0, (x, y), relations.parent(x, y), relations.male(x))) == {
+        ("bob", "alice"),
+        ("bob", "jack"),
+    }
+
+
+def test_relation_helpers():
+    assert relations.parents_of("sue") == ("alice",)
+    assert relations.siblings_of("alice") == ["jack"]
+    assert relations.is_male("jack") and not relations.is_male("sue")
+
+
+def test_deferred_facts_load_on_first_use_only():
+    store = FactStore()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return [("a", "b"), ("b", "c")]
+
+    edge = store.relation("edge", 2)
+    edge.defer(loader)
+    assert not calls and store.version == 0
+    assert edge.project(0, "a", 1) == ("b",)
+    edge.add_fact("c", "d")
+    assert len(edge) == 3 and calls == [1]
+
+    x = var()
+    other = store.relation("other", 2)
+    other.defer(loader)
+    assert run(0, x, other("a", x)) == ("b",)  # kanren goals load it too
+
+    replaced = store.relation("replaced", 2)
+    replaced.defer(loader)
+    replaced.replace([("x", "y")])  # e.g. a snapshot: the deferred facts never load
+    assert list(replaced) == [("x", "y")] and calls == [1, 1]
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import threading
+
+from krules.closure import ClosureIndex
+from krules.store import FactStore
+from mcp.executors import blocking
+from mcp.server import MCPServer
+
+
+class CountingServer(MCPServer):
+    async def on_request(self, message):
+        if message.get("type") == "count":
+            if message.get("async"):
+                async def numbers():
+                    for i in range(message["n"]):
+                        yield i
+                return numbers()
+            return iter(range(message["n"]))
+        return await super().on_request(message)
+
+
+async def _frames(reader, writer, request):
+    writer.write((json.dumps(request) + "\n").encode("utf8"))
+    await writer.drain()
+    frames = []
+    while True:
+        frame = json.loads(await reader.readline())
+        frames.append(frame)
+        if frame["type"] != "partial":
+            return frames
+
+
+def test_stream_frames_grow_and_honour_offset_limit():
+    async def scenario():
+        server = CountingServer(port=0, stream_chunk=40)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            await reader.readline()
+            frames = await _frames(reader, writer, {"type": "count", "n": 100, "id": 1})
+            assert [len(f["items"]) for f in frames[:-1]] == [16, 32, 40, 12]
+            assert [i for f in frames[:-1] for i in f["items"]] == list(range(100))
+            assert frames[-1] == {"type": "done", "count": 100, "id": 1}
+
+            frames = await _frames(reader, writer, {"type": "count", "n": 100, "async": True,
+                                                    "offset": 10, "limit": 20})
+            assert [i for f in frames[:-1] for i in f["items"]] == list(range(10, 30))
+            assert frames[-1] == {"type": "done", "count": 20, "next_offset": 30}
+
+            frames = await _frames(reader, writer, {"type": "count", "n": 5, "offset": 3, "limit": 2})
+            assert frames[-1] == {"type": "done", "count": 2}
+
+            frames = await _frames(reader, writer, {"type": "batch", "requests": [{"type": "count", "n": 2}]})
+            assert frames[0]["results"] == [{"type": "error", "reason": "stream_in_batch"}]
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_pipelined_stream_interleaves_with_other_replies():
+    async def scenario():
+        server = CountingServer(port=0, pipeline=4, stream_chunk=16)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            await reader.readline()
+            writer.write((json.dumps({"type": "count", "n": 5000, "id": "s"}) + "\n").encode("utf8"))
+            writer.write((json.dumps({"type": "echo", "payload": 1, "id": "e"}) + "\n").encode("utf8"))
+            await writer.drain()
+            ids, done = [], None
+            while done is None or "e" not in ids:
+                frame = json.loads(await reader.readline())
+                ids.append(frame["id"])
+                if frame["type"] == "done":
+                    done = frame
+            assert done["count"] == 5000
+            assert ids.index("e") < len(ids) - 1  # the echo did not wait for the whole stream
+            writer.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_closure_index_iterators_are_lazy_snapshots():
+    store = FactStore()
+    edge = store.relation("edge", 2)
+    for a, b in [("a", "b"), ("b", "c"), ("c", "d")]:
+        edge.add_fact(a, b)
+    index = ClosureIndex(edge)
+    it = index.iter_descendants("a")
+    assert next(it) == "b"
+    edge.add_fact("d", "e")
+    assert list(it) == ["c", "d"]
+    assert list(index.iter_descendants("a")) == ["b", "c", "d", "e"]
+    assert list(index.iter_ancestors("c")) == ["a", "b"]
+    assert list(index.iter_descendants("missing")) == []
+
+
+def test_blocking_handler_iterators_are_pulled_off_the_loop():
+    pulled_on = set()
+
+    @blocking
+    def numbers(message):
+        def gen():
+            for i in range(message["n"]):
+                pulled_on.add(threading.get_ident())
+                yield i
+        return gen()
+
+    async def scenario():
+        server = MCPServer(port=0, pipeline=4)
+        server.register_handler("numbers", numbers)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            await reader.readline()
+            frames = await _frames(reader, writer, {"type": "numbers", "n": 2000, "offset": 1500, "limit": 30})
+            assert [i for f in frames[:-1] for i in f["items"]] == list(range(1500, 1530))
+            assert frames[-1] == {"type": "done", "count": 30, "next_offset": 1530}
+            writer.close()
+        finally:
+            await server.stop()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert pulled_on and loop_thread not in pulled_on
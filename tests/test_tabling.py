@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from kanren import conde, run, var
+
+from krules.store import FactStore
+from krules.tabling import tabled
+
+
+def _graph(*edges):
+    store = FactStore()
+    edge = store.relation("edge", 2)
+    for a, b in edges:
+        edge.add_fact(a, b)
+    return store, edge
+
+
+def test_left_recursion_on_cyclic_graph_terminates():
+    store, edge = _graph(("a", "b"), ("b", "c"), ("c", "a"), ("c", "d"))
+
+    @tabled(store=store)
+    def path(x, y):
+        z = var()
+        return conde([path(x, z), edge(z, y)], [edge(x, y)])
+
+    x = var()
+    assert set(run(0, x, path("a", x))) == {"a", "b", "c", "d"}
+    assert set(run(0, x, path(x, "d"))) == {"a", "b", "c"}
+    assert path.cache_info()["hits"] == 0
+    run(0, x, path("a", x))
+    assert path.cache_info()["hits"] == 1
+
+    edge.add_fact("d", "e")  # store changed: tables are rebuilt
+    assert "e" in run(0, x, path("a", x))
+
+
+def test_mutual_recursion_and_lru_bound():
+    store, edge = _graph(*[(i, i + 1) for i in range(6)])
+
+    @tabled(maxsize=2)
+    def even_hop(x, y):
+        z = var()
+        return conde([edge(x, y)], [odd_hop(x, z), edge(z, y)])
+
+    @tabled(maxsize=2)
+    def odd_hop(x, y):
+        z = var()
+        return conde([even_hop(x, z), edge(z, y)])
+
+    x = var()
+    assert sorted(run(0, x, even_hop(0, x))) == [1, 3, 5]
+    assert sorted(run(0, x, odd_hop(0, x))) == [2, 4, 6]
+    for start in range(5):
+        run(0, x, even_hop(start, x))
+    assert even_hop.cache_info()["tables"] <= 2
+
+
+def test_concurrent_queries_from_threads():
+    store, edge = _graph(*[(i, i + 1) for i in range(10)], (10, 0))
+
+    @tabled(store=store)
+    def path(x, y):
+        time.sleep(0.001)  # widen the window in which the table is being evaluated
+        z = var()
+        return conde([path(x, z), edge(z, y)], [edge(x, y)])
+
+    def query(_):
+        x = var()
+        return set(run(0, x, path(0, x)))
+
+    # every thread asks for the same call pattern at once: none may see a half-built table
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(query, range(8)))
+    assert results == [set(range(11))] * 8
+
+
+def test_fact_change_during_evaluation_clears_afterwards():
+    store, edge = _graph(("a", "b"), ("z", "a"))
+    added = []
+
+    @tabled(store=store)
+    def path(x, y):
+        if x == "z" and not added:  # facts change while another query is being evaluated
+            added.append(1)
+            edge.add_fact("b", "c")
+        z = var()
+        return conde([path(x, z), edge(z, y)], [edge(x, y)])
+
+    x = var()
+    assert set(run(0, x, path("a", x))) == {"b"}
+    assert set(run(0, x, path("z", x))) == {"a", "b", "c"}
+    # the table for "a", complete before the change, must not outlive it
+    assert set(run(0, x, path("a", x))) == {"b", "c"}
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+
+from mcp.tools import ToolManager
+
+
+def _square(x):
+    return x * x
+
+
+def test_async_inline_and_blocking_tools():
+    tools = ToolManager()
+    loop_thread = threading.get_ident()
+
+    async def fetch(x):
+        await asyncio.sleep(0)
+        return x + 1
+
+    def where():
+        return threading.get_ident() == loop_thread
+
+    tools.register("fetch", fetch)
+    tools.register("inline", where)
+    tools.register("pooled", where, executor="thread")
+    tools.register("default_pool", where, blocking=True)
+
+    async def scenario():
+        assert await tools.run("fetch", [1]) == 2
+        assert await tools.run("inline") is True
+        assert await tools.run("pooled") is False
+        assert await tools.run("default_pool") is False
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        tools.shutdown()
+    assert tools.is_blocking("pooled") and not tools.is_blocking("inline")
+
+
+def test_process_executor_runs_tool_in_pool():
+    tools = ToolManager(max_workers=1)
+    tools.register("square", _square, executor="process")
+    try:
+        assert asyncio.run(tools.run("square", [7])) == 49
+    finally:
+        tools.shutdown()
+
+
+def test_concurrency_limit_and_timeout():
+    tools = ToolManager()
+    running = []
+    peak = []
+
+    async def work(seconds):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(seconds)
+        running.pop()
+        return seconds
+
+    tools.register("work", work, concurrency=2)
+    tools.register("slow", work, concurrency=1, timeout=0.05)
+
+    async def scenario():
+        results = await asyncio.gather(*(tools.run("work", [0.02]) for _ in range(5)))
+        assert results == [0.02] * 5 and max(peak) == 2
+        # the timeout covers waiting for the slot as well as running
+        first = asyncio.ensure_future(tools.run("slow", [0.2]))
+        await asyncio.sleep(0.01)  # let it take the only slot
+        try:
+            # even if it gets the slot when `first` times out, it can't finish in time
+            await tools.run("slow", [0.2])
+        except asyncio.TimeoutError:
+            pass
+        else:
+            raise AssertionError("expected a timeout")
+        try:
+            await first
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_limited_tool_works_on_a_second_loop():
+    tools = ToolManager()
+
+    async def work(x):
+        await asyncio.sleep(0.001)
+        return x
+
+    tools.register("work", work, concurrency=1)
+
+    async def scenario():
+        return await asyncio.gather(tools.run("work", [1]), tools.run("work", [2]))
+
+    assert asyncio.run(scenario()) == [1, 2]
+    assert asyncio.run(scenario()) == [1, 2]  # the semaphore is not bound to the first loop
+
+
+def test_identical_concurrent_calls_are_coalesced():
+    tools = ToolManager()
+    calls = []
+
+    def lookup(key, scale=1):
+        calls.append(key)
+        time.sleep(0.05)
+        return key * scale
+
+    tools.register("lookup", lookup, blocking=True, coalesce=True)
+
+    async def scenario():
+        results = await asyncio.gather(
+            tools.run("lookup", ["a"], {"scale": 2}),
+            tools.run("lookup", ["a"], {"scale": 2}),
+            tools.run("lookup", ["b"]),
+            tools.run("lookup", ["a"], {"scale": 2}),
+        )
+        assert results == ["aa", "aa", "b", "aa"]
+        assert sorted(calls) == ["a", "b"] and tools.coalesced == 2
+        # once finished, the next call runs again
+        assert await tools.run("lookup", ["a"], {"scale": 2}) == "aa"
+        assert len(calls) == 3
+
+    asyncio.run(scenario())
+
+
+def test_shared_call_is_cancelled_when_all_callers_leave():
+    tools = ToolManager()
+    cancelled = []
+
+    async def forever():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    tools.register("forever", forever, coalesce=True)
+
+    async def scenario():
+        callers = [asyncio.ensure_future(tools.run("forever")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled  # the other caller still waits
+        callers[1].cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        assert cancelled == [True]
+
+    asyncio.run(scenario())